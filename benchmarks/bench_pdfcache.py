@@ -0,0 +1,37 @@
+import time
+
+import pineappl
+
+import pineko
+
+
+def benchmark_pdfcache(lhapdf_path, test_files, test_pdf):
+    import lhapdf
+
+    pine_path = test_files / "data/grids/208/LHCB_DY_13TEV_DIMUON.pineappl.lz4"
+    fk_path = test_files / "data/fktables/208/LHCB_DY_13TEV_DIMUON.pineappl.lz4"
+    grid = pineappl.grid.Grid.read(pine_path)
+    fk = pineappl.fk_table.FkTable.read(fk_path)
+    pdfset = "NNPDF40_nlo_as_01180"
+    ncomparisons = 5
+    with lhapdf_path(test_pdf):
+        pineko.pdfcache.clear()
+        start = time.perf_counter()
+        for _ in range(ncomparisons):
+            pineko.comparator.compare(grid, fk, 2, 0, [pdfset], (1.0, 1.0, 1.0))
+        cached = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(ncomparisons):
+            pdf = lhapdf.mkPDF(pdfset)
+            grid.convolve(
+                pdg_convs=grid.convolutions,
+                xfxs=[pdf.xfxQ2] * len(grid.convolutions),
+                alphas=pdf.alphasQ2,
+            )
+            fk.convolve(
+                pdg_convs=fk.convolutions,
+                xfxs=[pdf.xfxQ2] * len(fk.convolutions),
+            )
+        direct = time.perf_counter() - start
+        pineko.pdfcache.clear()
+    print(f"cached: {cached:.3f} s, direct lhapdf callbacks: {direct:.3f} s")
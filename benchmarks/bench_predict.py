@@ -0,0 +1,33 @@
+import time
+
+import numpy as np
+import pineappl
+
+import pineko
+
+
+def benchmark_predict(lhapdf_path, test_files, test_pdf):
+    import lhapdf
+
+    fk_path = test_files / "data/fktables/208/LHCB_DY_13TEV_DIMUON.pineappl.lz4"
+    fk = pineappl.fk_table.FkTable.read(fk_path)
+    pdfset = "NNPDF40_nlo_as_01180"
+    # the test PDF set may only provide the central member
+    members = [0] * 10
+    with lhapdf_path(test_pdf):
+        start = time.perf_counter()
+        predictions = pineko.predict.predict(fk, pdfset, members)
+        batched = time.perf_counter() - start
+        start = time.perf_counter()
+        reference = []
+        for member in members:
+            pdf = lhapdf.mkPDF(pdfset, member)
+            reference.append(
+                fk.convolve(
+                    pdg_convs=fk.convolutions,
+                    xfxs=[pdf.xfxQ2] * len(fk.convolutions),
+                )
+            )
+        single = time.perf_counter() - start
+    np.testing.assert_allclose(predictions, reference, rtol=1e-10)
+    print(f"batched: {batched:.3f} s, FkTable.convolve: {single:.3f} s")
@@ -1,8 +1,12 @@
 import os
 import pathlib
+import time
+
+import eko
 
 import pineko
 import pineko.configs
+import pineko.ekocache
 import pineko.theory
 import pineko.theory_card
 
@@ -198,3 +202,46 @@ def benchmark_fk(test_files, test_configs):
         os.remove(fk_path)
     else:
         raise ValueError("fktable not found")
+
+
+def benchmark_fk_read_only_ekos(tmp_path, test_files, test_configs):
+    tcard = pineko.theory_card.load(400)
+    grid_name = "HERA_NC_225GEV_EP_SIGMARED"
+    grid_path = pathlib.Path(
+        theory_obj_hera.grids_path() / (grid_name + ".pineappl.lz4")
+    )
+    base_configs = pineko.configs.load(test_files)
+    pineko.configs.configs = pineko.configs.defaults(base_configs)
+    theory_obj_hera.opcard(grid_name, pathlib.Path(test_files / grid_path), tcard)
+    eko_path = theory_obj_hera.ekos_path() / f"{grid_name}.tar"
+    before = eko_path.stat()
+
+    start_time = time.perf_counter()
+    theory_obj_hera.fk(grid_name, grid_path, tcard, pdfs=None)
+    fk_time = time.perf_counter() - start_time
+    # the eko is neither copied nor rewritten
+    after = eko_path.stat()
+    assert (after.st_size, after.st_mtime_ns) == (before.st_size, before.st_mtime_ns)
+    assert len(list(eko_path.parent.glob("eko-tmp-*"))) == 0
+    # the eko is still extracted once (here by `fk`), which is all the cost left
+    pineko.ekocache.remove([eko_path])
+    start_time = time.perf_counter()
+    extracted = pineko.ekocache.extract(eko_path)
+    extract_time = time.perf_counter() - start_time
+    extracted_size = sum(f.stat().st_size for f in extracted.rglob("*") if f.is_file())
+    pineko.ekocache.remove([eko_path])
+    # what the former copy (copy + dump on close) would have cost on top
+    start_time = time.perf_counter()
+    with eko.EKO.read(eko_path) as operator:
+        operator.deepcopy(tmp_path / "copy.tar")
+    with eko.EKO.edit(tmp_path / "copy.tar"):
+        pass
+    copy_time = time.perf_counter() - start_time
+    print(
+        f"FK table in {fk_time:.2f} s, saved {copy_time:.2f} s and "
+        f"{2 * after.st_size / 1e6:.1f} MB of disk writes, the extraction "
+        f"still costs {extract_time:.2f} s and {extracted_size / 1e6:.1f} MB"
+    )
+
+    os.remove(theory_obj_hera.operator_cards_path / f"{grid_name}.yaml")
+    os.remove(theory_obj_hera.fks_path / f"{grid_name}.pineappl.lz4")
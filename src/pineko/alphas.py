@@ -0,0 +1,210 @@
+"""Strong coupling values shared among the evolutions of a theory.
+
+All the FK tables of a theory need the strong coupling at (largely) the same
+renormalization scales. The coupling is set up only once per theory, and its
+values are memoized, such that each of them is computed only once per process.
+The memoized values can also be saved to (and loaded from) a file in the state
+folder (see :func:`path`), to share them among the worker processes (even on
+different nodes) and the runs.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import pathlib
+import uuid
+from importlib import metadata
+
+import eko
+import numpy as np
+
+from . import configs
+
+MAX_THEORIES = 8
+"""Maximum number of couplings kept in memory."""
+
+MAX_VALUES = 100_000
+"""Maximum number of memoized values."""
+
+_couplings = collections.OrderedDict()
+_values = collections.OrderedDict()
+
+
+def theory_key(theory_card, evolution_method):
+    """Compute the key identifying the coupling of a theory.
+
+    Parameters
+    ----------
+    theory_card : eko.io.runcards.TheoryCard
+        theory card, as stored in the EKO
+    evolution_method : eko.io.types.EvolutionMethod
+        evolution method, from the operator card
+
+    Returns
+    -------
+    str :
+        hexadecimal digest
+    """
+    content = json.dumps(
+        dict(
+            theory=theory_card.raw,
+            evolution_method=str(evolution_method),
+            eko=metadata.version("eko"),
+        ),
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def couplings(theory_card, evolution_method):
+    """Set up the coupling of a theory, unless already available.
+
+    Parameters
+    ----------
+    theory_card : eko.io.runcards.TheoryCard
+        theory card, as stored in the EKO
+    evolution_method : eko.io.types.EvolutionMethod
+        evolution method, from the operator card
+
+    Returns
+    -------
+    str :
+        theory key, see :func:`theory_key`
+    eko.couplings.Couplings :
+        the coupling
+    """
+    key = theory_key(theory_card, evolution_method)
+    if key in _couplings:
+        _couplings.move_to_end(key)
+        return key, _couplings[key]
+    # Couplings ask for the square of the masses
+    thresholds_ratios = np.power(theory_card.heavy.matching_ratios, 2.0)
+    sc = eko.couplings.Couplings(
+        theory_card.couplings,
+        theory_card.order,
+        eko.couplings.couplings_mod_ev(evolution_method),
+        masses=[(x.value) ** 2 for x in theory_card.heavy.masses],
+        hqm_scheme=theory_card.heavy.masses_scheme,
+        thresholds_ratios=thresholds_ratios.tolist(),
+    )
+    _couplings[key] = sc
+    while len(_couplings) > MAX_THEORIES:
+        _couplings.popitem(last=False)
+    return key, sc
+
+
+def _memoize(key, value):
+    _values[key] = value
+    while len(_values) > MAX_VALUES:
+        _values.popitem(last=False)
+
+
+def a_s(theory_card, evolution_method, mu2_grid, nf_grid):
+    """Compute the strong coupling at several scales.
+
+    Repeated scales are computed only once, and the values already computed
+    (in this process, or loaded with :func:`load`) are reused.
+
+    Parameters
+    ----------
+    theory_card : eko.io.runcards.TheoryCard
+        theory card, as stored in the EKO
+    evolution_method : eko.io.types.EvolutionMethod
+        evolution method, from the operator card
+    mu2_grid : list(float)
+        renormalization scales
+    nf_grid : list(int)
+        number of active flavors at each scale
+
+    Returns
+    -------
+    np.ndarray :
+        :math:`a_s = \\alpha_s / (4 \\pi)` at each scale
+    """
+    key, sc = couplings(theory_card, evolution_method)
+    points = np.column_stack(
+        [np.asarray(mu2_grid, dtype=float), np.asarray(nf_grid, dtype=float)]
+    )
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    values = np.empty(len(unique))
+    for idx, (mu2, nf) in enumerate(unique):
+        point = (key, float(mu2), int(nf))
+        if point in _values:
+            _values.move_to_end(point)
+        else:
+            _memoize(point, float(sc.a_s(float(mu2), nf_to=int(nf))))
+        values[idx] = _values[point]
+    return values[inverse.ravel()]
+
+
+def clear():
+    """Drop all the couplings and the memoized values."""
+    _couplings.clear()
+    _values.clear()
+
+
+def path(theory_id):
+    """Determine the file storing the memoized values of a theory.
+
+    Parameters
+    ----------
+    theory_id : int
+        theory identifier
+
+    Returns
+    -------
+    pathlib.Path :
+        path to the file, in the state folder
+    """
+    return configs.state_path("alphas", f"{theory_id}.json")
+
+
+def load(filename):
+    """Load memoized values from a file, if available.
+
+    Parameters
+    ----------
+    filename : os.PathLike
+        file written by :func:`dump`
+    """
+    filename = pathlib.Path(filename)
+    try:
+        with open(filename, encoding="utf-8") as f:
+            stored = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return
+    for key, entries in stored.items():
+        for mu2, nf, value in entries:
+            if (key, mu2, nf) not in _values:
+                _memoize((key, mu2, nf), value)
+
+
+def dump(filename):
+    """Save the memoized values to a file, together with those already there.
+
+    The file is replaced atomically (through a temporary file with a unique
+    name, as the state folder may be shared by several nodes), so concurrent
+    processes never read a partially written file (at worst, some values are
+    not saved).
+
+    Parameters
+    ----------
+    filename : os.PathLike
+        target file
+    """
+    filename = pathlib.Path(filename)
+    load(filename)
+    stored = {}
+    for (key, mu2, nf), value in _values.items():
+        stored.setdefault(key, []).append([mu2, nf, value])
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    tmp = filename.with_name(f".{filename.name}-{uuid.uuid4().hex}")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(stored, f)
+        os.replace(tmp, filename)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
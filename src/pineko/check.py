@@ -40,6 +40,39 @@ class AvailableAtMax(Enum):
     SCVAR = auto()
 
 
+def isin(needles, haystack, rtol=1e-05, atol=1e-08):
+    """Check which elements are contained in a list, up to a tolerance.
+
+    All the elements are checked at once, by bisecting the sorted haystack.
+
+    Parameters
+    ----------
+    needles : list
+        elements to look for
+    haystack : list
+        elements to look into
+    rtol : float
+        allowed relative error
+    atol : float
+        allowed absolute error
+
+    Returns
+    -------
+    np.ndarray
+        mask of the needles found in the haystack
+    """
+    needles = np.asarray(needles, dtype=float).ravel()
+    haystack = np.unique(np.asarray(haystack, dtype=float))
+    if haystack.size == 0:
+        return np.zeros(needles.shape, dtype=bool)
+    # closest neighbours, on both sides
+    right = np.clip(np.searchsorted(haystack, needles), 0, haystack.size - 1)
+    left = np.clip(right - 1, 0, haystack.size - 1)
+    return np.isclose(haystack[left], needles, rtol=rtol, atol=atol) | np.isclose(
+        haystack[right], needles, rtol=rtol, atol=atol
+    )
+
+
 def in1d(a, b, rtol=1e-05, atol=1e-08):
     """Improved version of np.in1d.
 
@@ -62,16 +95,115 @@ def in1d(a, b, rtol=1e-05, atol=1e-08):
         mask of found elements
     """
     if len(a) == 1:
-        for be in b:
-            if np.isclose(be, a[0], rtol=rtol, atol=atol):
-                return [True]
-        return [False]
-    ss = np.searchsorted(a[1:-1], b, side="left")
-    return np.isclose(a[ss], b, rtol=rtol, atol=atol) | np.isclose(
-        a[ss + 1], b, rtol=rtol, atol=atol
+        return [bool(isin(b, a, rtol=rtol, atol=atol).any())]
+    return isin(b, a, rtol=rtol, atol=atol)
+
+
+@dataclass
+class CompatibilityReport:
+    """Mismatches between the kinematics of a grid and an operator."""
+
+    mu2_missing: np.ndarray
+    """Factorization scales required by the grid, not provided by the operator."""
+    mu2_unused: np.ndarray
+    """Scales provided by the operator, not required by the grid."""
+    x_missing: np.ndarray
+    """Points of the grid x grid, not provided by the operator."""
+
+    @property
+    def compatible(self):
+        """Whether the operator provides all the kinematics required by the grid."""
+        return len(self.mu2_missing) == 0 and len(self.x_missing) == 0
+
+    def errors(self):
+        """Describe the incompatibilities.
+
+        Returns
+        -------
+        list(str)
+            one message for each kind of mismatch
+        """
+        errors = []
+        if len(self.mu2_missing) > 0:
+            errors.append(
+                "Q2 grid in pineappl grid and eko operator are NOT compatible! "
+                f"Missing Q2: {self.mu2_missing.tolist()}"
+            )
+        if len(self.x_missing) > 0:
+            errors.append(
+                "x grid in pineappl grid and eko operator are NOT compatible! "
+                f"Missing x: {self.x_missing.tolist()}"
+            )
+        return errors
+
+
+def compare_kinematics(x_grid, muf2_grid, eko_xgrid, eko_mu2grid, xif=1.0):
+    """Compare the kinematics required by a grid with the one of an operator.
+
+    Parameters
+    ----------
+    x_grid : list
+        x grid of the grid
+    muf2_grid : list
+        factorization scales of the grid
+    eko_xgrid : list or None
+        eko interpolation xgrid, not compared if ``None``
+    eko_mu2grid : list
+        eko scales
+    xif : float
+        factorization scale variation
+
+    Returns
+    -------
+    CompatibilityReport
+        mismatches
+    """
+    fac2_grid = xif * xif * np.asarray(muf2_grid, dtype=float)
+    eko_mu2grid = np.asarray(eko_mu2grid, dtype=float)
+    x_missing = np.array([])
+    if eko_xgrid is not None:
+        x_grid = np.asarray(x_grid, dtype=float)
+        x_missing = x_grid[~isin(x_grid, eko_xgrid)]
+    return CompatibilityReport(
+        mu2_missing=fac2_grid[~isin(fac2_grid, eko_mu2grid)],
+        mu2_unused=eko_mu2grid[~isin(eko_mu2grid, fac2_grid)],
+        x_missing=x_missing,
     )
 
 
+def compatibility_report(pineappl_grid, eko_xgrid, eko_mu2grid, xif, max_as, max_al):
+    """Compare a PineAPPL grid with an EKO operator.
+
+    The kinematics of the grid is extracted only once, and compared with all
+    the scales of the operator.
+
+    Parameters
+    ----------
+    pineappl_grid : pineappl.grid.Grid
+        grid
+    eko_xgrid : list
+        eko interpolation xgrid
+    eko_mu2grid : list
+        eko scales
+    xif : float
+        factorization scale variation
+    max_as: int
+        max order of alpha_s
+    max_al: int
+        max order of alpha
+
+    Returns
+    -------
+    CompatibilityReport
+        mismatches
+    """
+    order_mask = pineappl.boc.Order.create_mask(
+        pineappl_grid.orders(), max_as, max_al, True
+    )
+    evol_info = pineappl_grid.evolve_info(order_mask)
+    return compare_kinematics(evol_info.x1, evol_info.fac1, eko_xgrid, eko_mu2grid, xif)
+
+
 def check_grid_and_eko_compatible(
     pineappl_grid, eko_xgrid, eko_mu2, xif, max_as, max_al
 ):
@@ -97,19 +229,15 @@ def check_grid_and_eko_compatible(
     ValueError
         If the operator and the grid are not compatible.
     """
-    order_mask = pineappl.boc.Order.create_mask(
-        pineappl_grid.orders(), max_as, max_al, True
+    report = compatibility_report(
+        pineappl_grid, np.unique(eko_xgrid), [eko_mu2], xif, max_as, max_al
     )
-    evol_info = pineappl_grid.evolve_info(order_mask)
-    x_grid = evol_info.x1
-    muf2_grid = evol_info.fac1
-    # Q2 grid
-    if not np.all(in1d(np.array([eko_mu2]), xif * xif * np.array(muf2_grid))):
+    # the operator has to be required by the grid
+    if len(report.mu2_unused) > 0:
         raise ValueError(
             "Q2 grid in pineappl grid and eko operator are NOT compatible!"
         )
-    # x-grid
-    if not np.all(in1d(np.unique(eko_xgrid), np.array(x_grid))):
+    if len(report.x_missing) > 0:
         raise ValueError("x grid in pineappl grid and eko operator are NOT compatible!")
 
 
@@ -8,6 +8,7 @@ from . import (
     gen_sv,
     kfactor,
     opcard,
+    predict,
     scaffold,
     theory_,
 )
@@ -5,7 +5,7 @@ import sys
 
 import rich_click as click
 
-from .. import configs
+from .. import configs, sharding
 
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
 
@@ -30,6 +30,53 @@ config_option = click.option(
 )
 
 
+def _parse_shard(ctx, param, value):
+    """Parse the shard specification."""
+    if value is None:
+        return None
+    try:
+        return sharding.parse(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+
+
+shard_option = click.option(
+    "--shard",
+    default=None,
+    metavar="I/N",
+    callback=_parse_shard,
+    help="only process the I-th of N deterministic shards of the grids (0-based), "
+    "e.g. for cluster array jobs",
+)
+
+shard_by_cost_option = click.option(
+    "--shard-by-cost",
+    is_flag=True,
+    help="balance the shards according to the estimated cost of the grids (number of "
+    "factorization scales times number of channels)",
+)
+
+
+trim_xgrid_option = click.option(
+    "--trim-xgrid",
+    is_flag=True,
+    help="drop the x grid nodes well below the x range of the grid (keeping an "
+    "interpolation margin)",
+)
+
+max_memory_option = click.option(
+    "--max-memory",
+    default=None,
+    type=click.FloatRange(min=0, min_open=True),
+    callback=lambda _ctx, _param, value: (
+        None if value is None else int(value * 1024**3)
+    ),
+    metavar="GIB",
+    help="approximate memory budget (in GiB) of an evolution: larger grids are "
+    "evolved in chunks of bins, one at a time",
+)
+
+
 def load_config(cfg):
     """Load configuration files."""
     # if only help is needed, return before loading
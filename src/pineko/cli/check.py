@@ -9,7 +9,7 @@ import pineappl
 import rich
 import rich_click as click
 
-from .. import check
+from .. import check, comparator
 from ._base import command
 
 
@@ -18,6 +18,39 @@ def subcommand():
     """Check grid and operator properties."""
 
 
+@subcommand.command("fktables")
+@click.argument("reference_path", metavar="REFERENCE", type=click.Path(exists=True))
+@click.argument("fktable_path", metavar="FKTABLE", type=click.Path(exists=True))
+@click.argument("pdfs", type=click.STRING, nargs=-1, required=True)
+@click.option(
+    "--threshold",
+    default=0.1,
+    show_default=True,
+    help="threshold in permille to accept the FK table",
+)
+def sub_fktables(reference_path, fktable_path, pdfs, threshold):
+    """Check that two FK tables of the same grid give the same predictions.
+
+    The FK table in FKTABLE, e.g. computed with a trimmed x grid, is validated
+    against the one in REFERENCE, convolving both of them with PDFS.
+    """
+    reference = pineappl.fk_table.FkTable.read(reference_path)
+    fktable = pineappl.fk_table.FkTable.read(fktable_path)
+    if len(pdfs) not in (1, len(reference.convolutions)):
+        raise click.BadParameter(
+            "The number of PDFs is inconsistent with the FK table!", param_hint="PDFS"
+        )
+    try:
+        comparison = comparator.compare_fktables(
+            reference, fktable, list(pdfs), threshold
+        )
+    except comparator.FKtoFKError as e:
+        rich.print("[red]Error:[/]", e)
+        raise SystemExit(1) from e
+    rich.print(comparison.to_string())
+    rich.print("[green]Success:[/] the FK tables give the same predictions.")
+
+
 @subcommand.command("compatibility")
 @click.argument("grid_path", metavar="PINEAPPL", type=click.Path(exists=True))
 @click.argument("operator_path", metavar="EKO", type=click.Path(exists=True))
@@ -40,16 +73,23 @@ def sub_compatibility(grid_path, operator_path, xif, max_as, max_al):
     pineappl_grid = pineappl.grid.Grid.read(grid_path)
     pineappl_grid.optimize()
     with eko.EKO.read(pathlib.Path(operator_path)) as operators:
-        for (q2, _), _ in operators.items():
-            try:
-                check.check_grid_and_eko_compatible(
-                    pineappl_grid, operators.xgrid.tolist(), q2, xif, max_as, max_al
-                )
-                rich.print(
-                    f"[green]Success:[/] grids and eko are compatible for Q2={q2}."
-                )
-            except ValueError as e:
-                rich.print("[red]Error:[/]", e)
+        report = check.compatibility_report(
+            pineappl_grid,
+            operators.xgrid.tolist(),
+            operators.mu2grid,
+            xif,
+            max_as,
+            max_al,
+        )
+    for error in report.errors():
+        rich.print("[red]Error:[/]", error)
+    if len(report.mu2_unused) > 0:
+        rich.print(
+            "[orange]Warning:[/] eko contains Q2 not required by the grid: "
+            f"{report.mu2_unused.tolist()}"
+        )
+    if report.compatible:
+        rich.print("[green]Success:[/] grids and eko are compatible.")
 
 
 @dataclass
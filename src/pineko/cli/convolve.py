@@ -1,5 +1,7 @@
 """CLI entry point to convolution."""
 
+import contextlib
+import dataclasses
 import pathlib
 
 import eko
@@ -8,7 +10,7 @@ import rich
 import rich_click as click
 
 from .. import evolve, theory_card
-from ._base import command
+from ._base import command, max_memory_option
 
 
 @command.command("convolve")
@@ -35,6 +37,38 @@ from ._base import command
     help="the flavor assumptions to be used",
     show_default=True,
 )
+@click.option(
+    "--scale",
+    "scales",
+    multiple=True,
+    type=(float, float, float, click.Path()),
+    metavar="XIR XIF XIA FKTABLE",
+    help="additional scale variation, written to its own FK table with the same "
+    "operators (can be repeated)",
+)
+@click.option(
+    "--split-orders",
+    is_flag=True,
+    help="write one FK table per perturbative order (from MIN_AS to MAX_AS), "
+    "appending the order to its name",
+)
+@click.option(
+    "--order-range",
+    "order_ranges",
+    multiple=True,
+    type=(click.IntRange(min=1), click.IntRange(min=1)),
+    metavar="MIN_AS MAX_AS",
+    help="write an FK table for the given range of orders, appending it to its name "
+    "(can be repeated)",
+)
+@click.option(
+    "--prefetch-depth",
+    default=None,
+    type=click.IntRange(min=0),
+    help="number of operator slices prepared in background while evolving "
+    "(0 to disable)",
+)
+@max_memory_option
 def subcommand(
     fktable,
     grid_path,
@@ -48,6 +82,11 @@ def subcommand(
     pdfs,
     assumptions,
     min_as,
+    scales,
+    split_orders,
+    order_ranges,
+    prefetch_depth,
+    max_memory,
 ):
     """Convolute PineAPPL grid and EKO into an FK table.
 
@@ -65,6 +104,13 @@ def subcommand(
 
     XIR, XIF, and XIA represent the renormalization, factorization, and fragmentation
     scale in the grid, respectively.
+    Further FK tables with different scales can be produced at once, loading
+    the operators only once, by passing SCALE (possibly several times).
+    Similarly, with SPLIT_ORDERS or ORDER_RANGE an FK table is written for
+    each (range of) perturbative order(s), instead of a single one for all of
+    them.
+    With MAX_MEMORY, large grids are evolved in chunks of bins fitting into the
+    given memory budget (in GiB), one at a time.
 
     ASSUMPTIONS represent the assumptions on the flavor dimension.
 
@@ -74,46 +120,63 @@ def subcommand(
     """
     grid = pineappl.grid.Grid.read(grid_path)
     grid.optimize()
-    n_ekos = len(op_paths)
     tcard = theory_card.load(theoryid)
-    with eko.EKO.edit(pathlib.Path(op_paths[0])) as first_operator:
-        operators = [first_operator]
-        path_operators = f"[+] {op_paths[0]}\n"
-        # If there are more than ONE operator, then account for all of them.
-        if len(operators) > 1:
-            for op_idx in range(1, n_ekos):
-                operators.append(eko.EKO.edit(op_paths[op_idx]))
-                path_operators += f"[+] {op_paths[op_idx]}\n"
+    with contextlib.ExitStack() as stack:
+        # the operators are only read, so they are opened directly, without any copy
+        operators = []
+        path_operators = ""
+        for op_path in op_paths:
+            operators.append(eko.EKO.read(pathlib.Path(op_path)))
+            stack.callback(operators[-1].close)
+            path_operators += f"[+] {op_path}\n"
 
+        choices = [evolve.ScaleChoice(fktable, xir, xif, xia)]
+        choices += [evolve.ScaleChoice(path, *xi) for *xi, path in scales]
+        order_ranges = list(order_ranges)
+        if split_orders:
+            order_ranges += evolve.order_ranges(max_as, min_as)
+        if len(order_ranges) > 0:
+            choices = [
+                dataclasses.replace(
+                    choice,
+                    fktable_path=evolve.order_fktable_path(
+                        choice.fktable_path, low, high
+                    ),
+                    min_as=low,
+                    max_as=high,
+                )
+                for choice in choices
+                for low, high in order_ranges
+            ]
         rich.print(
             rich.panel.Panel.fit("Computing ...", style="magenta", box=rich.box.SQUARE),
             f"   {grid_path}\n",
             f"{path_operators}",
-            f"= {fktable}\n",
-            f"with max_as={max_as}, max_al={max_al}, xir={xir}, xif={xif}, xia={xia}",
+            *(
+                f"= {choice.fktable_path}\n"
+                f"with max_as={choice.max_as or max_as}, max_al={max_al}, "
+                f"xir={choice.xir}, xif={choice.xif}, xia={choice.xia}\n"
+                for choice in choices
+            ),
             f"min_as: {min_as}" if min_as is not None else "",
         )
 
         pdfs = pdfs.split(",") if pdfs is not None else pdfs
-        _grid, _fk, comp = evolve.evolve_grid(
+        results = evolve.evolve_grid_scales(
             grid,
             operators,
-            fktable,
+            choices,
             max_as,
             max_al,
-            xir,
-            xif,
-            xia,
             theory_meta=tcard,
             assumptions=assumptions,
             comparison_pdfs=pdfs,
             min_as=min_as,
             grid_path=pathlib.Path(grid_path),
+            prefetch_depth=prefetch_depth,
+            max_memory=max_memory,
         )
 
-        if len(operators) > 1:
-            for op in operators[1:]:
-                op.close()
-
-        if comp is not None:
-            print(comp.to_string())
+        for _fk, comp in results:
+            if comp is not None:
+                print(comp.to_string())
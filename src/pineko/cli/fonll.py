@@ -5,7 +5,13 @@ import rich_click as click
 
 from .. import fonll, theory, theory_card
 from ..fonll import TheoryCardError
-from ._base import command, config_option, load_config
+from ._base import (
+    command,
+    config_option,
+    load_config,
+    shard_by_cost_option,
+    shard_option,
+)
 
 
 @command.group("fonll")
@@ -79,7 +85,14 @@ def tcards(theoryid):
 @click.option(
     "--int-cores", default=1, show_default=True, help="number of integration cores"
 )
-def ekos(theoryid, datasets, overwrite, int_cores, ipd=4, iil=True):
+@click.option(
+    "--cores",
+    default=None,
+    type=click.IntRange(min=1),
+    help="total number of cores: EKOs are computed concurrently and the integration "
+    "cores of each of them are chosen according to its number of Q2 points",
+)
+def ekos(theoryid, datasets, overwrite, int_cores, cores, ipd=4, iil=True):
     """Command to generate numerical FONLL ekos.
 
     1. Create all the operator cards for the different flavor patches.
@@ -101,7 +114,7 @@ def ekos(theoryid, datasets, overwrite, int_cores, ipd=4, iil=True):
             silent=False,
             clear_logs=True,
             overwrite=overwrite,
-        ).ekos(int_cores=int_cores)
+        ).ekos(int_cores=int_cores, cores=cores)
 
     # Now _attempt_ to inherit the ekos
     # _if_ a discrepancy is found between the eko and the grid, recompute
@@ -139,7 +152,9 @@ def ekos(theoryid, datasets, overwrite, int_cores, ipd=4, iil=True):
     help="List of PDF sets to be used for comparison; single string where sets are separated by commas",
 )
 @click.option("--overwrite", is_flag=True, help="Allow files to be overwritten")
-def fks(theoryid, datasets, pdfs, overwrite):
+@shard_option
+@shard_by_cost_option
+def fks(theoryid, datasets, pdfs, overwrite, shard, shard_by_cost):
     """Command to generate numerical FONLL FK tables.
 
     1. Produce the 7 FK tables needed for numerical FONLL.
@@ -154,8 +169,18 @@ def fks(theoryid, datasets, pdfs, overwrite):
             silent=False,
             clear_logs=True,
             overwrite=overwrite,
+            shard=shard,
+            shard_by_cost=shard_by_cost,
         ).fks(pdfs)
 
+    # the combination needs the FK tables of all the shards
+    if shard is not None:
+        rich.print(
+            "Skipping the combination: run again without --shard once all the "
+            "shards are completed"
+        )
+        return
+
     # combine
     for dataset in datasets:
         fonll.assembly_combined_fk(
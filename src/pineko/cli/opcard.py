@@ -7,7 +7,7 @@ import rich_click as click
 import yaml
 
 from .. import evolve
-from ._base import command
+from ._base import command, trim_xgrid_option
 
 
 @command.command("opcard")
@@ -18,12 +18,14 @@ from ._base import command
     "--ipd", default=4, show_default=True, help="interpolation polynomial degree"
 )
 @click.option("--iil", default=True, show_default=True, help="interpolation is log")
+@trim_xgrid_option
 def subcommand(
     pineappl_path,
     thcard_path,
     opcard_path,
     ipd,
     iil,
+    trim_xgrid,
 ):
     """Write EKO card for PineAPPL grid.
 
@@ -37,5 +39,5 @@ def subcommand(
     tcard = yaml.safe_load(pathlib.Path(thcard_path).read_text(encoding="utf-8"))
     opcard_path = pathlib.Path(opcard_path)
     _x_grid, q2_grid = evolve.write_operator_card_from_file(
-        pineappl_path, opcard_path, tcard, ipd, iil
+        pineappl_path, opcard_path, tcard, ipd, iil, trim_xgrid
     )
@@ -0,0 +1,64 @@
+"""CLI entry point to the predictions of an FK table."""
+
+import numpy as np
+import pandas as pd
+import pineappl
+import rich
+import rich_click as click
+
+from .. import predict
+from ._base import command
+
+
+@command.command("predict")
+@click.argument("fktable_path", metavar="FKTABLE", type=click.Path(exists=True))
+@click.argument("pdfset", type=click.STRING)
+@click.option(
+    "--members",
+    default="0",
+    show_default=True,
+    help="members of the PDF set, 'all' or a single string where members are "
+    "separated by commas",
+)
+@click.option(
+    "-o",
+    "--output",
+    default=None,
+    type=click.Path(),
+    help="write the predictions to a CSV file, instead of printing them",
+)
+def subcommand(fktable_path, pdfset, members, output):
+    """Compute the predictions of an FK table for the members of a PDF set.
+
+    The FK table in FKTABLE is decoded only once, and convolved with all the
+    MEMBERS of PDFSET (for all the convolutions) at once.
+    """
+    if members == "all":
+        members = None
+    else:
+        try:
+            members = [int(member) for member in members.split(",")]
+        except ValueError as err:
+            raise click.BadParameter(
+                "expected 'all' or comma separated members", param_hint="--members"
+            ) from err
+    fktable = pineappl.fk_table.FkTable.read(fktable_path)
+    predictions = predict.predict(fktable, pdfset, members)
+    if members is None:
+        members = range(predictions.shape[0])
+
+    df = pd.DataFrame()
+    # add bin info
+    bin_specs = np.array(fktable.bin_limits())
+    for d in range(fktable.bin_dimensions()):
+        df[f"O{d+1} left"] = bin_specs[:, d, 0]
+        df[f"O{d+1} right"] = bin_specs[:, d, 1]
+    # add data
+    for member, values in zip(members, predictions):
+        df[f"member {member}"] = values
+
+    if output is not None:
+        df.to_csv(output, index=False)
+        rich.print(f"[green]Success:[/] Wrote predictions to {output}")
+    else:
+        rich.print(df.to_string())
@@ -1,9 +1,21 @@
 """'theory' mode of CLI."""
 
+import pathlib
+import sys
+
+import rich
 import rich_click as click
 
-from .. import theory
-from ._base import command, config_option, load_config
+from .. import configs, sharding, theory
+from ._base import (
+    command,
+    config_option,
+    load_config,
+    max_memory_option,
+    shard_by_cost_option,
+    shard_option,
+    trim_xgrid_option,
+)
 
 
 @command.group("theory")
@@ -33,11 +45,44 @@ def inherit_grids(source_theory_id, target_theory_id, datasets, overwrite):
     "--ipd", default=4, show_default=True, help="interpolation polynomial degree"
 )
 @click.option("--iil", default=True, show_default=True, help="interpolation is log")
-def opcards(theory_id, datasets, overwrite, ipd, iil):
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Regenerate existing files only if their inputs changed",
+)
+@click.option(
+    "--union",
+    default=None,
+    type=click.Choice(["dataset", "theory"]),
+    help="share a single EKO, computed over the union of the Q2 points, among all the "
+    "grids of each dataset (or of the whole theory)",
+)
+@trim_xgrid_option
+@shard_option
+@shard_by_cost_option
+def opcards(
+    theory_id,
+    datasets,
+    overwrite,
+    incremental,
+    ipd,
+    iil,
+    union,
+    trim_xgrid,
+    shard,
+    shard_by_cost,
+):
     """Write EKO card for all FK tables in all datasets."""
-    theory.TheoryBuilder(theory_id, datasets, overwrite=overwrite).opcards(
-        ipd=ipd, iil=iil
-    )
+    results = theory.TheoryBuilder(
+        theory_id,
+        datasets,
+        overwrite=overwrite,
+        incremental=incremental,
+        shard=shard,
+        shard_by_cost=shard_by_cost,
+    ).opcards(ipd=ipd, iil=iil, union=union, trim_xgrid=trim_xgrid)
+    if results is not None and not all(result.success for result in results):
+        sys.exit(1)
 
 
 @theory_.command()
@@ -51,14 +96,56 @@ def opcards(theory_id, datasets, overwrite, ipd, iil):
     help="Erease previos logs (instead of appending)",
 )
 @click.option("--overwrite", is_flag=True, help="Allow files to be overwritten")
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Regenerate existing files only if their inputs changed",
+)
 @click.option(
     "--int-cores", default=1, show_default=True, help="number of integration cores"
 )
-def ekos(theory_id, datasets, silent, clear_logs, overwrite, int_cores):
+@click.option(
+    "--cores",
+    default=None,
+    type=click.IntRange(min=1),
+    help="total number of cores: EKOs are computed concurrently and the integration "
+    "cores of each of them are chosen according to its number of Q2 points",
+)
+@click.option(
+    "--max-int-cores",
+    default=8,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="maximum number of integration cores of a single EKO (used with --cores)",
+)
+@shard_option
+@shard_by_cost_option
+def ekos(
+    theory_id,
+    datasets,
+    silent,
+    clear_logs,
+    overwrite,
+    incremental,
+    int_cores,
+    cores,
+    max_int_cores,
+    shard,
+    shard_by_cost,
+):
     """Compute EKOs for all FK tables in all datasets."""
-    theory.TheoryBuilder(
-        theory_id, datasets, silent=silent, clear_logs=clear_logs, overwrite=overwrite
-    ).ekos(int_cores=int_cores)
+    results = theory.TheoryBuilder(
+        theory_id,
+        datasets,
+        silent=silent,
+        clear_logs=clear_logs,
+        overwrite=overwrite,
+        incremental=incremental,
+        shard=shard,
+        shard_by_cost=shard_by_cost,
+    ).ekos(int_cores=int_cores, cores=cores, max_int_cores=max_int_cores)
+    if results is not None and not all(result.success for result in results):
+        sys.exit(1)
 
 
 @theory_.command()
@@ -91,12 +178,305 @@ def inherit_ekos(source_theory_id, target_theory_id, datasets, overwrite):
     help="Erease previos logs (instead of appending)",
 )
 @click.option("--overwrite", is_flag=True, help="Allow files to be overwritten")
-def fks(theory_id, datasets, pdfs, silent, clear_logs, overwrite):
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Regenerate existing files only if their inputs changed",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="number of FK tables computed in parallel",
+)
+@click.option(
+    "--worker",
+    is_flag=True,
+    help="run as one of several independent workers (possibly on different nodes), "
+    "claiming grids through lock files in the state folder",
+)
+@click.option(
+    "--stale-after",
+    default=600.0,
+    show_default=True,
+    type=click.FloatRange(min=0, min_open=True),
+    help="seconds after which the claim of an unresponsive worker is taken over",
+)
+@click.option(
+    "--scale-theories",
+    default=None,
+    type=click.STRING,
+    help="theory ids differing only by the scale variations, whose FK tables are "
+    "computed as well with the same EKOs; single string where ids are separated by commas",
+)
+@click.option(
+    "--compare-jobs",
+    default=0,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="compare the FK tables with the grids (see --pdfs) in as many background "
+    "processes, writing the FK tables immediately",
+)
+@max_memory_option
+@shard_option
+@shard_by_cost_option
+def fks(
+    theory_id,
+    datasets,
+    pdfs,
+    silent,
+    clear_logs,
+    overwrite,
+    incremental,
+    jobs,
+    worker,
+    stale_after,
+    scale_theories,
+    compare_jobs,
+    max_memory,
+    shard,
+    shard_by_cost,
+):
     """Compute FK tables in all datasets."""
     pdfs = pdfs.split(",") if pdfs is not None else pdfs
-    theory.TheoryBuilder(
-        theory_id, datasets, silent=silent, clear_logs=clear_logs, overwrite=overwrite
-    ).fks(pdfs)
+    if scale_theories is not None:
+        try:
+            scale_theories = [int(tid) for tid in scale_theories.split(",")]
+        except ValueError as err:
+            raise click.BadParameter(
+                "expected comma separated theory ids", param_hint="--scale-theories"
+            ) from err
+    builder = theory.TheoryBuilder(
+        theory_id,
+        datasets,
+        silent=silent,
+        clear_logs=clear_logs,
+        overwrite=overwrite,
+        incremental=incremental,
+        shard=shard,
+        shard_by_cost=shard_by_cost,
+        max_memory=max_memory,
+    )
+    if worker:
+        if overwrite:
+            raise click.UsageError("--worker can not be used with --overwrite")
+        if shard is not None:
+            raise click.UsageError("--worker can not be used with --shard")
+        results = builder.fks_worker(
+            pdfs,
+            stale_after=stale_after,
+            scale_theories=scale_theories,
+            compare_jobs=compare_jobs,
+        )
+    else:
+        results = builder.fks(
+            pdfs, jobs=jobs, scale_theories=scale_theories, compare_jobs=compare_jobs
+        )
+    if results is not None and not all(result.success for result in results):
+        sys.exit(1)
+
+
+@theory_.command()
+@click.argument("theory_id", type=click.INT)
+@click.argument("datasets", type=click.STRING, nargs=-1)
+@click.option(
+    "--pdfs",
+    "-p",
+    default=None,
+    type=click.STRING,
+    help="List of PDF sets to be used for comparison; single string where sets are "
+    "separated by commas",
+)
+@click.option("--silent", is_flag=True, help="Suppress logs")
+@click.option(
+    "-cl",
+    "--clear-logs",
+    is_flag=True,
+    help="Erease previos logs (instead of appending)",
+)
+@click.option("--overwrite", is_flag=True, help="Allow files to be overwritten")
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Regenerate existing files only if their inputs changed",
+)
+@click.option(
+    "--ipd", default=4, show_default=True, help="interpolation polynomial degree"
+)
+@click.option("--iil", default=True, show_default=True, help="interpolation is log")
+@click.option(
+    "--union",
+    default=None,
+    type=click.Choice(["dataset", "theory"]),
+    help="share a single EKO, computed over the union of the Q2 points, among all the "
+    "grids of each dataset (or of the whole theory)",
+)
+@trim_xgrid_option
+@click.option(
+    "--cores",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="total number of cores shared by EKO computations and FK table evolutions",
+)
+@click.option(
+    "--max-int-cores",
+    default=8,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="maximum number of integration cores of a single EKO",
+)
+@max_memory_option
+def build(
+    theory_id,
+    datasets,
+    pdfs,
+    silent,
+    clear_logs,
+    overwrite,
+    incremental,
+    ipd,
+    iil,
+    union,
+    trim_xgrid,
+    cores,
+    max_int_cores,
+    max_memory,
+):
+    """Write operator cards, compute EKOs and FK tables in a single pass."""
+    pdfs = pdfs.split(",") if pdfs is not None else pdfs
+    results = theory.TheoryBuilder(
+        theory_id,
+        datasets,
+        silent=silent,
+        clear_logs=clear_logs,
+        overwrite=overwrite,
+        incremental=incremental,
+        max_memory=max_memory,
+    ).build(
+        pdfs=pdfs,
+        ipd=ipd,
+        iil=iil,
+        union=union,
+        cores=cores,
+        max_int_cores=max_int_cores,
+        trim_xgrid=trim_xgrid,
+    )
+    if not all(result.success for result in results):
+        sys.exit(1)
+
+
+@theory_.command()
+@click.argument("theory_id", type=click.INT)
+@click.argument("datasets", type=click.STRING, nargs=-1)
+@click.option(
+    "--pdfs",
+    "-p",
+    required=True,
+    type=click.STRING,
+    help="List of PDF sets, one for each convolution; single string where sets are "
+    "separated by commas",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="number of comparisons run in parallel",
+)
+@click.option(
+    "--threshold",
+    default=5.0,
+    show_default=True,
+    help="threshold in permille to accept Grid -> FK",
+)
+@click.option(
+    "-o",
+    "--output",
+    default=None,
+    type=click.Path(path_type=pathlib.Path),
+    help="path of the comparison table, CSV or Parquet according to the suffix "
+    "(default: THEORY_ID-comparison.csv in the FK logs folder, if configured, "
+    "or in the current directory)",
+)
+def compare(theory_id, datasets, pdfs, jobs, threshold, output):
+    """Compare all the FK tables of a theory with their grids."""
+    builder = theory.TheoryBuilder(theory_id, datasets)
+    results, comparisons = builder.compare_fks(
+        pdfs.split(","), jobs=jobs, threshold=threshold
+    )
+    if output is None:
+        # keep the distributed FK tables folder clean
+        folder = configs.configs["paths"]["logs"]["fk"] or pathlib.Path.cwd()
+        folder.mkdir(parents=True, exist_ok=True)
+        output = folder / f"{theory_id}-comparison.csv"
+    if output.suffix == ".parquet":
+        comparisons.to_parquet(output, index=False)
+    else:
+        comparisons.to_csv(output, index=False)
+    rich.print(f"Comparison table written to {output}")
+
+    passed = True
+    for (dataset, name), table in comparisons.groupby(["dataset", "grid"], sort=False):
+        error = table["permille_error"][table["checked"]].abs().max()
+        if table["passed"].all():
+            rich.print(f"[green]Passed:[/] {dataset}/{name} ({error:.3g} permille)")
+        else:
+            rich.print(f"[red]Failed:[/] {dataset}/{name} ({error:.3g} permille)")
+            passed = False
+    if not passed or not all(result.success for result in results):
+        sys.exit(1)
+
+
+@theory_.command()
+@click.argument("theory_id", type=click.STRING)
+@click.option(
+    "--command",
+    "command_",
+    default=None,
+    type=click.Choice(["opcards", "ekos", "fks"]),
+    help="only merge the reports of the given command",
+)
+@click.option(
+    "--slowest",
+    default=5,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="number of slowest grids to list",
+)
+def merge_reports(theory_id, command_, slowest):
+    """Summarize the reports of the shards of a sharded run."""
+    merged = sharding.merge_reports(theory_id, command_)
+    if len(merged) == 0:
+        rich.print(
+            f"[red]Error:[/] no reports found for theory {theory_id} "
+            f"in {sharding.reports_path()}"
+        )
+        sys.exit(1)
+    complete = True
+    for name, summary in merged.items():
+        grids = summary["grids"]
+        failed = [grid for grid in grids if not grid["success"]]
+        rich.print(
+            f"[bold]{name}[/]: {len(summary['shards'])}/{summary['count']} shards, "
+            f"{len(grids) - len(failed)}/{len(grids)} tasks completed, "
+            f"{summary['elapsed']:.1f} s in total ({summary['wall']:.1f} s longest shard)"
+        )
+        if len(summary["missing"]) > 0:
+            rich.print(f"[red]  Missing shards:[/] {summary['missing']}")
+        for grid in failed:
+            rich.print(f"[red]  Failed:[/] {grid['name']} (shard {grid['shard']})")
+        for grid in sorted(grids, key=lambda grid: -grid["elapsed"])[:slowest]:
+            rich.print(
+                f"  {grid['name']}: {grid['elapsed']:.1f} s "
+                f"(shard {grid['shard']} on {grid['host']})"
+            )
+        complete = complete and len(failed) == 0 and len(summary["missing"]) == 0
+    if not complete:
+        sys.exit(1)
 
 
 @theory_.command()
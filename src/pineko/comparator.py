@@ -4,6 +4,7 @@ import numpy as np
 import pandas as pd
 import pineappl
 
+from . import pdfcache, predcache, predict
 from .check import is_dis
 
 
@@ -11,8 +12,22 @@ class GridtoFKError(Exception):
     """Raised when the difference between the Grid and FK table is above some threshold."""
 
 
+class FKtoFKError(Exception):
+    """Raised when the difference between two FK tables is above some threshold."""
+
+
 def compare(
-    pine, fktable, max_as, max_al, pdfs, scales, as_pdf_idx=0, threshold=5.0, q2_min=1.0
+    pine,
+    fktable,
+    max_as,
+    max_al,
+    pdfs,
+    scales,
+    as_pdf_idx=0,
+    threshold=5.0,
+    q2_min=1.0,
+    order_mask=None,
+    grid_hash=None,
 ):
     """Build comparison table.
 
@@ -39,15 +54,19 @@ def compare(
         threshold then raise an error
     q2_min: float
         the minimum value of Q2 to check the predictions
+    order_mask: np.ndarray or None
+        orders of the grid included in the FK table, if not all those up to
+        ``max_as`` and ``max_al``
+    grid_hash: str or None
+        hash of the grid file, to reuse its predictions if already computed
+        (see :mod:`pineko.predcache`)
 
     Returns
     -------
     df : pd.DataFrame
         comparison table
     """
-    import lhapdf  # pylint: disable=import-error,import-outside-toplevel
-
-    pdfsets = [lhapdf.mkPDF(pdf, 0) for pdf in pdfs]
+    pdfsets = [pdfcache.load(pdf) for pdf in pdfs]
 
     # Check compatibilty between the FK table and the grid
     assert len(fktable.convolutions) == len(
@@ -69,23 +88,27 @@ def compare(
             )
 
     # TODO: Add checks that verify the compatibility with the PDFs
-    order_mask = pineappl.boc.Order.create_mask(
-        orders=pine.orders(), max_as=max_as, max_al=max_al, logs=True
-    )
+    if order_mask is None:
+        order_mask = pineappl.boc.Order.create_mask(
+            orders=pine.orders(), max_as=max_as, max_al=max_al, logs=True
+        )
     # Perform the convolutions of the Grids and FK tables (This is now much simpler!)
-    pine_predictions = pine.convolve(
-        pdg_convs=pine.convolutions,
-        xfxs=[pdf.xfxQ2 for pdf in pdfsets],
-        alphas=pdfsets[as_pdf_idx].alphasQ2,
-        order_mask=order_mask,
-        xi=[scales],
-    )
-    fktable_predictions = fktable.convolve(
-        pdg_convs=fktable.convolutions,
-        xfxs=[pdf.xfxQ2 for pdf in pdfsets],
+    pine_predictions = predcache.cached(
+        grid_hash,
+        [(pdf, 0) for pdf in pdfs],
+        order_mask,
+        scales,
+        as_pdf_idx,
+        lambda: pine.convolve(
+            pdg_convs=pine.convolutions,
+            xfxs=[pdf.xfxQ2 for pdf in pdfsets],
+            alphas=pdfsets[as_pdf_idx].alphasQ2,
+            order_mask=order_mask,
+            xi=[scales],
+        ),
     )
     before = np.array(pine_predictions)
-    after = np.array(fktable_predictions)
+    after = fk_predictions(fktable, pdfs)
 
     df = pd.DataFrame()
     # add bin info
@@ -99,11 +122,7 @@ def compare(
     df["permille_error"] = (after / before - 1.0) * 1000.0
 
     # For some DIS girds, remove Q2 points that are below 1 GeV2
-    check_df = (
-        df[df["O2 left"] >= q2_min]
-        if "O2 left" in df.columns and is_dis(pine.convolutions)
-        else df
-    )
+    check_df = df[checked_bins(df, pine.convolutions, q2_min)]
     if (check_df["permille_error"].abs() >= threshold).any():
         print(check_df)
         raise GridtoFKError(
@@ -111,3 +130,102 @@ def compare(
         )
 
     return df
+
+
+def fk_predictions(fktable, pdfs):
+    """Compute the predictions of an FK table for the central members of PDF sets.
+
+    The FK table is decoded once into a dense array, and the PDF sets are
+    tabulated on its x grid at its initial scale (see
+    :func:`pineko.pdfcache.tabulate`).
+
+    Parameters
+    ----------
+    fktable : pineappl.fk_table.FkTable
+        FK table
+    pdfs : list(str)
+        list of the PDF set names, a single one for all the convolutions or
+        one for each of them
+
+    Returns
+    -------
+    np.ndarray :
+        predictions
+    """
+    dense = predict.DenseFkTable.read(fktable)
+    xfxs = [pdfcache.tabulate(pdf, dense.x_grid, dense.fac0) for pdf in pdfs]
+    return dense.convolve(*xfxs)[0]
+
+
+def checked_bins(df, convolutions, q2_min=1.0):
+    """Select the bins of a comparison table to be checked.
+
+    For DIS grids, the bins below ``q2_min`` are not checked.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        comparison table, see :func:`compare`
+    convolutions : list(pineappl.convolutions.Conv)
+        convolutions of the grid
+    q2_min: float
+        the minimum value of Q2 to check the predictions
+
+    Returns
+    -------
+    pd.Series :
+        whether each bin is checked
+    """
+    if "O2 left" in df.columns and is_dis(convolutions):
+        return df["O2 left"] >= q2_min
+    return pd.Series(True, index=df.index)
+
+
+def compare_fktables(reference, fktable, pdfs, threshold=0.1):
+    """Build comparison table of two FK tables of the same grid.
+
+    This allows to validate an FK table computed with some approximation (e.g.
+    a trimmed x grid, see :func:`pineko.evolve.trimmed_xgrid`) against the
+    reference one.
+
+    Parameters
+    ----------
+    reference : pineappl.fk_table.FkTable
+        reference FK table
+    fktable : pineappl.fk_table.FkTable
+        FK table to validate
+    pdfs : list(str)
+        list of the PDF set names
+    threshold: float
+        check if the difference between the FK tables is above the threshold
+        (in permille) then raise an error
+
+    Returns
+    -------
+    df : pd.DataFrame
+        comparison table
+    """
+    if np.array(reference.bin_limits()).shape != np.array(fktable.bin_limits()).shape:
+        raise ValueError("The FK tables have different bins")
+
+    before = fk_predictions(reference, pdfs)
+    after = fk_predictions(fktable, pdfs)
+
+    df = pd.DataFrame()
+    # add bin info
+    bin_specs = np.array(reference.bin_limits())
+    for d in range(reference.bin_dimensions()):
+        df[f"O{d+1} left"] = bin_specs[:, d, 0]
+        df[f"O{d+1} right"] = bin_specs[:, d, 1]
+    # add data
+    df["Reference"] = before
+    df["FkTable"] = after
+    df["permille_error"] = (after / before - 1.0) * 1000.0
+
+    if (df["permille_error"].abs() >= threshold).any():
+        print(df)
+        raise FKtoFKError(
+            f"The difference between the FK tables is above {threshold} permille."
+        )
+
+    return df
@@ -21,6 +21,16 @@ NEEDED_KEYS = [
     "ekos",
 ]
 
+EKO_STORE_KEY = "eko_store"
+OPERATOR_CACHE_KEY = "operator_cache"
+PREDICTION_CACHE_KEY = "prediction_cache"
+OPTIONAL_KEYS = [EKO_STORE_KEY, OPERATOR_CACHE_KEY, PREDICTION_CACHE_KEY]
+"Optional paths, the corresponding features are disabled if not set"
+
+STATE_KEY = "state"
+DEFAULT_STATE = ".pineko"
+"Default folder (relative to the root) of the state of the runs, e.g. locks and manifests"
+
 GENERIC_OPTIONS = "general"
 
 
@@ -90,11 +100,26 @@ def enhance_paths(configs_):
         else:
             configs_["paths"][key] = pathlib.Path(configs_["paths"][key])
 
+    # optional keys which are by default absent
+    for key in OPTIONAL_KEYS:
+        if key not in configs_["paths"]:
+            continue
+        if pathlib.Path(configs_["paths"][key]).anchor == "":
+            configs_["paths"][key] = configs_["paths"]["root"] / configs_["paths"][key]
+        else:
+            configs_["paths"][key] = pathlib.Path(configs_["paths"][key])
+
+    # the state of the runs is kept outside of the (distributed) output folders
+    state = pathlib.Path(configs_["paths"].get(STATE_KEY, DEFAULT_STATE))
+    if state.anchor == "":
+        state = configs_["paths"]["root"] / state
+    configs_["paths"][STATE_KEY] = state
+
     # optional keys which are by default None
     if "logs" not in configs_["paths"]:
         configs_["paths"]["logs"] = {}
 
-    for key in ["eko", "fk"]:
+    for key in ["eko", "fk", "reports"]:
         if key not in configs_["paths"]["logs"]:
             configs_["paths"]["logs"][key] = None
         elif pathlib.Path(configs_["paths"]["logs"][key]).anchor == "":
@@ -107,6 +132,22 @@ def enhance_paths(configs_):
             )
 
 
+def state_path(*parts):
+    """Folder of the state of the runs, e.g. locks and manifests.
+
+    Parameters
+    ----------
+    *parts : str or int
+        subfolders, e.g. the kind of state and the theory id
+
+    Returns
+    -------
+    pathlib.Path :
+        folder path, it may not exist yet
+    """
+    return configs["paths"][STATE_KEY].joinpath(*map(str, parts))
+
+
 def detect(path=None):
     """Autodetect configuration file path.
 
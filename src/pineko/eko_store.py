@@ -0,0 +1,126 @@
+"""Content addressed storage of EKOs.
+
+EKOs are identified by a hash of the runcards eko actually consumes, i.e. the
+(already converted) theory card and the operator card. Identical cards produce
+identical operators, so each of them is computed only once and shared among
+all the grids and theories requesting it, by linking the per-grid EKO to the
+stored one.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import pathlib
+import uuid
+
+from . import configs
+
+IRRELEVANT_CONFIGS = ["n_integration_cores"]
+"""Operator card configurations not affecting the computed operator."""
+
+
+def path():
+    """Determine the storage folder.
+
+    Returns
+    -------
+    pathlib.Path or None :
+        storage folder, or ``None`` if the storage is not configured
+    """
+    return configs.configs["paths"].get(configs.EKO_STORE_KEY)
+
+
+def card_hash(theory, operator):
+    """Compute the hash identifying an EKO.
+
+    Parameters
+    ----------
+    theory : dict
+        theory card, in the format consumed by eko
+    operator : dict
+        operator card, in the format consumed by eko
+
+    Returns
+    -------
+    str :
+        hexadecimal digest
+    """
+    operator = copy.deepcopy(dict(operator))
+    operator["configs"] = {
+        k: v for k, v in operator["configs"].items() if k not in IRRELEVANT_CONFIGS
+    }
+    content = json.dumps(
+        {"theory": theory, "operator": operator}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def entry(digest):
+    """Path of a stored EKO.
+
+    Parameters
+    ----------
+    digest : str
+        EKO hash
+
+    Returns
+    -------
+    pathlib.Path :
+        stored EKO path
+    """
+    return path() / f"{digest}.tar"
+
+
+def store(digest, compute, overwrite=False):
+    """Compute a EKO in the storage, unless already available.
+
+    The EKO is computed into a temporary file (with a unique name, as the
+    storage may be shared by several nodes), which is atomically moved to its
+    final location, such that concurrent computations never expose a
+    partially written EKO.
+
+    Parameters
+    ----------
+    digest : str
+        EKO hash
+    compute : callable
+        receiving the path where to write the EKO
+    overwrite : bool
+        compute the EKO again, replacing the stored one (e.g. if corrupted)
+
+    Returns
+    -------
+    pathlib.Path :
+        stored EKO path
+    bool :
+        whether the EKO was already available
+    """
+    target = entry(digest)
+    if target.exists() and not overwrite:
+        return target, True
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.parent / f".{digest}-{uuid.uuid4().hex}.tar"
+    try:
+        compute(tmp)
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return target, False
+
+
+def link(target, source):
+    """Link a EKO to the stored one.
+
+    Parameters
+    ----------
+    target : pathlib.Path
+        per-grid EKO path
+    source : pathlib.Path
+        stored EKO path
+    """
+    target = pathlib.Path(target)
+    if target.is_symlink() or target.exists():
+        target.unlink()
+    target.symlink_to(source)
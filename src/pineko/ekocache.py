@@ -0,0 +1,123 @@
+"""Extracted EKOs shared by the evolutions of a run.
+
+Reading an EKO (see :meth:`eko.EKO.read`) extracts its whole archive into a
+new temporary folder, which is removed when the EKO is closed. Shared EKOs
+(see :meth:`pineko.theory.TheoryBuilder.union_opcards`) and stored ones (see
+:mod:`pineko.eko_store`) are used by many grids, so they would be extracted
+again for each of them. Instead, each archive is extracted only once, into the
+state folder (see :func:`pineko.configs.state_path`), and all the evolutions
+(even in different processes) read the extracted folder directly.
+
+The extracted folders are named after the archive path, its size and its
+modification time, such that a modified archive is extracted again.
+"""
+
+import hashlib
+import pathlib
+import shutil
+import tarfile
+import uuid
+
+import eko
+from eko.io import raw
+
+from . import configs
+
+
+def folder():
+    """Determine the folder of the extracted EKOs.
+
+    Returns
+    -------
+    pathlib.Path :
+        folder of the extracted EKOs
+    """
+    return configs.state_path("ekos")
+
+
+def _key(path):
+    """Name the extracted folders of an archive, and its current version."""
+    path = pathlib.Path(path).resolve()
+    stat = path.stat()
+    name = hashlib.sha256(str(path).encode()).hexdigest()[:16]
+    version = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return name, f"{name}-{version.hexdigest()[:16]}"
+
+
+def extract(path):
+    """Extract an EKO, unless already extracted.
+
+    The archive is extracted into a temporary folder (with a unique name, as
+    several processes may extract it concurrently), which is atomically moved
+    to its final location. The folders of former versions of the archive are
+    removed.
+
+    Parameters
+    ----------
+    path : os.PathLike
+        path to the EKO archive (links are followed)
+
+    Returns
+    -------
+    pathlib.Path :
+        extracted folder
+    """
+    name, key = _key(path)
+    target = folder() / key
+    if target.exists():
+        return target
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.parent / f".{key}-{uuid.uuid4().hex}"
+    try:
+        with tarfile.open(pathlib.Path(path).resolve()) as tar:
+            raw.safe_extractall(tar, tmp)
+        try:
+            tmp.rename(target)
+        except OSError:
+            # extracted concurrently by another process
+            if not target.exists():
+                raise
+    finally:
+        if tmp.exists():
+            shutil.rmtree(tmp)
+    for stale in target.parent.glob(f"{name}-*"):
+        if stale != target:
+            shutil.rmtree(stale, ignore_errors=True)
+    return target
+
+
+def read(path):
+    """Read an EKO from its extracted folder.
+
+    The operators are still loaded (and decompressed) by each reading, only
+    the extraction is shared. The returned EKO must *not* be closed, since
+    closing it removes the extracted folder.
+
+    Parameters
+    ----------
+    path : os.PathLike
+        path to the EKO archive
+
+    Returns
+    -------
+    eko.EKO :
+        the EKO, in read-only mode
+    """
+    return eko.EKO.read(extract(path), extract=False)
+
+
+def remove(paths):
+    """Remove the extracted folders of some EKOs.
+
+    Parameters
+    ----------
+    paths : iterable(os.PathLike)
+        paths to the EKO archives (links are followed)
+    """
+    for path in paths:
+        path = pathlib.Path(path)
+        if not path.exists():
+            continue
+        name, _ = _key(path)
+        for extracted in folder().glob(f"{name}-*"):
+            shutil.rmtree(extracted, ignore_errors=True)
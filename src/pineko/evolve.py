@@ -1,29 +1,35 @@
 """Tools related to evolution/eko."""
 
 import copy
-import hashlib
+import dataclasses
 import json
 import logging
 import os
 import pathlib
+import tempfile
 from importlib import metadata
 from typing import Optional, Union
 
-import eko
 import numpy as np
 import pineappl
 import rich
 import rich.box
 import rich.panel
 import yaml
-from eko import basis_rotation
-from eko.interpolation import XGrid
-from eko.io import manipulate
 from eko.io.types import ScaleVariationsMethod
 from eko.matchings import Atlas, nf_default
 from eko.quantities import heavy_quarks
 
-from . import check, comparator, opcard_template, version
+from . import (
+    alphas,
+    check,
+    comparator,
+    gridcache,
+    opcache,
+    opcard_template,
+    rotations,
+    version,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -68,21 +74,27 @@ def construct_atlas(tcard):
     return atlas
 
 
-def set_fktable_metadata(fktable, theory_meta, grid_path=None):
-    """Store the common FK metadata and, if available, grid provenance."""
+def set_fktable_metadata(fktable, theory_meta, grid_path=None, grid_hash=None):
+    """Store the common FK metadata and, if available, grid provenance.
+
+    The grid hash is computed from ``grid_path``, unless already provided.
+    """
     fktable.set_metadata("pineko_version", version.__version__)
     fktable.set_metadata("theory_card", json.dumps(theory_meta))
     if grid_path is None:
         return
 
     grid_path_obj = pathlib.Path(grid_path).resolve()
-    grid_hash = hashlib.md5(grid_path_obj.read_bytes()).hexdigest()
+    if grid_hash is None:
+        grid_hash = gridcache.file_md5(grid_path_obj)
     fktable.set_metadata("grid_hash", grid_hash)
     fktable.set_metadata("grid_theory", grid_path_obj.parent.name)
     fktable.set_metadata("grid_name", grid_path_obj.name)
 
 
-def construct_empty_fktable(grid, theory_meta, fktable_path, grid_path=None):
+def construct_empty_fktable(
+    grid, theory_meta, fktable_path, grid_path=None, grid_hash=None
+):
     """Construct and write a structurally valid but numerically empty FK table.
 
     "Empty" means the FK table carries a single trivial order ``(0,0,0,0,0)``
@@ -108,6 +120,10 @@ def construct_empty_fktable(grid, theory_meta, fktable_path, grid_path=None):
         target path for convolved grid
     theory_meta: dict
         a dictionary containing the theory metadata
+    grid_path : str or os.PathLike or None
+        path to the grid file, used to store grid hash metadata
+    grid_hash : str or None
+        MD5 hash of the grid file, computed from ``grid_path`` if not given
 
     Returns
     -------
@@ -126,7 +142,7 @@ def construct_empty_fktable(grid, theory_meta, fktable_path, grid_path=None):
         scale_funcs=grid.scales,
     )
     fktable = pineappl.fk_table.FkTable(empty_grid)
-    set_fktable_metadata(fktable, theory_meta, grid_path=grid_path)
+    set_fktable_metadata(fktable, theory_meta, grid_path=grid_path, grid_hash=grid_hash)
     fktable.write_lz4(str(fktable_path))
     return fktable
 
@@ -156,12 +172,45 @@ def get_convolution_suffix(convolution: pineappl.convolutions.Conv) -> str:
     return suffix
 
 
+def trimmed_xgrid(xgrid, xmin, margin):
+    """Drop the nodes of an x grid well below the smallest x needed.
+
+    Since the evolution at some x only depends on the larger ones, the nodes
+    below ``xmin`` are not needed, apart from those used to interpolate
+    around it: ``margin`` of them are kept (in addition to the largest one
+    not above ``xmin``).
+
+    Parameters
+    ----------
+    xgrid : list(float)
+        increasing x grid
+    xmin : float
+        smallest x needed
+    margin : int
+        number of nodes kept below the one not above ``xmin``, usually the
+        interpolation polynomial degree
+
+    Returns
+    -------
+    list(float) :
+        trimmed x grid
+    """
+    xgrid = np.asarray(xgrid)
+    below = np.flatnonzero(xgrid <= xmin)
+    if len(below) == 0:
+        return xgrid.tolist()
+    # always keep enough nodes for the interpolation
+    start = min(max(below[-1] - margin, 0), max(len(xgrid) - margin - 1, 0))
+    return xgrid[start:].tolist()
+
+
 def write_operator_card_from_file(
     pineappl_path: os.PathLike,
     card_path: os.PathLike,
     tcard: dict,
     ipd=4,
     iil=True,
+    trim_xgrid=False,
 ):
     """Generate operator card for a grid.
 
@@ -179,9 +228,9 @@ def write_operator_card_from_file(
     iil:
         interpolation is log, taken from cli.
         Set to default value
-    int_cores:
-        number of integration cores, taken
-        from cli. Set to default value
+    trim_xgrid : bool
+        drop the x grid nodes well below the x range of the grid, see
+        :func:`trimmed_xgrid`
 
     Returns
     -------
@@ -196,13 +245,34 @@ def write_operator_card_from_file(
         raise FileNotFoundError(pineappl_path)
     pineappl_grid = pineappl.grid.Grid.read(pineappl_path)
     pineappl_grid.optimize()
-    return write_operator_card(pineappl_grid, card_path, tcard, ipd, iil)
+    return write_operator_card(pineappl_grid, card_path, tcard, ipd, iil, trim_xgrid)
+
+
+def convolution_card(operators_card: dict, convolution: pineappl.convolutions.Conv):
+    """Set the convolution type in the operator card.
+
+    Parameters
+    ----------
+    operators_card : dict
+        operators card
+    convolution : pineappl.convolutions.Conv
+        the type of convolution
+
+    Returns
+    -------
+    dict :
+        a copy of the operator card, for the given convolution type
+    """
+    op_to_dump = copy.deepcopy(operators_card)
+    op_to_dump["configs"]["polarized"] = convolution.convolution_types.polarized
+    op_to_dump["configs"]["time_like"] = convolution.convolution_types.time_like
+    return op_to_dump
 
 
 def dump_card(
     card_path: Union[str, os.PathLike],
     operators_card: dict,
-    convolution: pineappl.convolutions.Conv,
+    convolution: Optional[pineappl.convolutions.Conv] = None,
 ) -> None:
     """Set polarization and dump operator cards.
 
@@ -212,15 +282,15 @@ def dump_card(
         target path
     operators_card : dict
         operators card to dump
-    convolution : pineappl.convolutions.Conv
-        the type of convolution
+    convolution : pineappl.convolutions.Conv or None
+        the type of convolution, if None the card is dumped as it is
     """
-    op_to_dump = copy.deepcopy(operators_card)
-    op_to_dump["configs"]["polarized"] = convolution.convolution_types.polarized
-    op_to_dump["configs"]["time_like"] = convolution.convolution_types.time_like
-
-    suffix = get_convolution_suffix(convolution)
-    card_path = card_path.parent / f"{card_path.stem}{suffix}.yaml"
+    if convolution is not None:
+        op_to_dump = convolution_card(operators_card, convolution)
+        suffix = get_convolution_suffix(convolution)
+        card_path = card_path.parent / f"{card_path.stem}{suffix}.yaml"
+    else:
+        op_to_dump = operators_card
     with open(card_path, "w", encoding="UTF-8") as f:
         yaml.safe_dump(op_to_dump, f)
         pineko_version = metadata.version("pineko")
@@ -232,21 +302,19 @@ def dump_card(
         )
 
 
-def write_operator_card(
+def build_operator_card(
     pineappl_grid: pineappl.grid.Grid,
-    card_path: Union[str, os.PathLike],
     tcard: dict,
     ipd,
     iil,
+    trim_xgrid=False,
 ):
-    """Generate operator card for this grid.
+    """Generate operator card for this grid, without any convolution type.
 
     Parameters
     ----------
     pineappl_grid : pineappl.grid.Grid
         grid to evolve
-    card_path : str or os.PathLike
-        target path
     tcard: dict
         theory card for the run, since some information in EKO is now required
         in operator card, but before was in the theory card
@@ -254,14 +322,16 @@ def write_operator_card(
         interpolation polynomial degree, taken from cli
     iil:
         interpolation is log, taken from cli
+    trim_xgrid : bool
+        drop the x grid nodes well below the x range of the grid, see
+        :func:`trimmed_xgrid`
 
     Returns
     -------
-    x_grid : np.ndarray
-        written x grid
+    operators_card : dict
+        operator card
     q2_grid : np.ndarray
-        written Q2 grid
-
+        Q2 grid
     """
     # Add a +1 to the orders for the difference in convention between nnpdf and pineappl
     # NB: This would not happen for nFONLL
@@ -319,6 +389,10 @@ def write_operator_card(
         operators_card["xgrid"] = x_grid.tolist()
     else:
         operators_card["xgrid"] = opcard_template.xgrid
+        if trim_xgrid and len(evol_info.x1) > 0:
+            operators_card["xgrid"] = trimmed_xgrid(
+                opcard_template.xgrid, min(evol_info.x1), ipd
+            )
 
     # Add the version of eko and pineko to the operator card
     # using importlib.metadata.version to get the correct tag in editable mode
@@ -341,6 +415,47 @@ def write_operator_card(
         operators_card["configs"]["ev_op_iterations"] = tcard["IterEv"]
         operators_card["configs"]["inversion_method"] = "exact"
 
+    return operators_card, q2_grid
+
+
+def write_operator_card(
+    pineappl_grid: pineappl.grid.Grid,
+    card_path: Union[str, os.PathLike],
+    tcard: dict,
+    ipd,
+    iil,
+    trim_xgrid=False,
+):
+    """Generate operator card for this grid.
+
+    Parameters
+    ----------
+    pineappl_grid : pineappl.grid.Grid
+        grid to evolve
+    card_path : str or os.PathLike
+        target path
+    tcard: dict
+        theory card for the run, since some information in EKO is now required
+        in operator card, but before was in the theory card
+    ipd:
+        interpolation polynomial degree, taken from cli
+    iil:
+        interpolation is log, taken from cli
+    trim_xgrid : bool
+        drop the x grid nodes well below the x range of the grid, see
+        :func:`trimmed_xgrid`
+
+    Returns
+    -------
+    x_grid : np.ndarray
+        written x grid
+    q2_grid : np.ndarray
+        written Q2 grid
+
+    """
+    operators_card, q2_grid = build_operator_card(
+        pineappl_grid, tcard, ipd, iil, trim_xgrid
+    )
     # Get the types of convolutions required for this Grid
     convolutions = pineappl_grid.convolutions
 
@@ -349,6 +464,158 @@ def write_operator_card(
     return operators_card["xgrid"], q2_grid
 
 
+def create_order_mask(orders, max_as, max_al, min_as=None):
+    """Select the orders to be evolved.
+
+    Parameters
+    ----------
+    orders : list(pineappl.boc.Order)
+        orders of the grid
+    max_as : int
+        maximum power of strong coupling
+    max_al : int
+        maximum power of electro-weak coupling
+    min_as: None or int
+        minimum power of strong coupling
+
+    Returns
+    -------
+    np.ndarray :
+        boolean mask over the orders
+    """
+    order_mask = pineappl.boc.Order.create_mask(orders, max_as, max_al, True)
+    if min_as is not None and min_as > 1:
+        # If using min_as, we want to ignore only orders below that (e.g., if min_as=2
+        # and max_as=3, we want NNLO and NLO)
+        ignore_orders = pineappl.boc.Order.create_mask(orders, min_as - 1, max_al, True)
+        order_mask ^= ignore_orders
+    return order_mask
+
+
+def order_ranges(max_as, min_as=None):
+    """Split a range of perturbative orders into the single orders.
+
+    Parameters
+    ----------
+    max_as : int
+        maximum power of strong coupling
+    min_as: None or int
+        minimum power of strong coupling
+
+    Returns
+    -------
+    list(tuple(int, int)) :
+        minimum and maximum power of strong coupling of each order
+    """
+    return [(order, order) for order in range(min_as or 1, max_as + 1)]
+
+
+def order_fktable_path(fktable_path, min_as, max_as):
+    """Name the FK table of a range of perturbative orders.
+
+    The range is appended to the name, before all the extensions, e.g.
+    ``NAME.pineappl.lz4`` becomes ``NAME_as2.pineappl.lz4`` for a single
+    order, and ``NAME_as1-2.pineappl.lz4`` for a range.
+
+    Parameters
+    ----------
+    fktable_path : str or os.PathLike
+        path of the FK table of all the orders
+    min_as : int
+        minimum power of strong coupling
+    max_as : int
+        maximum power of strong coupling
+
+    Returns
+    -------
+    pathlib.Path :
+        path of the FK table of the range
+    """
+    fktable_path = pathlib.Path(fktable_path)
+    stem, dot, extensions = fktable_path.name.partition(".")
+    label = f"{min_as}" if min_as == max_as else f"{min_as}-{max_as}"
+    return fktable_path.with_name(f"{stem}_as{label}{dot}{extensions}")
+
+
+def evolution_nbytes(nconv, norders, npids, nx):
+    """Estimate the memory needed to evolve a single bin of a grid.
+
+    The evolution of each order of a bin produces (at most) a dense subgrid
+    for each combination of the input PDFs.
+
+    Parameters
+    ----------
+    nconv : int
+        number of convolutions
+    norders : int
+        number of orders evolved
+    npids : int
+        number of input PDFs
+    nx : int
+        number of input x points
+
+    Returns
+    -------
+    int :
+        estimated size in bytes
+    """
+    return 8 * max(norders, 1) * (npids * nx) ** nconv
+
+
+def bin_chunks(nbins, bin_nbytes, max_bytes):
+    """Split the bins of a grid in consecutive chunks, evolved one at a time.
+
+    Parameters
+    ----------
+    nbins : int
+        number of bins
+    bin_nbytes : int
+        estimated memory needed by a single bin, see :func:`evolution_nbytes`
+    max_bytes : int
+        memory budget of a chunk
+
+    Returns
+    -------
+    list(list(int)) :
+        the bins of each chunk (at least one)
+    """
+    size = max(int(max_bytes // bin_nbytes), 1)
+    return [
+        list(range(start, min(start + size, nbins))) for start in range(0, nbins, size)
+    ]
+
+
+@dataclasses.dataclass
+class ScaleChoice:
+    """A choice of scales (and orders), for which an FK table is produced.
+
+    Parameters
+    ----------
+    fktable_path : str or os.PathLike
+        target path for convolved grid
+    xir : float
+        renormalization scale variation
+    xif : float
+        factorization scale variation
+    xia : float
+        fragmentation scale variation
+    theory_meta : dict or None
+        card containing the theory parameters, if different from the common one
+    max_as : int or None
+        maximum power of strong coupling, if different from the common one
+    min_as : int or None
+        minimum power of strong coupling, only used together with ``max_as``
+    """
+
+    fktable_path: Union[str, os.PathLike]
+    xir: float = 1.0
+    xif: float = 1.0
+    xia: float = 1.0
+    theory_meta: Optional[dict] = None
+    max_as: Optional[int] = None
+    min_as: Optional[int] = None
+
+
 def evolve_grid(
     grid: pineappl.grid.Grid,
     operators: list,
@@ -363,6 +630,10 @@ def evolve_grid(
     comparison_pdfs: Optional[list[str]] = None,
     min_as=None,
     grid_path: Optional[os.PathLike] = None,
+    grid_hash: Optional[str] = None,
+    prefetch_depth: Optional[int] = None,
+    merge_flavors: Optional[bool] = None,
+    max_memory: Optional[int] = None,
 ):
     """Convolute grid with EKO from file paths.
 
@@ -394,6 +665,19 @@ def evolve_grid(
         minimum power of strong coupling
     grid_path : str or os.PathLike or None
         path to the grid file, used to store grid hash metadata
+    grid_hash : str or None
+        MD5 hash of the grid file, computed from ``grid_path`` if not given
+    prefetch_depth : int or None
+        number of operator slices prepared in background while evolving, by
+        default the configured one (see :func:`pineko.rotations.prefetch_depth`)
+    merge_flavors : bool or None
+        merge the PDFs identified by ``assumptions`` before the evolution (with
+        the same results, up to rounding and channel order), by default the
+        configured choice (see :func:`pineko.rotations.merge_flavors`)
+    max_memory : int or None
+        if given, approximate memory budget (in bytes) of the evolution: the
+        bins are evolved in chunks fitting into it, one at a time, and then
+        merged (with the same results, up to rounding)
 
     Returns
     -------
@@ -408,24 +692,129 @@ def evolve_grid(
         when ``comparison_pdfs`` is given.  Always ``None`` for empty FK
         tables, since there is nothing to compare.
     """
+    ((fktable, comparison),) = evolve_grid_scales(
+        grid,
+        operators,
+        [ScaleChoice(fktable_path, xir, xif, xia)],
+        max_as,
+        max_al,
+        theory_meta,
+        assumptions=assumptions,
+        comparison_pdfs=comparison_pdfs,
+        min_as=min_as,
+        grid_path=grid_path,
+        grid_hash=grid_hash,
+        prefetch_depth=prefetch_depth,
+        merge_flavors=merge_flavors,
+        max_memory=max_memory,
+    )
+    return grid, fktable, comparison
+
+
+def evolve_grid_scales(
+    grid: pineappl.grid.Grid,
+    operators: list,
+    choices: list,
+    max_as: int,
+    max_al: int,
+    theory_meta: dict,
+    assumptions="Nf6Ind",
+    comparison_pdfs: Optional[list[str]] = None,
+    min_as=None,
+    grid_path: Optional[os.PathLike] = None,
+    grid_hash: Optional[str] = None,
+    prefetch_depth: Optional[int] = None,
+    merge_flavors: Optional[bool] = None,
+    max_memory: Optional[int] = None,
+    skip_incompatible: bool = False,
+):
+    """Convolute grid with EKO for several choices of scales and orders.
+
+    The operators are loaded and prepared only once, and an FK table is
+    written for each choice. The same operators can be used as long as they
+    provide the factorization scales required by each choice, i.e. only the
+    renormalization scale (and the couplings) change, or the operators have
+    been computed for all the factorization scales (scheme C). Different
+    ranges of orders (e.g. one per perturbative order, see
+    :func:`order_ranges`) only change the orders evolved.
+
+    With more than one choice, all the prepared operator slices needed are
+    kept in memory (or mapped from the operator cache, if configured).
+
+    Parameters
+    ----------
+    grid : pineappl.grid.Grid
+        unconvolved grid
+    operators : list(eko.EKO)
+        list of evolution operators
+    choices : list(ScaleChoice)
+        scale choices, one per FK table
+    max_as : int
+        maximum power of strong coupling, unless given by the choice
+    max_al : int
+        maximum power of electro-weak coupling
+    theory_metadata: dict
+        card containing the theory parameters, unless given by the choice
+    assumptions : str
+        assumptions on the flavor dimension
+    comparison_pdfs : list(str) or None
+        if given, a comparison table (with / without evolution) will be printed
+    min_as: None or int
+        minimum power of strong coupling, unless given by the choice
+    grid_path : str or os.PathLike or None
+        path to the grid file, used to store grid hash metadata
+    grid_hash : str or None
+        MD5 hash of the grid file, computed from ``grid_path`` if not given
+    prefetch_depth : int or None
+        number of operator slices prepared in background while evolving, by
+        default the configured one (see :func:`pineko.rotations.prefetch_depth`)
+    merge_flavors : bool or None
+        merge the PDFs identified by ``assumptions`` before the evolution (with
+        the same results, up to rounding and channel order), by default the
+        configured choice (see :func:`pineko.rotations.merge_flavors`)
+    max_memory : int or None
+        if given, approximate memory budget (in bytes) of the evolution: the
+        bins are evolved in chunks fitting into it, one at a time, and then
+        merged (with the same results, up to rounding)
+    skip_incompatible : bool
+        skip the choices whose scales are not provided by the operators
+        (instead of raising an error), such that the other FK tables are still
+        written
+
+    Returns
+    -------
+    list(tuple) :
+        the FK table written and the comparison (or ``None``) for each choice,
+        see :func:`evolve_grid`; both are ``None`` for the skipped choices
+    """
     # A grid with no orders is a valid input for some workflows. In that case we
     # cannot build evolution kinematics, so we directly emit an empty FK table.
     if len(grid.orders()) == 0:
-        fktable = construct_empty_fktable(
-            grid, theory_meta, fktable_path, grid_path=grid_path
-        )
-        return grid, fktable, None
+        return [
+            (
+                construct_empty_fktable(
+                    grid,
+                    choice.theory_meta or theory_meta,
+                    choice.fktable_path,
+                    grid_path=grid_path,
+                    grid_hash=grid_hash,
+                ),
+                None,
+            )
+            for choice in choices
+        ]
 
-    order_mask = pineappl.boc.Order.create_mask(grid.orders(), max_as, max_al, True)
-    if min_as is not None and min_as > 1:
-        # If using min_as, we want to ignore only orders below that (e.g., if min_as=2
-        # and max_as=3, we want NNLO and NLO)
-        ignore_orders = pineappl.boc.Order.create_mask(
-            grid.orders(), min_as - 1, max_al, True
+    order_masks = []
+    for choice in choices:
+        if choice.max_as is None:
+            order_range = (max_as, min_as)
+        else:
+            order_range = (choice.max_as, choice.min_as)
+        order_masks.append(
+            create_order_mask(grid.orders(), order_range[0], max_al, order_range[1])
         )
-        order_mask ^= ignore_orders
-
-    evol_info = grid.evolve_info(order_mask)
+    # the operators are prepared for all the orders of all the choices
+    evol_info = grid.evolve_info(np.logical_or.reduce(order_masks))
     x_grid = evol_info.x1
     if "integrability_version" in grid.metadata:
         x_grid = np.append(x_grid, 1.0)
@@ -437,104 +826,330 @@ def evolve_grid(
     # `XGrid` requires at least 2 points, otherwise it panics. In this case, we
     # simply return an empty FK table instead.
     if (len(x_grid) < 2) or (len(muf2_grid) == 0) or (len(mur2_grid) == 0):
-        fktable = construct_empty_fktable(
-            grid, theory_meta, fktable_path, grid_path=grid_path
-        )
-        return grid, fktable, None
+        return [
+            (
+                construct_empty_fktable(
+                    grid,
+                    choice.theory_meta or theory_meta,
+                    choice.fktable_path,
+                    grid_path=grid_path,
+                    grid_hash=grid_hash,
+                ),
+                None,
+            )
+            for choice in choices
+        ]
 
-    xif = 1.0 if operators[0].operator_card.configs.scvar_method is not None else xif
     tcard = operators[0].theory_card
     opcard = operators[0].operator_card
+    scvar_method = opcard.configs.scvar_method
 
-    # PineAPPL wants alpha_s = 4*pi*a_s
-    # remember that we already accounted for xif in the opcard generation
-    evmod = eko.couplings.couplings_mod_ev(opcard.configs.evolution_method)
-    # Couplings ask for the square of the masses
-    thresholds_ratios = np.power(tcard.heavy.matching_ratios, 2.0)
-    sc = eko.couplings.Couplings(
-        tcard.couplings,
-        tcard.order,
-        evmod,
-        masses=[(x.value) ** 2 for x in tcard.heavy.masses],
-        hqm_scheme=tcard.heavy.masses_scheme,
-        thresholds_ratios=thresholds_ratios.tolist(),
+    # The operators may contain more scales than needed (e.g. if they are
+    # shared among several grids or scale choices), but they have to provide
+    # all the needed ones (the x grid is matched by reshaping the operators)
+    needed = []
+    incompatible = {}
+    for idx, choice in enumerate(choices):
+        xif = 1.0 if scvar_method is not None else choice.xif
+        fac2_grid = xif * xif * muf2_grid
+        eps = []
+        for operator in operators:
+            report = check.compare_kinematics(
+                x_grid, muf2_grid, None, operator.mu2grid, xif
+            )
+            if not report.compatible:
+                incompatible[idx] = report.errors()[0]
+                break
+            evolgrid = operator.evolgrid
+            mask = check.isin([q2 for q2, _ in evolgrid], fac2_grid)
+            eps.append([ep for ep, keep in zip(evolgrid, mask) if keep])
+        needed.append(eps)
+    if len(incompatible) > 0:
+        if not skip_incompatible:
+            raise ValueError(next(iter(incompatible.values())))
+        for idx, error in incompatible.items():
+            rich.print(
+                f"[orange]Warning:[/] skipping {choices[idx].fktable_path}: {error}"
+            )
+        compatible = [
+            choice for idx, choice in enumerate(choices) if idx not in incompatible
+        ]
+        results = iter(
+            evolve_grid_scales(
+                grid,
+                operators,
+                compatible,
+                max_as,
+                max_al,
+                theory_meta,
+                assumptions=assumptions,
+                comparison_pdfs=comparison_pdfs,
+                min_as=min_as,
+                grid_path=grid_path,
+                grid_hash=grid_hash,
+                prefetch_depth=prefetch_depth,
+                merge_flavors=merge_flavors,
+                max_memory=max_memory,
+            )
+            if len(compatible) > 0
+            else []
+        )
+        return [
+            (None, None) if idx in incompatible else next(results)
+            for idx in range(len(choices))
+        ]
+
+    if prefetch_depth is None:
+        prefetch_depth = rotations.prefetch_depth()
+    if merge_flavors is None:
+        merge_flavors = rotations.merge_flavors()
+    # only evolve into the flavors of the grid, and (if requested) the PDFs
+    # which are not identified by the assumptions
+    reduction = rotations.Reduction.build(
+        rotations.channel_pids(grid), assumptions if merge_flavors else None
     )
-    # To compute the alphas values we are first reverting the factorization scale shift
-    # and then obtaining the renormalization scale using xir.
-    ren_grid2 = xir * xir * mur2_grid
-    if check.is_num_fonll(theory_meta["FNS"]):
-        nfgrid = [int(theory_meta["NfFF"]) for _ in mur2_grid]
-    else:
-        q2mur_grid = (xir * xir * mur2_grid).tolist()
-        atlas = construct_atlas(theory_meta)
-        nfgrid = [nf_default(q2, atlas) for q2 in q2mur_grid]
-    alphas_values = [
-        4.0 * np.pi * sc.a_s(mur2, nf_to=nf) for mur2, nf in zip(ren_grid2, nfgrid)
-    ]
 
-    def prepare(operator, convolution_types):
-        """Match the raw operator with its relevant metadata."""
-        for (q2, _), op in operator.items():
-            # reshape the x-grid output
-            op = manipulate.xgrid_reshape(
-                op,
-                operator.xgrid,
-                opcard.configs.interpolation_polynomial_degree,
-                targetgrid=XGrid(x_grid),
+    def load(operator, evolgrid):
+        """Load the operator slices."""
+        # only load the scales needed by this grid, reshaping the x-grid output
+        # and rotating the input to evolution basis in batches (or reusing
+        # the cached ones), and reducing the flavors, in background while the
+        # previous ones are evolved
+        prepared = opcache.prepare(
+            operator,
+            evolgrid,
+            x_grid,
+            opcard.configs.interpolation_polynomial_degree,
+        )
+        return rotations.prefetch(rotations.reduce(prepared, reduction), prefetch_depth)
+
+    # hash the grid only once, for the metadata and the comparisons
+    if grid_path is not None and grid_hash is None:
+        grid_hash = gridcache.file_md5(grid_path)
+
+    def finalize(fktable, choice, order_mask, scales):
+        """Optimize, compare and write an FK table."""
+        meta = choice.theory_meta or theory_meta
+        rich.print(f"Optimizing for {assumptions}")
+        fktable.optimize(pineappl.fk_table.FkAssumptions(assumptions))
+        fktable.set_metadata("eko_version", operators[0].metadata.version)
+        fktable.set_metadata(
+            "eko_theory_card", json.dumps(operators[0].theory_card.raw)
+        )
+
+        for idx, operator in enumerate(operators):
+            suffix = "" if idx == 0 else f"_{idx}"
+            fktable.set_metadata(
+                f"eko_operator_card{suffix}", json.dumps(operator.operator_card.raw)
+            )
+
+        set_fktable_metadata(fktable, meta, grid_path=grid_path, grid_hash=grid_hash)
+
+        # compare before/after
+        comparison = None
+        if comparison_pdfs is not None:
+            comparison = comparator.compare(
+                grid,
+                fktable,
+                max_as,
+                max_al,
+                comparison_pdfs,
+                scales,
+                order_mask=order_mask,
+                grid_hash=grid_hash,
+            )
+            fktable.set_metadata("results_fk", comparison.to_string())
+            for idx, pdf in enumerate(comparison_pdfs):
+                fktable.set_metadata(f"results_fk_pdfset{idx}", str(pdf))
+        # write
+        fktable.write_lz4(str(choice.fktable_path))
+        return fktable, comparison
+
+    if max_memory is not None and grid.bins() > 1:
+        nx = max(len(operator.xgrid) for operator in operators)
+        # the prepared operators kept in memory at the same time
+        nslices = (prefetch_depth + 2) * len(operators)
+        if len(choices) > 1:
+            nslices = sum(
+                len({ep for eps in needed for ep in eps[idx]})
+                for idx in range(len(operators))
             )
-            # rotate the input to evolution basis
-            op = manipulate.to_evol(op, source=True)
-            check.check_grid_and_eko_compatible(grid, x_grid, q2, xif, max_as, max_al)
+        slice_nbytes = (
+            8 * len(reduction.rows) * len(x_grid) * len(reduction.columns) * nx
+        )
+        target = pathlib.Path(choices[0].fktable_path).parent
+        with tempfile.TemporaryDirectory(dir=target) as tmp:
+            tmp = pathlib.Path(tmp)
+            # the grid stays in memory, and each chunk holds its share of it:
+            # its size is estimated by the (uncompressed) file size
+            grid.write(str(tmp / "grid.pineappl"))
+            grid_nbytes = (tmp / "grid.pineappl").stat().st_size
+            budget = max_memory - nslices * slice_nbytes - grid_nbytes
+            if budget <= 0:
+                rich.print(
+                    f"[orange]Warning:[/] the memory budget of {max_memory / 1024**3:.2f} GiB "
+                    f"does not fit the operators ({nslices * slice_nbytes / 1024**3:.2f} GiB) "
+                    f"and the grid ({grid_nbytes / 1024**3:.2f} GiB), "
+                    "evolving one bin at a time"
+                )
+            chunks = bin_chunks(
+                grid.bins(),
+                evolution_nbytes(
+                    len(grid.convolutions),
+                    np.count_nonzero(np.logical_or.reduce(order_masks)),
+                    len(reduction.columns),
+                    nx,
+                )
+                + grid_nbytes // grid.bins(),
+                budget,
+            )
+            if len(chunks) > 1:
+                # an empty copy of the grid, keeping the bins, orders and
+                # channels to match the masks, into which the subgrids of each
+                # chunk are copied
+                skeleton = pineappl.grid.Grid.read(tmp / "grid.pineappl")
+                skeleton.scale_by_bin([0.0] * grid.bins())
+                skeleton.optimize_using([pineappl.grid.GridOptFlag.OptimizeSubgridType])
+                skeleton.write(str(tmp / "skeleton.pineappl"))
+                del skeleton
+                (tmp / "grid.pineappl").unlink()
+                parts = [[] for _ in choices]
+                for chunk_idx, chunk in enumerate(chunks):
+                    rich.print(f"Evolving bins {chunk[0]}-{chunk[-1]} of {grid.bins()}")
+                    chunk_grid = pineappl.grid.Grid.read(tmp / "skeleton.pineappl")
+                    for order_idx in range(len(grid.orders())):
+                        for bin_idx in chunk:
+                            for channel_idx in range(len(grid.channels())):
+                                subgrid = grid.subgrid(order_idx, bin_idx, channel_idx)
+                                if not subgrid.is_empty():
+                                    chunk_grid.set_subgrid(
+                                        order_idx, bin_idx, channel_idx, subgrid
+                                    )
+                    chunk_choices = []
+                    for idx, choice in enumerate(choices):
+                        parts[idx].append(tmp / f"fk-{idx}-{chunk_idx}.pineappl.lz4")
+                        chunk_choices.append(
+                            dataclasses.replace(choice, fktable_path=parts[idx][-1])
+                        )
+                    evolve_grid_scales(
+                        chunk_grid,
+                        operators,
+                        chunk_choices,
+                        max_as,
+                        max_al,
+                        theory_meta,
+                        assumptions=assumptions,
+                        min_as=min_as,
+                        grid_path=grid_path,
+                        grid_hash=grid_hash,
+                        prefetch_depth=prefetch_depth,
+                        merge_flavors=merge_flavors,
+                    )
+                    del chunk_grid
+                results = []
+                for choice, order_mask, paths in zip(choices, order_masks, parts):
+                    if not order_mask.any():
+                        fktable = construct_empty_fktable(
+                            grid,
+                            choice.theory_meta or theory_meta,
+                            choice.fktable_path,
+                            grid_path=grid_path,
+                            grid_hash=grid_hash,
+                        )
+                        results.append((fktable, None))
+                        continue
+                    # the other bins are empty in each part
+                    merged = pineappl.grid.Grid.read(paths[0])
+                    for path in paths[1:]:
+                        merged.merge(pineappl.grid.Grid.read(path))
+                    xif = 1.0 if scvar_method is not None else choice.xif
+                    results.append(
+                        finalize(
+                            pineappl.fk_table.FkTable(merged),
+                            choice,
+                            order_mask,
+                            (choice.xir, xif, choice.xia),
+                        )
+                    )
+                return results
+
+    loaded = None
+    if len(choices) > 1:
+        # load each slice needed by any choice only once
+        loaded = []
+        for idx, operator in enumerate(operators):
+            union = {ep for eps in needed for ep in eps[idx]}
+            evolgrid = [ep for ep in operator.evolgrid if ep in union]
+            loaded.append(dict(load(operator, evolgrid)))
+
+    def prepare(idx, convolution_types, evolgrid):
+        """Match the raw operator with its relevant metadata."""
+        operator = operators[idx]
+        if loaded is None:
+            prepared = load(operator, evolgrid)
+        else:
+            prepared = ((ep, loaded[idx][ep]) for ep in evolgrid)
+        for (q2, _), op in prepared:
             info = pineappl.evolution.OperatorSliceInfo(
                 fac0=operator.mu20,
                 fac1=q2,
                 x0=operator.xgrid.tolist(),
                 x1=x_grid.tolist(),
-                pids0=basis_rotation.evol_basis_pids,
-                pids1=basis_rotation.flavor_basis_pids,
+                pids0=reduction.pids0,
+                pids1=reduction.pids1,
                 pid_basis=pineappl.pids.PidBasis.Evol,
                 convolution_types=convolution_types,
             )
-            yield (info, op.operator)
-
-    # NOTE: PineAPPL knows which EKO should be used for a given convolution type because of
-    # the information passed in the `OperatorSliceInfo`, so a strict ordering is not mandatory
-    slices = [
-        prepare(o, c.convolution_types) for o, c in zip(operators, grid.convolutions)
-    ]
+            yield (info, op)
 
-    # Perform the arbitrary many evolutions
-    fktable = grid.evolve(
-        slices=slices,
-        order_mask=order_mask,
-        xi=(xir, xif, xia),
-        ren1=ren_grid2,
-        alphas=alphas_values,
-    )
-
-    rich.print(f"Optimizing for {assumptions}")
-    fktable.optimize(pineappl.fk_table.FkAssumptions(assumptions))
-    fktable.set_metadata("eko_version", operators[0].metadata.version)
-    fktable.set_metadata("eko_theory_card", json.dumps(operators[0].theory_card.raw))
+    results = []
+    for choice, eps, order_mask in zip(choices, needed, order_masks):
+        meta = choice.theory_meta or theory_meta
+        if not order_mask.any():
+            fktable = construct_empty_fktable(
+                grid,
+                meta,
+                choice.fktable_path,
+                grid_path=grid_path,
+                grid_hash=grid_hash,
+            )
+            results.append((fktable, None))
+            continue
+        xir = choice.xir
+        xif = 1.0 if scvar_method is not None else choice.xif
+        xia = choice.xia
 
-    for idx, operator in enumerate(operators):
-        suffix = "" if idx == 0 else f"_{idx}"
-        fktable.set_metadata(
-            f"eko_operator_card{suffix}", json.dumps(operator.operator_card.raw)
-        )
+        # To compute the alphas values we are first reverting the factorization scale shift
+        # and then obtaining the renormalization scale using xir.
+        ren_grid2 = xir * xir * mur2_grid
+        if check.is_num_fonll(meta["FNS"]):
+            nfgrid = [int(meta["NfFF"]) for _ in mur2_grid]
+        else:
+            q2mur_grid = (xir * xir * mur2_grid).tolist()
+            atlas = construct_atlas(meta)
+            nfgrid = [nf_default(q2, atlas) for q2 in q2mur_grid]
+        # PineAPPL wants alpha_s = 4*pi*a_s
+        # remember that we already accounted for xif in the opcard generation
+        alphas_values = (
+            4.0
+            * np.pi
+            * alphas.a_s(tcard, opcard.configs.evolution_method, ren_grid2, nfgrid)
+        ).tolist()
 
-    set_fktable_metadata(fktable, theory_meta, grid_path=grid_path)
+        # NOTE: PineAPPL knows which EKO should be used for a given convolution type because of
+        # the information passed in the `OperatorSliceInfo`, so a strict ordering is not mandatory
+        slices = [
+            prepare(idx, c.convolution_types, evolgrid)
+            for idx, (c, evolgrid) in enumerate(zip(grid.convolutions, eps))
+        ]
 
-    # compare before/after
-    comparison = None
-    if comparison_pdfs is not None:
-        scales = (xir, xif, xia)
-        comparison = comparator.compare(
-            grid, fktable, max_as, max_al, comparison_pdfs, scales
+        # Perform the arbitrary many evolutions
+        fktable = grid.evolve(
+            slices=slices,
+            order_mask=order_mask,
+            xi=(xir, xif, xia),
+            ren1=ren_grid2,
+            alphas=alphas_values,
         )
-        fktable.set_metadata("results_fk", comparison.to_string())
-        for idx, pdf in enumerate(comparison_pdfs):
-            fktable.set_metadata(f"results_fk_pdfset{idx}", str(pdf))
-    # write
-    fktable.write_lz4(str(fktable_path))
-    return grid, fktable, comparison
+        results.append(finalize(fktable, choice, order_mask, (xir, xif, xia)))
+    return results
@@ -0,0 +1,135 @@
+"""Cache of the grids loaded during a run.
+
+Several steps of the generation of a FK table need the same grid: the checks
+on scale variations, the operator card, the names of the ekos, the evolution
+itself and the provenance metadata (i.e. the grid hash). Each grid is read,
+optimized and hashed only once, and the result is shared among all of them.
+"""
+
+import collections
+import dataclasses
+import hashlib
+import pathlib
+
+import pineappl
+
+DEFAULT_MAX_BYTES = 2 * 1024**3
+"""Default memory budget of the cache, in bytes."""
+
+EXPANSION_FACTOR = 4
+"""Estimated ratio between the size in memory of a grid and its file size."""
+
+
+@dataclasses.dataclass
+class GridHandle:
+    """A loaded grid, together with the information derived from its file."""
+
+    path: pathlib.Path
+    grid: pineappl.grid.Grid
+    """Optimized grid."""
+    md5: str
+    """Hash of the grid file."""
+    nbytes: int
+    """Estimated size in memory."""
+
+
+def file_md5(path):
+    """Hash a file, reading it in chunks.
+
+    Parameters
+    ----------
+    path : os.PathLike
+        path to the file
+
+    Returns
+    -------
+    str :
+        MD5 hexadecimal digest
+    """
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def load(path):
+    """Read, optimize and hash a grid.
+
+    Parameters
+    ----------
+    path : os.PathLike
+        path to grid
+
+    Returns
+    -------
+    GridHandle :
+        the loaded grid
+    """
+    path = pathlib.Path(path).resolve()
+    # raise in python rather then rust
+    if not path.exists():
+        raise FileNotFoundError(path)
+    grid = pineappl.grid.Grid.read(path)
+    grid.optimize()
+    return GridHandle(
+        path=path,
+        grid=grid,
+        md5=file_md5(path),
+        nbytes=EXPANSION_FACTOR * path.stat().st_size,
+    )
+
+
+class GridCache:
+    """Least recently used cache of grids, bounded by memory.
+
+    Grids are identified by their path and the modification time and size of
+    the file, so a grid overwritten during the run is read again.
+    The returned grids are shared, so they must not be modified in place.
+
+    Parameters
+    ----------
+    max_bytes : int
+        memory budget; the least recently used grids are dropped when the
+        estimated size of the cached grids exceeds it (the last loaded grid is
+        always kept)
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """Initialize an empty cache."""
+        self.max_bytes = max_bytes
+        self.handles = collections.OrderedDict()
+
+    @property
+    def nbytes(self):
+        """Estimated size of the cached grids."""
+        return sum(handle.nbytes for handle in self.handles.values())
+
+    def get(self, path):
+        """Load a grid, unless already available.
+
+        Parameters
+        ----------
+        path : os.PathLike
+            path to grid
+
+        Returns
+        -------
+        GridHandle :
+            the loaded grid
+        """
+        path = pathlib.Path(path).resolve()
+        stat = path.stat()
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key in self.handles:
+            self.handles.move_to_end(key)
+            return self.handles[key]
+        handle = load(path)
+        self.handles[key] = handle
+        while len(self.handles) > 1 and self.nbytes > self.max_bytes:
+            self.handles.popitem(last=False)
+        return handle
+
+    def clear(self):
+        """Drop all the cached grids."""
+        self.handles.clear()
@@ -0,0 +1,280 @@
+"""Manifests recording the inputs of the generated theory ingredients.
+
+In incremental mode, each operator card, EKO and FK table is accompanied by
+a manifest, i.e. a small file listing the hashes of the inputs it was
+generated from. An ingredient is up-to-date if its recorded manifest matches
+the one expected from the current inputs, which allows to regenerate only the
+stale ones. The manifests are kept in the state folder (see
+:func:`pineko.configs.state_path`), such that the folders of the ingredients
+(e.g. the distributed FK tables) only contain the ingredients themselves.
+
+Only the theory card keys actually affecting each ingredient are taken into
+account. For EKOs the hash of the (converted) runcards consumed by eko is
+used, see :func:`pineko.eko_store.card_hash`.
+"""
+
+import hashlib
+import json
+import pathlib
+from importlib import metadata
+
+import yaml
+
+from . import configs
+
+EXT = "manifest"
+"""Extension appended to the name of the ingredient."""
+
+OPCARD_KEYS = [
+    # scale variations
+    "XIR",
+    "XIF",
+    "ModSV",
+    # perturbative orders
+    "PTO",
+    "QED",
+    "FNS",
+    "NfFF",
+    # evolution
+    "ModEv",
+    "IterEv",
+    # matching, i.e. construct_atlas
+    "Q0",
+    "nf0",
+    "mc",
+    "mb",
+    "mt",
+    "kcThr",
+    "kbThr",
+    "ktThr",
+    "MaxNfPdf",
+]
+"""Theory card keys affecting the operator cards."""
+
+FK_KEYS = [
+    # scale variations
+    "XIR",
+    "XIF",
+    "ModSV",
+    # perturbative orders
+    "PTO",
+    "PTODIS",
+    "FNS",
+    "NfFF",
+    # matching, i.e. construct_atlas
+    "Q0",
+    "nf0",
+    "mc",
+    "mb",
+    "mt",
+    "kcThr",
+    "kbThr",
+    "ktThr",
+    "MaxNfPdf",
+    # flavor assumptions
+    "IC",
+]
+"""Theory card keys affecting the FK tables (besides the EKOs)."""
+
+
+def path(artifact):
+    """Path of the manifest of an ingredient.
+
+    Parameters
+    ----------
+    artifact : os.PathLike
+        path to the ingredient
+
+    Returns
+    -------
+    pathlib.Path :
+        manifest path, mirroring the kind of ingredient and the theory id (i.e.
+        the last two folders of the ingredient)
+    """
+    artifact = pathlib.Path(artifact)
+    folder = configs.state_path(
+        "manifests", artifact.parent.parent.name, artifact.parent.name
+    )
+    return folder / f"{artifact.name}.{EXT}"
+
+
+def theory_hash(tcard, keys):
+    """Hash a subset of the theory card.
+
+    Parameters
+    ----------
+    tcard : dict
+        theory card
+    keys : list(str)
+        relevant keys, the missing ones are considered as ``None``
+
+    Returns
+    -------
+    str :
+        hexadecimal digest
+    """
+    content = json.dumps({k: tcard.get(k) for k in keys}, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def opcard(grid_hash, tcard, ipd, iil, trim_xgrid=False):
+    """Expected manifest of an operator card.
+
+    Parameters
+    ----------
+    grid_hash : str
+        hash of the grid
+    tcard : dict
+        theory card
+    ipd : int
+        interpolation polynomial degree
+    iil : bool
+        interpolation is log
+    trim_xgrid : bool
+        the x grid is trimmed to the grid
+
+    Returns
+    -------
+    dict :
+        manifest
+    """
+    interpolation = [ipd, iil]
+    # not recorded otherwise, to keep the existing manifests valid
+    if trim_xgrid:
+        interpolation.append("trimmed")
+    return dict(
+        grid=grid_hash,
+        theory=theory_hash(tcard, OPCARD_KEYS),
+        interpolation=interpolation,
+        eko_version=metadata.version("eko"),
+    )
+
+
+def eko(digest):
+    """Expected manifest of a EKO.
+
+    Parameters
+    ----------
+    digest : str
+        hash of the runcards, see :func:`pineko.eko_store.card_hash`
+
+    Returns
+    -------
+    dict :
+        manifest
+    """
+    return dict(eko=digest)
+
+
+def fk(grid_hash, eko_hashes, tcard):
+    """Expected manifest of a FK table.
+
+    Parameters
+    ----------
+    grid_hash : str
+        hash of the grid
+    eko_hashes : list(str)
+        hashes of the EKOs, see :func:`eko_hash`
+    tcard : dict
+        theory card
+
+    Returns
+    -------
+    dict :
+        manifest
+    """
+    return dict(
+        grid=grid_hash,
+        ekos=list(eko_hashes),
+        theory=theory_hash(tcard, FK_KEYS),
+    )
+
+
+def load(artifact):
+    """Load the manifest of an ingredient.
+
+    Parameters
+    ----------
+    artifact : os.PathLike
+        path to the ingredient
+
+    Returns
+    -------
+    dict or None :
+        recorded manifest, if available
+    """
+    manifest_path = path(artifact)
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def dump(artifact, manifest):
+    """Record the manifest of an ingredient.
+
+    Parameters
+    ----------
+    artifact : os.PathLike
+        path to the ingredient
+    manifest : dict
+        manifest
+    """
+    manifest_path = path(artifact)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(manifest, f)
+
+
+def remove(artifact):
+    """Remove the manifest of an ingredient, if any.
+
+    Parameters
+    ----------
+    artifact : os.PathLike
+        path to the ingredient
+    """
+    path(artifact).unlink(missing_ok=True)
+
+
+def is_up_to_date(artifact, manifest):
+    """Check whether an ingredient was generated from the expected inputs.
+
+    Parameters
+    ----------
+    artifact : os.PathLike
+        path to the ingredient
+    manifest : dict
+        expected manifest
+
+    Returns
+    -------
+    bool :
+        whether the ingredient exists and its recorded manifest matches
+    """
+    if not pathlib.Path(artifact).exists():
+        return False
+    return load(artifact) == manifest
+
+
+def eko_hash(eko_path):
+    """Determine the hash identifying an existing EKO.
+
+    If the EKO has no manifest (e.g. it has been generated by an older
+    version), its size and modification time are used instead.
+
+    Parameters
+    ----------
+    eko_path : os.PathLike
+        path to the EKO
+
+    Returns
+    -------
+    str :
+        EKO hash
+    """
+    recorded = load(eko_path)
+    if recorded is not None and "eko" in recorded:
+        return recorded["eko"]
+    stat = pathlib.Path(eko_path).stat()
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
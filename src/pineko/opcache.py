@@ -0,0 +1,184 @@
+"""Persistent cache of the operators prepared for the evolution of the grids.
+
+Before the evolution, the operator of each scale is reinterpolated on the x
+grid of the grid and rotated to the evolution basis (see
+:mod:`pineko.rotations`). The prepared operators only depend on the EKO and on
+the target x grid, so they can be stored and reused, e.g. when the FK tables
+are rebuilt after a change of the flavor assumptions or a comparison rerun.
+
+Each cache entry is a folder, identified by the hash of the EKO runcards (see
+:func:`pineko.eko_store.card_hash`), the target x grid, the interpolation
+degree and the pineko version, containing one memory mapped array per scale. When the cache exceeds
+its size limit, the least recently used entries are removed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from . import configs, eko_store, rotations, version
+
+DEFAULT_MAX_BYTES = 10 * 1024**3
+"""Default size limit of the cache, in bytes."""
+
+SIZE_KEY = "operator_cache_size"
+"""Option in the general section setting the size limit, in GiB."""
+
+
+def path():
+    """Determine the cache folder.
+
+    Returns
+    -------
+    pathlib.Path or None :
+        cache folder, or ``None`` if the cache is not configured
+    """
+    return configs.configs.get("paths", {}).get(configs.OPERATOR_CACHE_KEY)
+
+
+def max_bytes():
+    """Determine the size limit of the cache.
+
+    Returns
+    -------
+    int :
+        size limit, in bytes
+    """
+    size = configs.configs.get(configs.GENERIC_OPTIONS, {}).get(SIZE_KEY)
+    if size is None:
+        return DEFAULT_MAX_BYTES
+    return int(size * 1024**3)
+
+
+def entry_key(operator, target, interpdeg):
+    """Compute the key identifying the prepared operators of an EKO.
+
+    Parameters
+    ----------
+    operator : eko.EKO
+        evolution operators
+    target : list(float)
+        x grid of the grid
+    interpdeg : int
+        interpolation polynomial degree
+
+    Returns
+    -------
+    str :
+        hexadecimal digest
+    """
+    content = json.dumps(
+        dict(
+            eko=eko_store.card_hash(
+                operator.theory_card.raw, operator.operator_card.raw
+            ),
+            target=[float(x) for x in target],
+            interpdeg=interpdeg,
+            # the operators are prepared by pineko itself
+            pineko=version.__version__,
+        ),
+        sort_keys=True,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def slice_name(ep):
+    """File name of the prepared operator of a scale."""
+    q2, nf = ep
+    return f"{float(q2).hex()}_{nf}.npy"
+
+
+def _save(file, op):
+    """Write an array atomically, such that concurrent readers never see it partially."""
+    tmp = file.with_name(f".{file.name}-{os.getpid()}")
+    with open(tmp, "wb") as f:
+        np.save(f, op)
+    os.replace(tmp, file)
+
+
+def size(folder):
+    """Total size of the files in a folder, in bytes."""
+    return sum(f.stat().st_size for f in folder.iterdir() if f.is_file())
+
+
+def evict(folder, limit, keep=None):
+    """Remove the least recently used entries exceeding the size limit.
+
+    Parameters
+    ----------
+    folder : pathlib.Path
+        cache folder
+    limit : int
+        size limit, in bytes
+    keep : pathlib.Path or None
+        entry never removed (i.e. the one in use)
+
+    Returns
+    -------
+    list(pathlib.Path) :
+        removed entries
+    """
+    entries = sorted(
+        (entry for entry in folder.iterdir() if entry.is_dir()),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    sizes = {entry: size(entry) for entry in entries}
+    total = sum(sizes.values())
+    removed = []
+    for entry in entries:
+        if total <= limit:
+            break
+        if entry == keep:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= sizes[entry]
+        removed.append(entry)
+    return removed
+
+
+def prepare(operator, evolgrid, target, interpdeg):
+    """Prepare the operators of some scales, reusing the cached ones.
+
+    If the cache is not configured, this is the same as
+    :func:`pineko.rotations.prepare`.
+
+    Parameters
+    ----------
+    operator : eko.EKO
+        evolution operators
+    evolgrid : list(tuple(float, int))
+        evolution points to prepare
+    target : list(float)
+        x grid of the grid
+    interpdeg : int
+        interpolation polynomial degree
+
+    Yields
+    ------
+    tuple(tuple(float, int), np.ndarray) :
+        evolution point and prepared operator
+    """
+    folder = path()
+    if folder is None:
+        yield from rotations.prepare(operator, evolgrid, target, interpdeg)
+        return
+    entry = folder / entry_key(operator, target, interpdeg)
+    entry.mkdir(parents=True, exist_ok=True)
+    missing = {ep for ep in evolgrid if not (entry / slice_name(ep)).exists()}
+    computed = rotations.prepare(
+        operator, [ep for ep in evolgrid if ep in missing], target, interpdeg
+    )
+    for ep in evolgrid:
+        file = entry / slice_name(ep)
+        if ep in missing:
+            _, op = next(computed)
+            _save(file, op)
+            yield ep, op
+        else:
+            yield ep, np.load(file, mmap_mode="r")
+    # mark as recently used
+    os.utime(entry)
+    evict(folder, max_bytes(), keep=entry)
@@ -0,0 +1,335 @@
+"""Tools to distribute the generation of theory ingredients over several processes.
+
+The unit of work is a :class:`Task`, i.e. a (picklable) callable together with
+its arguments.  Tasks are dispatched to a pool of worker processes and each of
+them reports back a :class:`TaskResult`, such that a failure in a single task
+does not stop the remaining ones.
+"""
+
+import concurrent.futures
+import contextlib
+import dataclasses
+import io
+import time
+import traceback
+from typing import Any, Callable, Optional
+
+import numpy as np
+import rich
+
+from . import configs
+
+
+@dataclasses.dataclass
+class Task:
+    """A single unit of work."""
+
+    name: str
+    function: Callable
+    args: tuple = ()
+    kwargs: dict = dataclasses.field(default_factory=dict)
+    cores: int = 1
+    """Number of cores the task is going to occupy."""
+    requires: tuple = ()
+    """Names of the tasks which have to be successfully completed first."""
+    priority: int = 0
+    """Tasks with higher priority are started first."""
+
+
+@dataclasses.dataclass
+class TaskResult:
+    """The outcome of a :class:`Task`."""
+
+    name: str
+    success: bool
+    output: str = ""
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    value: Any = None
+
+
+def _init_worker(configs_):
+    """Share the loaded configurations with the worker process."""
+    configs.configs = configs_
+
+
+def execute(task):
+    """Run a task, capturing its terminal output and any raised exception.
+
+    Parameters
+    ----------
+    task : Task
+        the task to run
+
+    Returns
+    -------
+    TaskResult :
+        the outcome of the task
+    """
+    buffer = io.StringIO()
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(buffer):
+        try:
+            value = task.function(*task.args, **task.kwargs)
+            success, error = True, None
+        except Exception:  # pylint: disable=broad-except
+            value, success, error = None, False, traceback.format_exc()
+    return TaskResult(
+        name=task.name,
+        success=success,
+        output=buffer.getvalue(),
+        error=error,
+        elapsed=time.perf_counter() - start_time,
+        value=value,
+    )
+
+
+def report(result):
+    """Print the captured output of a task in a single block."""
+    if result.output:
+        print(result.output, end="", flush=True)
+    if result.success:
+        rich.print(f"[green]Done:[/] {result.name} ({result.elapsed:.1f} s)")
+    else:
+        rich.print(f"[red]Failed:[/] {result.name}")
+        print(result.error, flush=True)
+
+
+def allocate_cores(costs, budget, max_cores=8):
+    """Distribute a core budget over tasks with the given costs.
+
+    Every task gets at least one core, while expensive tasks get more, such
+    that none of them lasts (much) longer than the ideal wall time, i.e. the
+    total cost divided by the budget.
+
+    Parameters
+    ----------
+    costs : list(float)
+        estimated (serial) cost of each task
+    budget : int
+        total number of available cores
+    max_cores : int
+        maximum number of cores assigned to a single task
+
+    Returns
+    -------
+    list(int) :
+        number of cores for each task
+    """
+    total = sum(costs)
+    if total <= 0:
+        return [1 for _ in costs]
+    ideal = total / budget
+    max_cores = max(1, min(max_cores, budget))
+    return [int(min(max(np.ceil(cost / ideal), 1), max_cores)) for cost in costs]
+
+
+def run(tasks, jobs, callback=None):
+    """Run tasks in a pool of worker processes.
+
+    A task is only started when enough cores are available, i.e. the sum of
+    the cores of the running tasks never exceeds ``jobs``, and all the tasks it
+    requires are successfully completed; among the tasks with the same
+    priority, the most demanding ones are started first. A task requiring a
+    failed task is not run, and it is reported as failed as well.
+    The output of each task is printed only once the task is completed, so that
+    output from concurrent tasks is never interleaved.
+
+    Parameters
+    ----------
+    tasks : list(Task)
+        tasks to run
+    jobs : int
+        number of available cores
+    callback : callable or None
+        called (in the current process) with each result, as soon as it is
+        available
+
+    Returns
+    -------
+    list(TaskResult) :
+        results, in the same order as ``tasks``
+    """
+    results = {}
+    status = {}
+    # stable sort: equally demanding tasks keep their order
+    queue = sorted(
+        range(len(tasks)), key=lambda idx: (-tasks[idx].priority, -tasks[idx].cores)
+    )
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(configs.configs,)
+    ) as executor:
+        running = {}
+        free = jobs
+        while len(queue) > 0 or len(running) > 0:
+            pending = {tasks[idx].name for idx in queue}
+            pending.update(tasks[idx].name for idx, _ in running.values())
+            stuck = len(running) == 0
+            # fill the available cores
+            for idx in list(queue):
+                requires = tasks[idx].requires
+                failed = [
+                    name
+                    for name in requires
+                    if status.get(name) is False
+                    or (name not in status and name not in pending)
+                ]
+                if len(failed) > 0:
+                    # the required tasks can not be completed anymore
+                    result = TaskResult(
+                        tasks[idx].name, False, error=f"Required tasks failed: {failed}"
+                    )
+                    report(result)
+                    results[idx] = result
+                    status[result.name] = False
+                    queue.remove(idx)
+                    stuck = False
+                    continue
+                if not all(status.get(name) for name in requires):
+                    continue
+                cores = min(tasks[idx].cores, jobs)
+                if cores <= free:
+                    running[executor.submit(execute, tasks[idx])] = (idx, cores)
+                    queue.remove(idx)
+                    free -= cores
+                    stuck = False
+            if stuck:
+                # circular requirements
+                for idx in queue:
+                    result = TaskResult(
+                        tasks[idx].name, False, error="Circular requirements"
+                    )
+                    report(result)
+                    results[idx] = result
+                queue = []
+            if len(running) == 0:
+                continue
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                idx, cores = running.pop(future)
+                free += cores
+                try:
+                    result = future.result()
+                except Exception:  # pylint: disable=broad-except
+                    # the worker itself died (e.g. killed or unpicklable output)
+                    result = TaskResult(
+                        tasks[idx].name, False, error=traceback.format_exc()
+                    )
+                report(result)
+                results[idx] = result
+                status[result.name] = result.success
+                if callback is not None:
+                    callback(result)
+    return [results[idx] for idx in range(len(tasks))]
+
+
+def run_serial(tasks, callback=None):
+    """Run tasks one after the other in the current process.
+
+    The tasks are run in the given order, hence the required tasks have to
+    come first; a task requiring a failed (or unknown) task is not run, and
+    it is reported as failed as well.
+
+    Parameters
+    ----------
+    tasks : list(Task)
+        tasks to run
+    callback : callable or None
+        called with each result, as soon as it is available
+
+    Returns
+    -------
+    list(TaskResult) :
+        results, in the same order as ``tasks``
+    """
+    results = []
+    status = {}
+    for task in tasks:
+        failed = [name for name in task.requires if not status.get(name)]
+        if len(failed) > 0:
+            result = TaskResult(
+                task.name, False, error=f"Required tasks failed: {failed}"
+            )
+        else:
+            result = execute(task)
+        report(result)
+        results.append(result)
+        status[result.name] = result.success
+        if callback is not None:
+            callback(result)
+    return results
+
+
+class BackgroundPool:
+    """Run tasks in background worker processes, while the caller goes on.
+
+    Parameters
+    ----------
+    jobs : int
+        number of worker processes
+    """
+
+    def __init__(self, jobs):
+        """Start the worker processes."""
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(configs.configs,)
+        )
+        self.submitted = []
+
+    def submit(self, task):
+        """Queue a task.
+
+        Parameters
+        ----------
+        task : Task
+            the task to run
+
+        Returns
+        -------
+        concurrent.futures.Future :
+            the running task
+        """
+        future = self.executor.submit(execute, task)
+        self.submitted.append((task, future))
+        return future
+
+    def wait(self):
+        """Wait for all the queued tasks, and stop the worker processes.
+
+        Returns
+        -------
+        list(TaskResult) :
+            results, in the same order as the tasks were queued
+        """
+        results = []
+        for task, future in self.submitted:
+            try:
+                result = future.result()
+            except Exception:  # pylint: disable=broad-except
+                # the worker itself died (e.g. killed or unpicklable output)
+                result = TaskResult(task.name, False, error=traceback.format_exc())
+            report(result)
+            results.append(result)
+        self.executor.shutdown()
+        self.submitted = []
+        return results
+
+
+def print_summary(results):
+    """Print the final success/failure summary.
+
+    Parameters
+    ----------
+    results : list(TaskResult)
+        collected results
+    """
+    failed = [result for result in results if not result.success]
+    rich.print(
+        f"[green]Success:[/] {len(results) - len(failed)}/{len(results)} tasks completed"
+    )
+    if len(failed) > 0:
+        rich.print(f"[red]Failure:[/] {len(failed)} tasks failed:")
+        for result in failed:
+            rich.print(f"[red]  - {result.name}")
@@ -0,0 +1,191 @@
+"""Cache of the PDF sets used for the comparisons during a run.
+
+The comparison of each FK table with its grid convolves both of them with the
+same PDF sets. Loading a PDF set member (i.e. reading and parsing its data
+file) is far more expensive than evaluating it, so each member is loaded only
+once per run and shared by all the comparisons. The grids are convolved by
+LHAPDF directly, while the FK tables only need the PDF sets on their x grid at
+their initial scale, which are the same for (almost) all the FK tables of a
+theory: the tabulated values are cached as well, see :func:`tabulate`.
+"""
+
+import collections
+import hashlib
+import pathlib
+
+from . import configs, predict
+
+DEFAULT_MAX_BYTES = 2 * 1024**3
+"""Default memory budget of the cache, in bytes."""
+
+SIZE_KEY = "pdf_cache_size"
+"""Option in the general section setting the memory budget, in GiB."""
+
+DEFAULT_NBYTES = 16 * 1024**2
+"""Estimated size in memory of a PDF set member whose data file is not found."""
+
+_sets = collections.OrderedDict()
+_tables = collections.OrderedDict()
+
+
+def max_bytes():
+    """Determine the memory budget of the cache.
+
+    Returns
+    -------
+    int :
+        memory budget, in bytes
+    """
+    size = configs.configs.get(configs.GENERIC_OPTIONS, {}).get(SIZE_KEY)
+    if size is None:
+        return DEFAULT_MAX_BYTES
+    return int(size * 1024**3)
+
+
+def find(name, filename):
+    """Find a file of a PDF set in the LHAPDF data folders.
+
+    Parameters
+    ----------
+    name : str
+        name of the PDF set
+    filename : str
+        name of the file, within the folder of the set
+
+    Returns
+    -------
+    pathlib.Path or None :
+        path to the file, or ``None`` if not found
+    """
+    import lhapdf  # pylint: disable=import-error,import-outside-toplevel
+
+    for folder in lhapdf.paths():
+        path = pathlib.Path(folder) / name / filename
+        if path.exists():
+            return path
+    return None
+
+
+def info_hash(name):
+    """Compute the hash identifying the version of a PDF set.
+
+    The ``.info`` file of the set is hashed: it changes with its data (e.g.
+    its ``DataVersion``), or if another set with the same name is installed.
+
+    Parameters
+    ----------
+    name : str
+        name of the PDF set
+
+    Returns
+    -------
+    str or None :
+        hexadecimal digest, or ``None`` if the set is not found
+    """
+    info = find(name, f"{name}.info")
+    if info is None:
+        return None
+    return hashlib.sha256(info.read_bytes()).hexdigest()
+
+
+def member_nbytes(name, member):
+    """Estimate the size in memory of a PDF set member.
+
+    The size is estimated by the size of its data file, which lists the
+    values on the interpolation nodes.
+
+    Parameters
+    ----------
+    name : str
+        name of the PDF set
+    member : int
+        member of the PDF set
+
+    Returns
+    -------
+    int :
+        estimated size in bytes
+    """
+    data = find(name, f"{name}_{member:04d}.dat")
+    if data is None:
+        return DEFAULT_NBYTES
+    return data.stat().st_size
+
+
+def nbytes():
+    """Estimated size in memory of all the loaded and tabulated PDF set members."""
+    return sum(size for _, size in _sets.values()) + sum(
+        table.nbytes for table in _tables.values()
+    )
+
+
+def load(name, member=0):
+    """Load a PDF set member, unless already loaded.
+
+    The least recently used members are dropped when the loaded ones exceed
+    the budget (see :func:`max_bytes`), the last one is always kept.
+
+    Parameters
+    ----------
+    name : str
+        name of the PDF set
+    member : int
+        member of the PDF set
+
+    Returns
+    -------
+    lhapdf.PDF :
+        the loaded PDF set member
+    """
+    key = (name, member)
+    if key in _sets:
+        _sets.move_to_end(key)
+        return _sets[key][0]
+    import lhapdf  # pylint: disable=import-error,import-outside-toplevel
+
+    pdf = lhapdf.mkPDF(name, member)
+    _sets[key] = (pdf, member_nbytes(name, member))
+    limit = max_bytes()
+    while len(_sets) > 1 and nbytes() > limit:
+        _sets.popitem(last=False)
+    return pdf
+
+
+def tabulate(name, x_grid, q2, member=0):
+    """Tabulate a PDF set member, unless already tabulated.
+
+    The least recently used tables are dropped, like the members (see
+    :func:`load`), when exceeding the budget.
+
+    Parameters
+    ----------
+    name : str
+        name of the PDF set
+    x_grid : list(float)
+        momentum fractions
+    q2 : float
+        scale
+    member : int
+        member of the PDF set
+
+    Returns
+    -------
+    np.ndarray :
+        :math:`x f(x)`, with shape (1, 14, x), see :func:`pineko.predict.tabulate`
+    """
+    key = (name, member, tuple(float(x) for x in x_grid), float(q2))
+    if key in _tables:
+        _tables.move_to_end(key)
+        return _tables[key]
+    table = predict.tabulate([load(name, member)], x_grid, q2)
+    _tables[key] = table
+    limit = max_bytes()
+    while len(_tables) > 1 and nbytes() > limit:
+        _tables.popitem(last=False)
+    return table
+
+
+def clear():
+    """Drop all the loaded and tabulated PDF sets."""
+    _sets.clear()
+    _tables.clear()
@@ -0,0 +1,186 @@
+"""Persistent cache of the predictions of the grids.
+
+The comparison of an FK table with its grid (see
+:func:`pineko.comparator.compare`) convolves both of them with the same PDF
+sets. The convolution of the grid is the expensive part, and it only depends
+on the grid, the PDF sets, the orders and the scale variations, so its
+predictions are stored and reused, e.g. when the FK tables are rebuilt with
+new EKOs or flavor assumptions: only the FK tables are convolved again.
+
+Each cache entry is a small array, named after the hash of the grid file, of
+the PDF sets (i.e. of their ``.info`` files) and of the convolution settings.
+When the cache exceeds its size limit, the least recently used entries are
+removed.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from importlib import metadata
+
+import numpy as np
+
+from . import configs, pdfcache
+
+DEFAULT_MAX_BYTES = 1024**3
+"""Default size limit of the cache, in bytes."""
+
+SIZE_KEY = "prediction_cache_size"
+"""Option in the general section setting the size limit, in GiB."""
+
+
+def path():
+    """Determine the cache folder.
+
+    Returns
+    -------
+    pathlib.Path or None :
+        cache folder, or ``None`` if the cache is not configured
+    """
+    return configs.configs.get("paths", {}).get(configs.PREDICTION_CACHE_KEY)
+
+
+def max_bytes():
+    """Determine the size limit of the cache.
+
+    Returns
+    -------
+    int :
+        size limit, in bytes
+    """
+    size = configs.configs.get(configs.GENERIC_OPTIONS, {}).get(SIZE_KEY)
+    if size is None:
+        return DEFAULT_MAX_BYTES
+    return int(size * 1024**3)
+
+
+def entry_key(grid_hash, pdfs, pdf_hashes, order_mask, scales, as_pdf_idx=0):
+    """Compute the key identifying the predictions of a grid.
+
+    Parameters
+    ----------
+    grid_hash : str
+        hash of the grid file
+    pdfs : list(tuple(str, int))
+        name and member of the PDF sets
+    pdf_hashes : list(str)
+        version of the PDF sets, see :func:`pineko.pdfcache.info_hash`
+    order_mask : np.ndarray
+        orders of the grid included in the predictions
+    scales : tuple
+        renormalization, factorization, and fragmentation scale variations
+    as_pdf_idx : int
+        index of the PDF set used for the strong coupling
+
+    Returns
+    -------
+    str :
+        hexadecimal digest
+    """
+    content = json.dumps(
+        dict(
+            grid=grid_hash,
+            pdfs=[[str(name), int(member)] for name, member in pdfs],
+            pdf_hashes=list(pdf_hashes),
+            order_mask=[bool(order) for order in order_mask],
+            scales=[float(xi) for xi in scales],
+            as_pdf_idx=as_pdf_idx,
+            pineappl=metadata.version("pineappl"),
+        ),
+        sort_keys=True,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def evict(folder, limit, keep=None):
+    """Remove the least recently used entries exceeding the size limit.
+
+    Parameters
+    ----------
+    folder : pathlib.Path
+        cache folder
+    limit : int
+        size limit, in bytes
+    keep : pathlib.Path or None
+        entry never removed (i.e. the one just written)
+
+    Returns
+    -------
+    list(pathlib.Path) :
+        removed entries
+    """
+    entries = []
+    for entry in folder.glob("*.npy"):
+        try:
+            entries.append((entry.stat(), entry))
+        except FileNotFoundError:
+            # removed by another process
+            continue
+    entries.sort(key=lambda item: item[0].st_mtime)
+    total = sum(stat.st_size for stat, _ in entries)
+    removed = []
+    for stat, entry in entries:
+        if total <= limit:
+            break
+        if entry == keep:
+            continue
+        entry.unlink(missing_ok=True)
+        total -= stat.st_size
+        removed.append(entry)
+    return removed
+
+
+def cached(grid_hash, pdfs, order_mask, scales, as_pdf_idx, convolve):
+    """Compute the predictions of a grid, unless already available.
+
+    Parameters
+    ----------
+    grid_hash : str or None
+        hash of the grid file, the predictions are not cached if not given (or
+        if the PDF sets are not found)
+    pdfs : list(tuple(str, int))
+        name and member of the PDF sets
+    order_mask : np.ndarray
+        orders of the grid included in the predictions
+    scales : tuple
+        renormalization, factorization, and fragmentation scale variations
+    as_pdf_idx : int
+        index of the PDF set used for the strong coupling
+    convolve : callable
+        computes the predictions, if not cached
+
+    Returns
+    -------
+    np.ndarray :
+        predictions of the grid
+    """
+    folder = path()
+    if folder is None or grid_hash is None:
+        return np.array(convolve())
+    pdf_hashes = [pdfcache.info_hash(name) for name, _ in pdfs]
+    if None in pdf_hashes:
+        return np.array(convolve())
+    key = entry_key(grid_hash, pdfs, pdf_hashes, order_mask, scales, as_pdf_idx)
+    file = folder / f"{key}.npy"
+    try:
+        predictions = np.load(file)
+        # mark as recently used
+        os.utime(file)
+        return predictions
+    except (FileNotFoundError, ValueError):
+        pass
+    predictions = np.array(convolve())
+    folder.mkdir(parents=True, exist_ok=True)
+    # write atomically, such that concurrent readers never see it partially
+    # (with a unique name, as the cache may be shared by several nodes)
+    tmp = file.with_name(f".{file.name}-{uuid.uuid4().hex}")
+    try:
+        with open(tmp, "wb") as f:
+            np.save(f, predictions)
+        os.replace(tmp, file)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    evict(folder, max_bytes(), keep=file)
+    return predictions
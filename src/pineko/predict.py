@@ -0,0 +1,159 @@
+"""Predictions of FK tables for many PDF set members at once.
+
+Convolving an FK table with each member of a PDF set (e.g. for its
+uncertainty) through :meth:`pineappl.fk_table.FkTable.convolve` decodes the
+FK table, and loops over its channels, once per member. Here the FK table is
+decoded only once into a dense array, the members are tabulated on its x grid
+at its initial scale, and all the predictions are computed by a single
+contraction.
+"""
+
+import dataclasses
+
+import numpy as np
+import pineappl
+from eko import basis_rotation as br
+
+
+@dataclasses.dataclass
+class DenseFkTable:
+    """FK table decoded into a dense array."""
+
+    table: np.ndarray
+    """Coefficients, with shape (bins, channels, x[, x])."""
+    channels: np.ndarray
+    """Flavor of each channel and convolution, with shape (channels, convolutions)."""
+    pid_basis: pineappl.pids.PidBasis
+    """Basis of the flavors in the channels."""
+    x_grid: np.ndarray
+    """Momentum fractions."""
+    fac0: float
+    """Initial scale."""
+    normalizations: np.ndarray
+    """Normalization of each bin."""
+
+    @classmethod
+    def read(cls, fktable):
+        """Decode an FK table.
+
+        Parameters
+        ----------
+        fktable : pineappl.fk_table.FkTable or os.PathLike
+            FK table, or its path
+
+        Returns
+        -------
+        DenseFkTable :
+            the decoded FK table
+        """
+        if not isinstance(fktable, pineappl.fk_table.FkTable):
+            fktable = pineappl.fk_table.FkTable.read(fktable)
+        return cls(
+            table=np.asarray(fktable.table()),
+            channels=np.array(fktable.channels(), dtype=int),
+            pid_basis=fktable.pid_basis,
+            x_grid=np.asarray(fktable.x_grid()),
+            fac0=fktable.fac0(),
+            normalizations=np.asarray(fktable.bin_normalizations()),
+        )
+
+    @property
+    def nconv(self):
+        """Number of convolutions."""
+        return self.channels.shape[1]
+
+    def convolve(self, *xfxs):
+        """Compute the predictions for several PDF set members.
+
+        Parameters
+        ----------
+        *xfxs : np.ndarray
+            :math:`x f(x)` of each member, with shape (members, 14, x), in the
+            flavor basis (:data:`eko.basis_rotation.flavor_basis_pids`) on
+            :attr:`x_grid` at :attr:`fac0`: a single one for all the
+            convolutions, or one for each of them
+
+        Returns
+        -------
+        np.ndarray :
+            predictions, with shape (members, bins)
+        """
+        if len(xfxs) == 1:
+            xfxs = xfxs * self.nconv
+        if len(xfxs) != self.nconv:
+            raise ValueError(
+                f"Expected PDFs for {self.nconv} convolutions, got {len(xfxs)}"
+            )
+        factors = []
+        for idx, xfx in enumerate(xfxs):
+            # the FK table is given for f(x), and possibly in the evolution basis
+            pdf = np.asarray(xfx) / self.x_grid
+            if self.pid_basis == pineappl.pids.PidBasis.Evol:
+                pdf = np.einsum("ij,mjx->mix", br.rotate_flavor_to_evolution, pdf)
+                pids = br.evol_basis_pids
+            else:
+                pids = br.flavor_basis_pids
+            # the gluon may be labelled 0
+            channels = np.where(self.channels[:, idx] == 0, 21, self.channels[:, idx])
+            factors.append(pdf[:, [pids.index(pid) for pid in channels]])
+        if self.nconv == 1:
+            predictions = np.einsum("bci,mci->mb", self.table, *factors)
+        elif self.nconv == 2:
+            predictions = np.einsum(
+                "bcij,mci,mcj->mb", self.table, *factors, optimize=True
+            )
+        else:
+            raise ValueError(f"Unsupported number of convolutions: {self.nconv}")
+        return predictions / self.normalizations
+
+
+def tabulate(pdfs, x_grid, q2):
+    """Tabulate PDF set members on a grid.
+
+    Parameters
+    ----------
+    pdfs : list(lhapdf.PDF)
+        PDF set members (or any objects providing ``xfxQ2``)
+    x_grid : list(float)
+        momentum fractions
+    q2 : float
+        scale
+
+    Returns
+    -------
+    np.ndarray :
+        :math:`x f(x)`, with shape (members, 14, x), in the flavor basis
+        (:data:`eko.basis_rotation.flavor_basis_pids`)
+    """
+    xfx = np.zeros((len(pdfs), len(br.flavor_basis_pids), len(x_grid)))
+    for member, pdf in enumerate(pdfs):
+        for idx, pid in enumerate(br.flavor_basis_pids):
+            xfx[member, idx] = [pdf.xfxQ2(pid, x, q2) for x in x_grid]
+    return xfx
+
+
+def predict(fktable, pdfset, members=None):
+    """Compute the predictions of an FK table for the members of a PDF set.
+
+    Parameters
+    ----------
+    fktable : pineappl.fk_table.FkTable or os.PathLike
+        FK table, or its path
+    pdfset : str
+        name of the PDF set, used for all the convolutions
+    members : list(int) or None
+        members of the PDF set, all of them if not given
+
+    Returns
+    -------
+    np.ndarray :
+        predictions, with shape (members, bins)
+    """
+    import lhapdf  # pylint: disable=import-error,import-outside-toplevel
+
+    dense = DenseFkTable.read(fktable)
+    if members is None:
+        pdfs = lhapdf.mkPDFs(pdfset)
+    else:
+        pdfs = [lhapdf.mkPDF(pdfset, member) for member in members]
+    return dense.convolve(tabulate(pdfs, dense.x_grid, dense.fac0))
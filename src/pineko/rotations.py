@@ -0,0 +1,402 @@
+"""Preparation of the evolution operators for the convolution with a grid.
+
+The operator of each scale has to be reinterpolated on the x grid of the grid
+(output) and rotated to the evolution basis (input). The rotation matrices are
+the same for all the scales, so they are built only once, and applied to
+batches of stacked operators in a single contraction.
+
+The prepared operators can be reduced to the flavors actually needed (see
+:class:`Reduction`), and while an operator is being used, the following ones
+can be prepared in the background (see :func:`prefetch`).
+"""
+
+import dataclasses
+import functools
+import queue
+import threading
+
+import numpy as np
+import pineappl
+from eko import basis_rotation, interpolation
+
+from . import configs
+
+DEFAULT_BATCH_BYTES = 2**29
+"""Default memory budget (in bytes) for a batch of operators (512 MiB)."""
+
+DEFAULT_PREFETCH_DEPTH = 2
+"""Default number of operators prepared in advance."""
+
+PREFETCH_DEPTH_KEY = "prefetch_depth"
+"""Option in the general section setting the number of operators prepared in advance."""
+
+MERGE_FLAVORS_KEY = "merge_flavors"
+"""Option in the general section enabling the merge of the PDFs identified by the assumptions."""
+
+XGRID_ROTATION = "ij,najbk,bc->naick"
+"""Batched output x grid and input flavor rotation."""
+FLAVOR_ROTATION = "najbk,bc->najck"
+"""Batched input flavor rotation."""
+
+EVOLUTION_ROTATION = np.linalg.inv(basis_rotation.rotate_flavor_to_evolution)
+"""Rotation of the operator input from the flavor to the evolution basis."""
+
+_MERGES = [(235, 200), (135, 100), (224, 200), (124, 100), (215, 200), (115, 100)]
+ASSUMPTIONS_MERGES = {
+    "Nf6Ind": [],
+    "Nf6Sym": _MERGES[:1],
+    "Nf5Ind": _MERGES[:2],
+    "Nf5Sym": _MERGES[:3],
+    "Nf4Ind": _MERGES[:4],
+    "Nf4Sym": _MERGES[:5],
+    "Nf3Ind": _MERGES[:6],
+    "Nf3Sym": _MERGES[:6] + [(208, 200)],
+}
+"""Evolution basis PDFs identified by the flavor assumptions, as in
+:meth:`pineappl.fk_table.FkTable.optimize` (source and target)."""
+
+
+@functools.lru_cache(maxsize=16)
+def _xgrid_rotation(source, target, interpdeg):
+    if len(source) == len(target) and np.allclose(source, target):
+        return None
+    dispatcher = interpolation.InterpolatorDispatcher(
+        interpolation.XGrid(source), interpdeg, False
+    )
+    rotation = dispatcher.get_interpolation(np.array(target))
+    rotation.flags.writeable = False
+    return rotation
+
+
+def xgrid_rotation(source, target, interpdeg):
+    """Reinterpolation matrix from a source to a target x grid.
+
+    The matrices are cached, since they are the same for all the operators
+    sharing the same x grids.
+
+    Parameters
+    ----------
+    source : list(float)
+        x grid of the operator
+    target : list(float)
+        x grid of the grid
+    interpdeg : int
+        interpolation polynomial degree
+
+    Returns
+    -------
+    np.ndarray or None :
+        matrix of shape ``(len(target), len(source))``, or ``None`` if the
+        two grids coincide
+    """
+    return _xgrid_rotation(
+        tuple(float(x) for x in source), tuple(float(x) for x in target), interpdeg
+    )
+
+
+def rotate(stacked, source, target, interpdeg):
+    """Reinterpolate and rotate a batch of operators.
+
+    Parameters
+    ----------
+    stacked : np.ndarray
+        operators of shape ``(n, flavor, x, flavor, x)``
+    source : list(float)
+        x grid of the operators
+    target : list(float)
+        x grid of the grid
+    interpdeg : int
+        interpolation polynomial degree
+
+    Returns
+    -------
+    np.ndarray :
+        operators on the target x grid (output), in the evolution basis (input)
+    """
+    rotation = xgrid_rotation(source, target, interpdeg)
+    if rotation is None:
+        return np.einsum(FLAVOR_ROTATION, stacked, EVOLUTION_ROTATION, optimize=True)
+    return np.einsum(
+        XGRID_ROTATION, rotation, stacked, EVOLUTION_ROTATION, optimize=True
+    )
+
+
+def batch_size(shape, target_size, max_bytes=DEFAULT_BATCH_BYTES):
+    """Determine how many operators can be rotated at once.
+
+    Parameters
+    ----------
+    shape : tuple(int)
+        shape of a single operator
+    target_size : int
+        length of the target x grid
+    max_bytes : int
+        memory budget for the stacked operators and their rotation
+
+    Returns
+    -------
+    int :
+        number of operators in a batch (at least one)
+    """
+    flavors_out, _, flavors_in, x_in = shape
+    slice_bytes = 8 * (np.prod(shape) + flavors_out * target_size * flavors_in * x_in)
+    return max(int(max_bytes // slice_bytes), 1)
+
+
+def prepare(operator, evolgrid, target, interpdeg, max_bytes=DEFAULT_BATCH_BYTES):
+    """Load, reinterpolate and rotate the operators of some scales, in batches.
+
+    Only a batch of operators is kept in memory at any time.
+
+    Parameters
+    ----------
+    operator : eko.EKO
+        evolution operators
+    evolgrid : list(tuple(float, int))
+        evolution points to prepare
+    target : list(float)
+        x grid of the grid
+    interpdeg : int
+        interpolation polynomial degree
+    max_bytes : int
+        memory budget for a batch
+
+    Yields
+    ------
+    tuple(tuple(float, int), np.ndarray) :
+        evolution point and prepared operator
+    """
+    source = operator.xgrid.raw
+    size = None
+    batch = []
+    for idx, ep in enumerate(evolgrid):
+        op = operator[ep].operator
+        # drop the loaded operator, it is copied when stacked
+        del operator[ep]
+        if size is None:
+            size = batch_size(op.shape, len(target), max_bytes)
+        batch.append(op)
+        if len(batch) < size and idx < len(evolgrid) - 1:
+            continue
+        rotated = rotate(np.stack(batch), source, target, interpdeg)
+        batch = []
+        yield from zip(evolgrid[idx + 1 - len(rotated) : idx + 1], rotated)
+
+
+def channel_pids(grid):
+    """Collect the flavors appearing in the channels of a grid.
+
+    Parameters
+    ----------
+    grid : pineappl.grid.Grid
+        grid to evolve
+
+    Returns
+    -------
+    set(int) or None :
+        PDG ids of all the convolutions, or ``None`` if the grid is not in the
+        PDG basis
+    """
+    if grid.pid_basis != pineappl.pids.PidBasis.Pdg:
+        return None
+    pids = {pid for channel in grid.channels() for pids, _ in channel for pid in pids}
+    # the gluon might be stored as 0
+    if 0 in pids:
+        pids.add(21)
+    return pids
+
+
+@dataclasses.dataclass
+class Reduction:
+    """Reduction of the prepared operators to the flavors actually needed.
+
+    The output flavors not appearing in the grid are dropped, which leaves the
+    FK table unchanged. Optionally, the input evolution basis PDFs identified
+    by the flavor assumptions are merged as well (i.e. their operators summed),
+    as they would be after the evolution by
+    :meth:`pineappl.fk_table.FkTable.optimize`: the grid is then evolved into
+    fewer channels, but the FK table is only the same up to rounding, and its
+    channels may be ordered differently.
+
+    Parameters
+    ----------
+    rows : list(int)
+        output flavors kept, as indices in the flavor basis
+    columns : list(int)
+        input PDFs kept, as indices in the evolution basis
+    merges : list(tuple(int, int))
+        input PDFs merged, as indices (of source and target) in the evolution
+        basis
+    """
+
+    rows: list
+    columns: list
+    merges: list
+
+    @classmethod
+    def build(cls, pids, assumptions=None):
+        """Determine the reduction for a grid and the flavor assumptions.
+
+        Parameters
+        ----------
+        pids : set(int) or None
+            flavors appearing in the grid (see :func:`channel_pids`), all if
+            ``None``
+        assumptions : str or None
+            flavor assumptions, if given the PDFs identified by them are merged
+
+        Returns
+        -------
+        Reduction :
+            the reduction
+        """
+        flavors = basis_rotation.flavor_basis_pids
+        evolution = basis_rotation.evol_basis_pids
+        rows = [idx for idx, pid in enumerate(flavors) if pids is None or pid in pids]
+        merges = (
+            []
+            if assumptions is None
+            else [
+                (evolution.index(source), evolution.index(target))
+                for source, target in ASSUMPTIONS_MERGES[assumptions]
+            ]
+        )
+        sources = {source for source, _ in merges}
+        columns = [idx for idx in range(len(evolution)) if idx not in sources]
+        return cls(rows, columns, merges)
+
+    @property
+    def pids1(self):
+        """Output flavors, in the flavor basis."""
+        return [basis_rotation.flavor_basis_pids[idx] for idx in self.rows]
+
+    @property
+    def pids0(self):
+        """Input PDFs, in the evolution basis."""
+        return [basis_rotation.evol_basis_pids[idx] for idx in self.columns]
+
+    def apply(self, op):
+        """Reduce a prepared operator.
+
+        Parameters
+        ----------
+        op : np.ndarray
+            operator of shape ``(flavor, x, evolution, x)``
+
+        Returns
+        -------
+        np.ndarray :
+            operator of shape ``(len(rows), x, len(columns), x)``
+        """
+        reduced = np.take(op, self.rows, axis=0)
+        for source, target in self.merges:
+            reduced[:, :, target] += reduced[:, :, source]
+        return np.take(reduced, self.columns, axis=2)
+
+
+def reduce(prepared, reduction):
+    """Reduce prepared operators.
+
+    Parameters
+    ----------
+    prepared : iterable(tuple(tuple(float, int), np.ndarray))
+        evolution points and prepared operators
+    reduction : Reduction
+        the reduction
+
+    Yields
+    ------
+    tuple(tuple(float, int), np.ndarray) :
+        evolution point and reduced operator
+    """
+    for ep, op in prepared:
+        yield ep, reduction.apply(op)
+
+
+def prefetch_depth():
+    """Determine how many operators are prepared in advance.
+
+    Returns
+    -------
+    int :
+        the configured depth, or :data:`DEFAULT_PREFETCH_DEPTH`
+    """
+    generic = configs.configs.get(configs.GENERIC_OPTIONS, {})
+    return int(generic.get(PREFETCH_DEPTH_KEY, DEFAULT_PREFETCH_DEPTH))
+
+
+def merge_flavors():
+    """Determine whether the PDFs identified by the assumptions are merged.
+
+    Returns
+    -------
+    bool :
+        the configured choice, by default ``False``
+    """
+    generic = configs.configs.get(configs.GENERIC_OPTIONS, {})
+    return bool(generic.get(MERGE_FLAVORS_KEY, False))
+
+
+def prefetch(iterable, depth):
+    """Consume an iterable in a background thread, keeping some items ready.
+
+    At most ``depth`` items are waiting to be consumed (plus the one being
+    produced), so the memory stays bounded. Exceptions raised while producing
+    are raised again in the consumer.
+
+    Parameters
+    ----------
+    iterable : iterable
+        items to produce, it is only ever iterated by the background thread
+    depth : int
+        number of items produced in advance, if not positive the items are
+        simply produced on demand
+
+    Yields
+    ------
+    object :
+        the items, in order
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # give up as soon as the consumer is gone
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except Exception as e:  # pylint: disable=broad-except
+            put((None, e))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
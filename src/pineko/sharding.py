@@ -0,0 +1,226 @@
+"""Deterministic partition of the grids of a theory among independent jobs.
+
+Batch systems can run the same command in several array jobs: each of them
+selects its own shard of the grids, without any coordination. The partition
+only depends on the list of grids (and their estimated costs), so all the jobs
+agree on it.
+
+Each job records a report of the grids it processed, which can later be merged
+into a single summary.
+"""
+
+import json
+import pathlib
+import socket
+import time
+
+import numpy as np
+import rich
+
+from . import configs
+
+REPORT_PREFIX = "shard"
+"""Prefix of the report files."""
+
+
+def parse(spec):
+    """Parse a shard specification.
+
+    Parameters
+    ----------
+    spec : str
+        specification of the form ``i/N``, with ``0 <= i < N``
+
+    Returns
+    -------
+    tuple(int, int) :
+        shard index and number of shards
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError as e:
+        raise ValueError(f"Invalid shard '{spec}', expected 'i/N'") from e
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}', expected 0 <= i < N")
+    return index, count
+
+
+def grid_cost(grid):
+    """Estimate the cost of evolving a grid.
+
+    Parameters
+    ----------
+    grid : pineappl.grid.Grid
+        grid
+
+    Returns
+    -------
+    int :
+        number of factorization scales times the number of channels
+    """
+    order_mask = np.ones(len(grid.orders()), dtype=bool)
+    if len(order_mask) == 0:
+        return 1
+    mu2_points = len(grid.evolve_info(order_mask).fac1)
+    return max(mu2_points, 1) * max(len(grid.channels()), 1)
+
+
+def partition(costs, count):
+    """Partition items into balanced shards.
+
+    The most expensive items are assigned first, each to the least loaded
+    shard (longest processing time first).
+
+    Parameters
+    ----------
+    costs : list(float)
+        estimated cost of each item
+    count : int
+        number of shards
+
+    Returns
+    -------
+    list(list(int)) :
+        indices of the items in each shard, in their original order
+    """
+    loads = [0.0] * count
+    shards = [[] for _ in range(count)]
+    # stable sort: equally expensive items keep their order
+    for idx in sorted(range(len(costs)), key=lambda idx: -costs[idx]):
+        target = int(np.argmin(loads))
+        shards[target].append(idx)
+        loads[target] += costs[idx]
+    return [sorted(shard) for shard in shards]
+
+
+def select(items, shard, costs=None):
+    """Select the items of a shard.
+
+    Parameters
+    ----------
+    items : list
+        all the items
+    shard : tuple(int, int)
+        shard index and number of shards
+    costs : list(float) or None
+        estimated cost of each item, if not given all the items cost the same
+
+    Returns
+    -------
+    list :
+        the items of the shard, in their original order
+    """
+    index, count = shard
+    if costs is None:
+        costs = [1.0] * len(items)
+    return [items[idx] for idx in partition(costs, count)[index]]
+
+
+def reports_path():
+    """Folder containing the reports.
+
+    Returns
+    -------
+    pathlib.Path :
+        ``paths.logs.reports`` if configured, ``reports`` in the root folder
+        otherwise
+    """
+    paths = configs.configs["paths"]
+    path = paths["logs"].get("reports")
+    if path is None:
+        path = pathlib.Path(paths["root"]) / "reports"
+    return path
+
+
+def report_name(command, theory_id, shard):
+    """Name of the report file of a shard."""
+    index, count = shard
+    return f"{REPORT_PREFIX}-{theory_id}-{command}-{index}-of-{count}.json"
+
+
+def write_report(command, theory_id, shard, results, elapsed):
+    """Record the outcome of a shard.
+
+    Parameters
+    ----------
+    command : str
+        name of the sharded command
+    theory_id : int or str
+        theory identifier
+    shard : tuple(int, int)
+        shard index and number of shards
+    results : list(parallel.TaskResult)
+        results of the processed grids
+    elapsed : float
+        total time (in seconds)
+
+    Returns
+    -------
+    pathlib.Path :
+        report path
+    """
+    path = reports_path()
+    path.mkdir(parents=True, exist_ok=True)
+    report = dict(
+        command=command,
+        theory=str(theory_id),
+        shard=list(shard),
+        host=socket.gethostname(),
+        finished=time.strftime("%Y-%m-%d %H:%M:%S"),
+        elapsed=elapsed,
+        grids=[
+            dict(
+                name=result.name,
+                success=result.success,
+                elapsed=result.elapsed,
+                output=result.output,
+                error=result.error,
+            )
+            for result in results
+        ],
+    )
+    report_path = path / report_name(command, theory_id, shard)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    rich.print(f"[green]Success:[/] Wrote report to {report_path}")
+    return report_path
+
+
+def merge_reports(theory_id, command=None):
+    """Collect the reports of all the shards of a theory.
+
+    Parameters
+    ----------
+    theory_id : int or str
+        theory identifier
+    command : str or None
+        if given, only consider the reports of this command
+
+    Returns
+    -------
+    dict :
+        merged report, per command: the found and missing shards, the total
+        and the maximum shard time, and the results of all the grids
+    """
+    merged = {}
+    pattern = f"{REPORT_PREFIX}-{theory_id}-{command or '*'}-*-of-*.json"
+    for report_path in sorted(reports_path().glob(pattern)):
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+        index, count = report["shard"]
+        summary = merged.setdefault(
+            report["command"],
+            dict(count=count, shards=[], elapsed=0.0, wall=0.0, grids=[]),
+        )
+        summary["shards"].append(index)
+        summary["elapsed"] += report["elapsed"]
+        summary["wall"] = max(summary["wall"], report["elapsed"])
+        summary["grids"].extend(
+            dict(shard=index, host=report["host"], **grid) for grid in report["grids"]
+        )
+    for summary in merged.values():
+        summary["shards"] = sorted(summary["shards"])
+        summary["missing"] = sorted(
+            set(range(summary["count"])) - set(summary["shards"])
+        )
+    return merged
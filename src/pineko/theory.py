@@ -6,33 +6,62 @@ together with other theory ingredients (such as C-factors) are often
 commonly referred to as 'theory'.
 """
 
+import concurrent.futures
+import contextlib
+import json
 import logging
+import os
+import pathlib
 import time
+import uuid
 
 import eko
 import numpy as np
+import pandas as pd
 import pineappl
 import rich
 import yaml
 from eko.runner.managed import solve
 
-from . import check, configs, evolve, parser, scale_variations, theory_card
+from . import (
+    alphas,
+    check,
+    comparator,
+    configs,
+    eko_store,
+    ekocache,
+    evolve,
+    gridcache,
+    manifest,
+    parallel,
+    parser,
+    scale_variations,
+    sharding,
+    theory_card,
+    workqueue,
+)
 from .utils import read_grids_from_nnpdf
 
 logger = logging.getLogger(__name__)
 
+UNION_MAP = "_union-map.yaml"
+"""File associating the ekos of the grids to the shared ekos."""
+UNION_PREFIX = "_union-"
+"""Prefix of the shared ekos names."""
 
-def _check_for_scale_variations(tcard, grid_path):
+
+def _check_for_scale_variations(tcard, grid):
     """Check that the grid is compatible with the requested scale_variations (if any).
 
     Parameters
     ----------
     tcard : dict
         theory card
-    grid_path : pathlib.Path
-        path to grid
+    grid : pathlib.Path or pineappl.grid.Grid
+        path to grid, or the grid itself
     """
-    grid = pineappl.grid.Grid.read(grid_path)
+    if not isinstance(grid, pineappl.grid.Grid):
+        grid = pineappl.grid.Grid.read(grid)
     xir = tcard["XIR"]
     xif = tcard["XIF"]
     max_al = 0  # We don't do SV for alpha
@@ -46,13 +75,13 @@ def _check_for_scale_variations(tcard, grid_path):
         check_scvar_evolve(grid, max_as, max_al, check.Scale.FACT)
 
 
-def get_eko_names(grid_path, name, filter=True):
+def get_eko_names(grid, name, filter=True):
     """Get the names of the ekos depending on the types of convolutions.
 
     Parameters
     ----------
-    grid_path : pathlib.Path
-        path to grid
+    grid : pathlib.Path or pineappl.grid.Grid
+        path to grid, or the grid itself
     name : str
         grid name, i.e. it's true stem
     filter: bool
@@ -63,8 +92,9 @@ def get_eko_names(grid_path, name, filter=True):
     list[str] :
          list containing the names of the ekos
     """
-    grid_kv = pineappl.grid.Grid.read(grid_path)
-    convolutions = grid_kv.convolutions
+    if not isinstance(grid, pineappl.grid.Grid):
+        grid = pineappl.grid.Grid.read(grid)
+    convolutions = grid.convolutions
     names = []
     for convolution in convolutions:
         suffix = evolve.get_convolution_suffix(convolution)
@@ -84,6 +114,68 @@ def check_scvar_evolve(grid, max_as, max_al, kind: check.Scale):
         raise ValueError("No available central order or sv order.")
 
 
+SCALE_KEYS = ["ID", "XIR", "XIF", "Comments"]
+"""Theory card keys which may differ among theories sharing the ekos."""
+
+
+def check_scale_theory(tcard, other):
+    """Check that the FK tables of another theory can be computed with the ekos of a theory.
+
+    The theories have to differ only by the scale variations, and the
+    factorization scale only if it is not included in the ekos (i.e. in scheme
+    C, where the ekos have to provide the shifted scales as well: otherwise
+    the FK tables of the other theory are skipped, see :meth:`TheoryBuilder.fk`).
+
+    Parameters
+    ----------
+    tcard : dict
+        theory card of the ekos
+    other : dict
+        theory card of the other theory
+    """
+    keys = (set(tcard) | set(other)) - set(SCALE_KEYS)
+    different = sorted(key for key in keys if tcard.get(key) != other.get(key))
+    if len(different) > 0:
+        raise ValueError(
+            f"Theory {other.get('ID')} does not differ only by the scales: "
+            f"{', '.join(different)} differ"
+        )
+    if evolve.sv_scheme(tcard) is not None and not np.isclose(
+        tcard["XIF"], other["XIF"]
+    ):
+        raise ValueError(
+            f"Theory {other.get('ID')} requires ekos with a different "
+            "factorization scale variation"
+        )
+
+
+def perturbative_order(tcard, convolutions):
+    """Determine the maximum power of the strong coupling of an FK table.
+
+    Parameters
+    ----------
+    tcard : dict
+        theory card
+    convolutions : list(pineappl.convolutions.Conv)
+        convolutions of the grid
+
+    Returns
+    -------
+    int :
+        maximum power of the strong coupling
+    """
+    # Relevant for FONLL-B and FONLL-D: For FFN0 terms, PTO is lower than
+    # PTODIS, see :meth:`TheoryBuilder.fk`
+    pto = tcard["PTO"]
+    if "FONLL" in tcard["FNS"] and tcard.get("PTODIS") is not None:
+        pto = tcard["PTODIS"]
+    max_as = 1 + int(pto)
+    # Check if we are computing FONLL-B fktable and eventually change max_as
+    if check.is_fonll_mixed(tcard["FNS"], convolutions):
+        max_as += 1
+    return max_as
+
+
 class TheoryBuilder:
     """Common builder application to create the ingredients for a theory.
 
@@ -99,10 +191,34 @@ class TheoryBuilder:
         erease previos logs (instead of appending)
     overwrite : bool
         allow files to be overwritten instead of skipping
+    incremental : bool
+        regenerate existing files only if their inputs changed, see
+        :mod:`pineko.manifest`
+    grid_cache_size : int
+        memory budget (in bytes) for the grids kept loaded during the run
+    shard : tuple(int, int) or None
+        if given, only process the grids of the given shard (index and number
+        of shards), see :mod:`pineko.sharding`
+    shard_by_cost : bool
+        balance the shards according to the estimated cost of the grids,
+        instead of their number
+    max_memory : int or None
+        if given, approximate memory budget (in bytes) of each evolution, see
+        :func:`pineko.evolve.evolve_grid_scales`
     """
 
     def __init__(
-        self, theory_id, datasets, silent=False, clear_logs=False, overwrite=False
+        self,
+        theory_id,
+        datasets,
+        silent=False,
+        clear_logs=False,
+        overwrite=False,
+        incremental=False,
+        grid_cache_size=gridcache.DEFAULT_MAX_BYTES,
+        shard=None,
+        shard_by_cost=False,
+        max_memory=None,
     ):
         """Initialize theory object."""
         self.theory_id = theory_id
@@ -110,6 +226,19 @@ class TheoryBuilder:
         self.silent = silent
         self.clear_logs = clear_logs
         self.overwrite = overwrite
+        self.incremental = incremental
+        self.grid_cache = gridcache.GridCache(grid_cache_size)
+        self.shard = shard
+        self.shard_by_cost = shard_by_cost
+        self.max_memory = max_memory
+        self.recomputed_ekos = set()
+        """Stored EKOs already recomputed by this builder, when overwriting."""
+
+    def __getstate__(self):
+        """Do not send the loaded grids to other processes."""
+        state = self.__dict__.copy()
+        state["grid_cache"] = gridcache.GridCache(self.grid_cache.max_bytes)
+        return state
 
     @property
     def operator_cards_path(self):
@@ -138,6 +267,25 @@ class TheoryBuilder:
         """Suffix paths.fktables with theory id."""
         return configs.configs["paths"]["fktables"] / str(self.theory_id)
 
+    def fktable_path(self, name, tid=None):
+        """Suffix paths.fktables with theory id and the grid name.
+
+        Parameters
+        ----------
+        name : str
+            grid name, i.e. it's true stem
+        tid : int or None
+            theory id, defaults to the one of this theory
+
+        Returns
+        -------
+        pathlib.Path :
+            path to the FK table
+        """
+        if tid is None:
+            tid = self.theory_id
+        return configs.configs["paths"]["fktables"] / str(tid) / f"{name}.{parser.EXT}"
+
     def grids_path(self, tid=None):
         """Suffix paths.grids with theory id.
 
@@ -277,14 +425,151 @@ class TheoryBuilder:
         f : callable
             iterated callable recieving name and grid as argument
         """
+        grids = self.all_grids()
         for ds in self.datasets:
             rich.print(f"Analyze {ds}")
-            grids = self.load_grids(ds)
-            for name, grid in grids.items():
-                f(name, grid, **kwargs)
+            for grid_ds, name, grid in grids:
+                if grid_ds == ds:
+                    f(name, grid, **kwargs)
             rich.print()
 
-    def opcard(self, name, grid, tcard, ipd=4, iil=True):
+    def all_grids(self, sharded=True):
+        """Collect the grids of all datasets.
+
+        Parameters
+        ----------
+        sharded : bool
+            only keep the grids of the current shard (if any)
+
+        Returns
+        -------
+        list(tuple(str, str, pathlib.Path)) :
+            flattened list of dataset, grid name and grid path
+        """
+        grids = [
+            (ds, name, grid)
+            for ds in self.datasets
+            for name, grid in self.load_grids(ds).items()
+        ]
+        if self.shard is None or not sharded:
+            return grids
+        costs = None
+        if self.shard_by_cost:
+            costs = [
+                sharding.grid_cost(self.grid_cache.get(grid).grid)
+                for _ds, _name, grid in grids
+            ]
+        return sharding.select(grids, self.shard, costs)
+
+    def iterate_parallel(self, f, jobs, **kwargs):
+        """Iterate grids in datasets, distributing them over several processes.
+
+        Failing grids do not stop the iteration, instead they are reported in
+        the final summary.
+        Additional keyword arguments are simply passed down.
+
+        Parameters
+        ----------
+        f : callable
+            iterated callable recieving name and grid as argument, it has to be
+            a method of the builder (to be sent to the workers)
+        jobs : int
+            number of worker processes
+
+        Returns
+        -------
+        list(parallel.TaskResult) :
+            results of all the grids
+        """
+        tasks = [
+            parallel.Task(f"{ds}/{name}", f, (name, grid), kwargs)
+            for ds, name, grid in self.all_grids()
+        ]
+        rich.print(f"Distribute {len(tasks)} grids over {jobs} processes")
+        results = parallel.run(tasks, jobs)
+        rich.print()
+        parallel.print_summary(results)
+        return results
+
+    def run_shard(self, command, tasks, jobs=1, callback=None):
+        """Run the tasks of the current shard and record a report.
+
+        Parameters
+        ----------
+        command : str
+            name of the command, identifying the report
+        tasks : list(parallel.Task)
+            tasks of the shard
+        jobs : int
+            number of cores, the tasks are run in the current process if 1
+        callback : callable or None
+            called with the result of each task, see :func:`parallel.run`
+
+        Returns
+        -------
+        list(parallel.TaskResult) :
+            results of all the tasks
+        """
+        index, count = self.shard
+        rich.print(f"Shard {index}/{count}: {len(tasks)} tasks")
+        start_time = time.perf_counter()
+        if jobs > 1:
+            results = parallel.run(tasks, jobs, callback=callback)
+        else:
+            results = parallel.run_serial(tasks, callback=callback)
+        elapsed = time.perf_counter() - start_time
+        rich.print()
+        parallel.print_summary(results)
+        sharding.write_report(command, self.theory_id, self.shard, results, elapsed)
+        return results
+
+    def keep_existing(self, path, kind, expected):
+        """Decide whether an already existing file has to be kept.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            path to the file
+        kind : str
+            description of the file, for the user
+        expected : callable
+            computing the expected manifest, only called in incremental mode
+
+        Returns
+        -------
+        bool :
+            whether the file exists and it should not be regenerated
+        """
+        if not (path.exists() or path.is_symlink()) or self.overwrite:
+            return False
+        if not self.incremental:
+            rich.print(f"Skipping existing {kind} {path}")
+            return True
+        if manifest.is_up_to_date(path, expected()):
+            rich.print(f"Skipping up-to-date {kind} {path}")
+            return True
+        rich.print(f"Updating stale {kind} {path}")
+        return False
+
+    def record(self, path, recorded):
+        """Record the manifest of a generated file, if needed.
+
+        The manifests are only used (and then written) in incremental mode,
+        otherwise the outdated ones are removed.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            path to the file
+        recorded : dict
+            manifest of the file
+        """
+        if self.incremental:
+            manifest.dump(path, recorded)
+        else:
+            manifest.remove(path)
+
+    def opcard(self, name, grid, tcard, ipd=4, iil=True, trim_xgrid=False):
         """Write a single operator card.
 
         Parameters
@@ -295,28 +580,188 @@ class TheoryBuilder:
             path to grid
         tcard : dict
             theory card
+        trim_xgrid : bool
+            drop the x grid nodes well below the x range of the grid
         """
+        grid_handle = self.grid_cache.get(grid)
+        pineappl_grid = grid_handle.grid
         # Before creating the operator card, check whether this grid is legal or not
-        _check_for_scale_variations(tcard, grid)
+        _check_for_scale_variations(tcard, pineappl_grid)
 
         opcard_path = self.operator_cards_path / f"{name}.yaml"
-        if opcard_path.exists():
-            if not self.overwrite:
-                rich.print(f"Skipping existing operator card {opcard_path}")
-                return
-        _x_grid, q2_grid = evolve.write_operator_card_from_file(
-            grid,
+        opcard_manifest = manifest.opcard(grid_handle.md5, tcard, ipd, iil, trim_xgrid)
+        if self.keep_existing(opcard_path, "operator card", lambda: opcard_manifest):
+            return
+        _x_grid, q2_grid = evolve.write_operator_card(
+            pineappl_grid,
             opcard_path,
             tcard,
             ipd,
             iil,
+            trim_xgrid,
         )
+        self.record(opcard_path, opcard_manifest)
+
+    def opcards(self, ipd=4, iil=True, union=None, trim_xgrid=False):
+        """Write operator cards.
 
-    def opcards(self, ipd=4, iil=True):
-        """Write operator cards."""
+        Parameters
+        ----------
+        ipd : int
+            interpolation polynomial degree
+        iil : bool
+            interpolation is log
+        union : str or None
+            if given, either "dataset" or "theory": the grids of each dataset
+            (or of the whole theory) will share a single eko, computed over
+            the union of their scales
+        trim_xgrid : bool
+            drop the x grid nodes well below the x range of each grid (or of
+            the grids sharing an eko), see :func:`pineko.evolve.trimmed_xgrid`
+
+        Returns
+        -------
+        list(parallel.TaskResult) or None :
+            results of the grids of the shard, if sharded
+        """
         tcard = theory_card.load(self.theory_id)
         self.operator_cards_path.mkdir(exist_ok=True)
-        self.iterate(self.opcard, tcard=tcard, ipd=ipd, iil=iil)
+        results = None
+        if self.shard is None:
+            self.iterate(
+                self.opcard, tcard=tcard, ipd=ipd, iil=iil, trim_xgrid=trim_xgrid
+            )
+        else:
+            tasks = [
+                parallel.Task(
+                    f"{ds}/{name}",
+                    self.opcard,
+                    (name, grid),
+                    dict(tcard=tcard, ipd=ipd, iil=iil, trim_xgrid=trim_xgrid),
+                )
+                for ds, name, grid in self.all_grids()
+            ]
+            results = self.run_shard("opcards", tasks)
+            # the shared cards depend on all the grids: only written once
+            if self.shard[0] != 0:
+                return results
+        union_map_path = self.operator_cards_path / UNION_MAP
+        if union is None:
+            if union_map_path.exists():
+                union_map_path.unlink()
+            return results
+        self.union_opcards(tcard, ipd, iil, union, trim_xgrid)
+        return results
+
+    def union_opcards(self, tcard, ipd, iil, union, trim_xgrid=False):
+        """Write operator cards shared among grids.
+
+        Each shared card contains the union of the scales of the grids of a
+        dataset (or of the whole theory) requiring the same kind of
+        convolution. Grids requiring a different card in any other respect
+        (e.g. a different x grid) are grouped separately.
+        The association between the ekos of each grid and the shared ones is
+        recorded in the operator cards folder.
+
+        Parameters
+        ----------
+        tcard : dict
+            theory card
+        ipd : int
+            interpolation polynomial degree
+        iil : bool
+            interpolation is log
+        union : str
+            either "dataset" or "theory"
+        trim_xgrid : bool
+            drop the x grid nodes well below the x range of all the grids
+            sharing an eko
+        """
+        if union not in ("dataset", "theory"):
+            raise ValueError(f"Unknown union mode '{union}'")
+        groups = {}
+        for ds, name, grid_path in self.all_grids(sharded=False):
+            grid = self.grid_cache.get(grid_path).grid
+            card, _q2_grid = evolve.build_operator_card(grid, tcard, ipd, iil)
+            # the grids are grouped according to the full x grid, while the
+            # trimmed one has to cover all of them
+            xgrid = card["xgrid"]
+            if trim_xgrid:
+                trimmed, _q2_grid = evolve.build_operator_card(
+                    grid, tcard, ipd, iil, trim_xgrid=True
+                )
+                xgrid = trimmed["xgrid"]
+            for conv in grid.convolutions:
+                conv_card = evolve.convolution_card(card, conv)
+                mugrid = conv_card.pop("mugrid")
+                scope = f"ds-{ds}" if union == "dataset" else "theory"
+                suffix = evolve.get_convolution_suffix(conv)
+                key = (scope, suffix, yaml.safe_dump(conv_card))
+                if key not in groups:
+                    groups[key] = dict(
+                        card=conv_card, mugrid=set(), ekos=set(), xgrid=xgrid
+                    )
+                if len(xgrid) > len(groups[key]["xgrid"]):
+                    groups[key]["xgrid"] = xgrid
+                groups[key]["mugrid"].update((float(mu), int(nf)) for mu, nf in mugrid)
+                groups[key]["ekos"].add(f"{name}{suffix}")
+
+        union_map = {}
+        counter = {}
+        for (scope, suffix, _), group in groups.items():
+            # nothing to share
+            if len(group["ekos"]) < 2:
+                continue
+            variant = counter.get((scope, suffix), 0)
+            counter[(scope, suffix)] = variant + 1
+            shared_name = f"{UNION_PREFIX}{scope}{suffix}"
+            if variant > 0:
+                shared_name += f"-{variant}"
+            shared_card = dict(group["card"])
+            shared_card["mugrid"] = sorted(group["mugrid"])
+            shared_card["xgrid"] = group["xgrid"]
+            evolve.dump_card(
+                self.operator_cards_path / f"{shared_name}.yaml", shared_card
+            )
+            union_map.update({eko_name: shared_name for eko_name in group["ekos"]})
+
+        with open(self.operator_cards_path / UNION_MAP, "w", encoding="utf-8") as f:
+            yaml.safe_dump(union_map, f)
+
+    def load_union_map(self):
+        """Load the association between ekos and shared ekos.
+
+        Returns
+        -------
+        dict :
+            mapping eko names to shared eko names
+        """
+        union_map_path = self.operator_cards_path / UNION_MAP
+        if not union_map_path.exists():
+            return {}
+        with open(union_map_path, encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+
+    def shared_ekos(self, union):
+        """List the shared ekos to be computed.
+
+        Parameters
+        ----------
+        union : dict
+            mapping eko names to shared eko names
+
+        Returns
+        -------
+        list(str) :
+            names of the shared ekos (of the current shard, if any)
+        """
+        shared = sorted(set(union.values()))
+        if self.shard is None:
+            return shared
+        costs = None
+        if self.shard_by_cost:
+            costs = [len(self.load_operator_card(n)["mugrid"]) for n in shared]
+        return sharding.select(shared, self.shard, costs)
 
     def load_operator_card(self, name, int_cores=1):
         """Read current operator card.
@@ -370,8 +815,8 @@ class TheoryBuilder:
             logger_.setLevel(logging.INFO)
         return True
 
-    def eko(self, name, grid, tcard, int_cores):
-        """Compute a single eko.
+    def eko(self, name, grid, tcard, int_cores, union=None):
+        """Compute the ekos of a single grid.
 
         Parameters
         ----------
@@ -381,6 +826,10 @@ class TheoryBuilder:
             path to grid
         tcard : dict
             theory card
+        int_cores : int
+            number of integration cores
+        union : dict or None
+            mapping eko names to shared eko names, see :meth:`union_opcards`
         """
         paths = configs.configs["paths"]
         # activate logging
@@ -388,51 +837,295 @@ class TheoryBuilder:
             paths["logs"]["eko"], f"{self.theory_id}-{name}.log", ("eko",)
         )
         # setup data
-        names = get_eko_names(grid, name)
+        names = get_eko_names(self.grid_cache.get(grid).grid, name)
+        union = {} if union is None else union
 
         for name in names:
-            ocard = self.load_operator_card(name, int_cores)
-            # For nFONLL mixed prescriptions (such as FONLL-B) the PTO written on
-            # the tcard is used to produce the grid by yadism and it might be different
-            # from the PTO needed for the PDF evolution (and so by EKO). Here we
-            # ensure that the PTO used in the EKO calculation reflects the real
-            # perturbative order of the prescription.
-            if tcard.get("PTOEKO") is not None:
-                tcard["PTO"] = tcard["PTOEKO"]
-            # Deprecated keys still needed by eko below. TODO: remove them asap.
-            tcard["Qedref"] = tcard["Qref"]
-            tcard["MaxNfAs"] = tcard["MaxNfPdf"]
-            # The operator card has been already generated in the correct format
-            # The theory card needs to be converted to a format that eko can use
-            legacy_class = eko.io.runcards.Legacy(tcard, ocard)
-            new_theory = legacy_class.new_theory
-            new_op = eko.io.runcards.OperatorCard.from_dict(ocard)
-            eko_filename = self.ekos_path() / f"{name}.tar"
-            if eko_filename.exists():
-                if not self.overwrite:
-                    rich.print(f"Skipping existing operator {eko_filename}")
-                    return
-                eko_filename.unlink()
-            # do it!
-            logger.info("Start computation of %s", name)
-            start_time = time.perf_counter()
-            # Actual computation of the EKO
+            if name in union:
+                self.link_eko(name, union[name])
+            else:
+                self.solve_eko(name, tcard, int_cores)
+
+    def shared_eko(self, name, tcard, int_cores):
+        """Compute a single eko shared among several grids.
+
+        Parameters
+        ----------
+        name : str
+            shared eko name
+        tcard : dict
+            theory card
+        int_cores : int
+            number of integration cores
+        """
+        paths = configs.configs["paths"]
+        self.activate_logging(
+            paths["logs"]["eko"], f"{self.theory_id}-{name}.log", ("eko",)
+        )
+        self.solve_eko(name, tcard, int_cores)
+
+    def link_eko(self, name, shared_name):
+        """Link the eko of a grid to the shared one.
+
+        Parameters
+        ----------
+        name : str
+            eko name
+        shared_name : str
+            shared eko name
+        """
+        eko_filename = self.ekos_path() / f"{name}.tar"
+        shared_filename = self.ekos_path() / f"{shared_name}.tar"
+        if self.keep_existing(
+            eko_filename, "operator", lambda: manifest.load(shared_filename)
+        ):
+            return
+        eko_store.link(eko_filename, shared_filename)
+        if eko_filename.exists():
+            # the eko is the shared one
+            shared_manifest = manifest.load(shared_filename)
+            if shared_manifest is not None:
+                self.record(eko_filename, shared_manifest)
+            rich.print(f"[green]Success:[/] Created link at {eko_filename}")
+
+    def solve_eko(self, name, tcard, int_cores):
+        """Compute a single eko from its operator card.
+
+        Parameters
+        ----------
+        name : str
+            eko name, i.e. the operator card stem
+        tcard : dict
+            theory card
+        int_cores : int
+            number of integration cores
+        """
+        ocard = self.load_operator_card(name, int_cores)
+        # For nFONLL mixed prescriptions (such as FONLL-B) the PTO written on
+        # the tcard is used to produce the grid by yadism and it might be different
+        # from the PTO needed for the PDF evolution (and so by EKO). Here we
+        # ensure that the PTO used in the EKO calculation reflects the real
+        # perturbative order of the prescription.
+        if tcard.get("PTOEKO") is not None:
+            tcard["PTO"] = tcard["PTOEKO"]
+        # Deprecated keys still needed by eko below. TODO: remove them asap.
+        tcard["Qedref"] = tcard["Qref"]
+        tcard["MaxNfAs"] = tcard["MaxNfPdf"]
+        # The operator card has been already generated in the correct format
+        # The theory card needs to be converted to a format that eko can use
+        legacy_class = eko.io.runcards.Legacy(tcard, ocard)
+        new_theory = legacy_class.new_theory
+        new_op = eko.io.runcards.OperatorCard.from_dict(ocard)
+        eko_filename = self.ekos_path() / f"{name}.tar"
+        digest = eko_store.card_hash(new_theory.raw, new_op.raw)
+        eko_manifest = manifest.eko(digest)
+        if self.keep_existing(eko_filename, "operator", lambda: eko_manifest):
+            return
+        if eko_filename.exists() or eko_filename.is_symlink():
+            eko_filename.unlink()
+        # do it!
+        logger.info("Start computation of %s", name)
+        start_time = time.perf_counter()
+        # Actual computation of the EKO
+        if eko_store.path() is None:
             solve(new_theory, new_op, eko_filename)
-            logger.info(
-                "Finished computation of %s - took %f s",
-                name,
-                time.perf_counter() - start_time,
+        else:
+            # Reuse an identical EKO, if it was already computed (when
+            # overwriting, only once it has been recomputed)
+            stored, reused = eko_store.store(
+                digest,
+                lambda path: solve(new_theory, new_op, path),
+                overwrite=self.overwrite and digest not in self.recomputed_ekos,
             )
-            if eko_filename.exists():
-                rich.print(f"[green]Success:[/] Wrote EKO to {eko_filename}")
+            self.recomputed_ekos.add(digest)
+            eko_store.link(eko_filename, stored)
+            if reused:
+                logger.info("Reused stored operator %s", digest)
+                rich.print(f"Reusing stored operator {stored}")
+        logger.info(
+            "Finished computation of %s - took %f s",
+            name,
+            time.perf_counter() - start_time,
+        )
+        if eko_filename.exists():
+            self.record(eko_filename, eko_manifest)
+            rich.print(f"[green]Success:[/] Wrote EKO to {eko_filename}")
+
+    def eko_cost(self, name, grid, union=None):
+        """Estimate the cost of computing the ekos of a grid.
+
+        The cost is given by the number of Q2 points in the
+        operator cards (shared ekos are not accounted for).
+
+        Parameters
+        ----------
+        name : str
+            grid name, i.e. it's true stem
+        grid : pathlib.Path
+            path to grid
+        union : dict or None
+            mapping eko names to shared eko names
+
+        Returns
+        -------
+        int :
+            estimated cost
+        """
+        union = {} if union is None else union
+        return sum(
+            len(self.load_operator_card(eko_name)["mugrid"])
+            for eko_name in get_eko_names(self.grid_cache.get(grid).grid, name)
+            if eko_name not in union
+        )
+
+    def ekos(self, int_cores=1, cores=None, max_int_cores=8):
+        """Compute all ekos.
+
+        If the operator cards were generated for shared ekos (see
+        :meth:`opcards`), the shared ekos are computed first, and then linked
+        by the grids.
+
+        Parameters
+        ----------
+        int_cores : int
+            number of integration cores of each eko, used when no core budget
+            is given
+        cores : int or None
+            if given, the total number of cores used to compute several ekos
+            concurrently; the integration cores of each eko are then chosen
+            according to the size of its operator card
+        max_int_cores : int
+            maximum number of integration cores of a single eko, used together
+            with a core budget
 
-    def ekos(self, int_cores=1):
-        """Compute all ekos."""
+        Returns
+        -------
+        list(parallel.TaskResult) or None :
+            results of all the ekos, if computed concurrently or sharded
+        """
         tcard = theory_card.load(self.theory_id)
         self.ekos_path().mkdir(exist_ok=True)
-        self.iterate(self.eko, tcard=tcard, int_cores=int_cores)
+        union = self.load_union_map()
+        shared = self.shared_ekos(union)
+        if self.shard is not None:
+            if cores is not None and cores > 1:
+                tasks = self.eko_tasks(tcard, cores, max_int_cores)
+                return self.run_shard("ekos", tasks, cores)
+            tasks = [
+                parallel.Task(
+                    shared_name,
+                    self.shared_eko,
+                    (shared_name,),
+                    dict(tcard=tcard, int_cores=int_cores),
+                )
+                for shared_name in shared
+            ]
+            tasks += [
+                parallel.Task(
+                    f"{ds}/{name}",
+                    self.eko,
+                    (name, grid),
+                    dict(tcard=tcard, int_cores=int_cores, union=union),
+                )
+                for ds, name, grid in self.all_grids()
+            ]
+            return self.run_shard("ekos", tasks)
+        if cores is None or cores <= 1:
+            for shared_name in shared:
+                self.shared_eko(shared_name, tcard, int_cores)
+            self.iterate(self.eko, tcard=tcard, int_cores=int_cores, union=union)
+            return None
+
+        tasks = self.eko_tasks(tcard, cores, max_int_cores)
+        rich.print(f"Distribute {len(tasks)} ekos over {cores} cores")
+        results = parallel.run(tasks, cores)
+        rich.print()
+        parallel.print_summary(results)
+        return results
+
+    def eko_tasks(self, tcard, cores, max_int_cores=8, label=""):
+        """Prepare the computation of all ekos within a core budget.
+
+        The shared ekos (see :meth:`opcards`) are required by the ekos of the
+        grids linking them. When sharded, the shared ekos are distributed over
+        the shards as well: the grids only link those assigned to other
+        shards, which are expected to be computed by the corresponding jobs.
+
+        Parameters
+        ----------
+        tcard : dict
+            theory card
+        cores : int
+            total number of cores
+        max_int_cores : int
+            maximum number of integration cores of a single eko
+        label : str
+            appended to the task names
+
+        Returns
+        -------
+        list(parallel.Task) :
+            tasks, named after the shared ekos and the grids
+        """
+        union = self.load_union_map()
+        shared = self.shared_ekos(union)
+        grids = self.all_grids()
+        costs = [len(self.load_operator_card(n)["mugrid"]) for n in shared]
+        costs += [self.eko_cost(name, grid, union) for _ds, name, grid in grids]
+        allocation = parallel.allocate_cores(costs, cores, max_int_cores)
+        tasks = [
+            parallel.Task(
+                f"{shared_name}{label}",
+                self.shared_eko,
+                (shared_name,),
+                dict(tcard=tcard, int_cores=n_cores),
+                cores=n_cores,
+            )
+            for shared_name, n_cores in zip(shared, allocation)
+        ]
+        for (ds, name, grid), n_cores in zip(grids, allocation[len(shared) :]):
+            eko_names = get_eko_names(self.grid_cache.get(grid).grid, name)
+            requires = {
+                f"{union[n]}{label}"
+                for n in eko_names
+                if n in union and union[n] in shared
+            }
+            tasks.append(
+                parallel.Task(
+                    f"{ds}/{name}{label}",
+                    self.eko,
+                    (name, grid),
+                    dict(tcard=tcard, int_cores=n_cores, union=union),
+                    cores=n_cores,
+                    requires=tuple(sorted(requires)),
+                )
+            )
+        return tasks
 
-    def fk(self, name, grid_path, tcard, pdfs):
+    def fk_manifest(self, name, grid_handle, tcard):
+        """Compute the manifest of an FK table, see :func:`pineko.manifest.fk`.
+
+        Parameters
+        ----------
+        name : str
+            grid name, i.e. it's true stem
+        grid_handle : gridcache.GridHandle
+            the loaded grid
+        tcard : dict
+            theory card of the FK table
+
+        Returns
+        -------
+        dict :
+            the manifest
+        """
+        names = get_eko_names(grid_handle.grid, name, filter=False)
+        eko_hashes = [
+            manifest.eko_hash(self.ekos_path() / f"{ekoname}.tar") for ekoname in names
+        ]
+        return manifest.fk(grid_handle.md5, eko_hashes, tcard)
+
+    def fk(self, name, grid_path, tcard, pdfs, scale_cards=None, defer_manifest=False):
         """Compute a single FK table.
 
         Parameters
@@ -445,6 +1138,19 @@ class TheoryBuilder:
             theory card
         pdfs : list[str]
             list of PDF set for comparisons
+        scale_cards : dict or None
+            theory cards of other theories (by theory id), differing only by the
+            scales, whose FK tables are computed as well with the same ekos, see
+            :func:`check_scale_theory`
+        defer_manifest : bool
+            do not write the manifests (and remove the outdated ones), such that
+            the FK tables are only considered up to date once their comparison
+            passes, see :meth:`check_fk`
+
+        Returns
+        -------
+        list(int) :
+            theory ids of the FK tables written
         """
         # activate logging
         paths = configs.configs["paths"]
@@ -457,34 +1163,44 @@ class TheoryBuilder:
         # PTODIS, thus using PTO instead of PTODIS to establish the perturbative
         # order would result in the PTODIS terms that correspond to orders
         # beyond PTO to be neglected
-        if "FONLL" in tcard["FNS"] and tcard.get("PTODIS") is not None:
-            tcard["PTO"] = tcard["PTODIS"]
+        cards = {self.theory_id: tcard, **(scale_cards or {})}
+        for card in cards.values():
+            if "FONLL" in card["FNS"] and card.get("PTODIS") is not None:
+                card["PTO"] = card["PTODIS"]
 
-        # check if grid contains SV if theory is requesting them (in particular
-        # if theory is requesting scheme A or C)
-        xir = tcard["XIR"]
-        xif = tcard["XIF"]
         xia = 1.0  # TODO: modify into `tcard["XIA"]`
-        # loading grid
-        grid = pineappl.grid.Grid.read(grid_path)
-        # remove zero subgrid
-        grid.optimize()
+        # loading grid (with zero subgrids already removed)
+        grid_handle = self.grid_cache.get(grid_path)
+        grid = grid_handle.grid
 
         # Do you need one or multiple ekos?
-        names = get_eko_names(grid_path, name, filter=False)
+        names = get_eko_names(grid, name, filter=False)
         eko_filename = [self.ekos_path() / f"{ekoname}.tar" for ekoname in names]
-        fk_filename = self.fks_path / f"{name}.{parser.EXT}"
-        if fk_filename.exists():
-            if not self.overwrite:
-                rich.print(f"Skipping existing FK Table {fk_filename}")
-                return
-        max_as = 1 + int(tcard["PTO"])
-        # Check if we are computing FONLL-B fktable and eventually change max_as
-        if check.is_fonll_mixed(
-            tcard["FNS"],
-            grid.convolutions,
-        ):
-            max_as += 1
+
+        def fk_manifest(card):
+            return self.fk_manifest(name, grid_handle, card)
+
+        # the FK tables still to be computed, one per scale choice
+        choices = []
+        tids = []
+        for tid, card in cards.items():
+            fk_filename = paths["fktables"] / str(tid) / f"{name}.{parser.EXT}"
+            if self.keep_existing(
+                fk_filename, "FK Table", lambda card=card: fk_manifest(card)
+            ):
+                continue
+            if card is not tcard:
+                # check if grid contains SV if theory is requesting them
+                _check_for_scale_variations(card, grid)
+            choices.append(
+                evolve.ScaleChoice(
+                    fk_filename, card["XIR"], card["XIF"], xia, theory_meta=card
+                )
+            )
+            tids.append(tid)
+        if len(choices) == 0:
+            return []
+        max_as = perturbative_order(tcard, grid.convolutions)
 
         # NB: This would not happen for nFONLL
         max_al = 0
@@ -496,109 +1212,562 @@ class TheoryBuilder:
                 == 0
             ):
                 rich.print("[green] Skipping empty grid.")
-                return
+                return []
 
         # TODO: Add fragmentation scale variations
-        # loading ekos to produce a tmp copy
-        n_ekos = len(eko_filename)
-        with eko.EKO.read(eko_filename[0]) as first_operator:
-            # Skip the computation of the fktable if the eko is empty
-            if len(first_operator.mu2grid) == 0 and check.is_num_fonll(tcard["FNS"]):
-                rich.print("[green] Skipping empty eko for nFONLL.")
-                return
-
-            first_eko_tmp_path = (
-                first_operator.paths.root.parent
-                / f"eko-tmp-{name}-{np.random.rand()}.tar"
-            )
-            first_operator.deepcopy(first_eko_tmp_path)
-
-        if n_ekos > 1:
-            extra_eko_tmp_path = []
-            for eko_idx in range(1, n_ekos):
-                with eko.EKO.read(eko_filename[eko_idx]) as extra_operators:
-                    eko_tmp_path_extra = (
-                        first_operator.paths.root.parent
-                        / f"eko-tmp-{name}-{np.random.rand()}.tar"
-                    )
-                    extra_operators.deepcopy(eko_tmp_path_extra)
-                    extra_eko_tmp_path.append(eko_tmp_path_extra)
-
-        with eko.EKO.edit(first_eko_tmp_path) as first_operator:
-            # Obtain the assumptions hash
-            assumptions = theory_card.construct_assumptions(tcard)
-            # do it!
-            logger.info("Start computation of %s", name)
+        # the ekos are only read: each of them is extracted once per run, and
+        # read from the extracted folder, see `ekocache`
+        operators = [ekocache.read(path) for path in eko_filename]
+        # Skip the computation of the fktable if the eko is empty
+        if len(operators[0].mu2grid) == 0 and check.is_num_fonll(tcard["FNS"]):
+            rich.print("[green] Skipping empty eko for nFONLL.")
+            return []
+        # Obtain the assumptions hash
+        assumptions = theory_card.construct_assumptions(tcard)
+        # do it!
+        logger.info("Start computation of %s", name)
+        for choice in choices:
             logger.info(
                 "max_as=%d, max_al=%d, xir=%f, xif=%f, xia=%f",
                 max_as,
                 max_al,
-                xir,
-                xif,
-                xia,
-            )
-            start_time = time.perf_counter()
-            rich.print(
-                rich.panel.Panel.fit(
-                    "Computing ...", style="magenta", box=rich.box.SQUARE
-                ),
-                f"   {grid_path}\n",
-                f"+ {eko_filename}\n",
-                f"= {fk_filename}\n",
-                f"with max_as={max_as}, max_al={max_al}, xir={xir}, xif={xif}, xia={xia}",
+                choice.xir,
+                choice.xif,
+                choice.xia,
             )
+        start_time = time.perf_counter()
+        rich.print(
+            rich.panel.Panel.fit("Computing ...", style="magenta", box=rich.box.SQUARE),
+            f"   {grid_path}\n",
+            f"+ {eko_filename}\n",
+            *(
+                f"= {choice.fktable_path}\n"
+                f"with max_as={max_as}, max_al={max_al}, xir={choice.xir}, "
+                f"xif={choice.xif}, xia={choice.xia}\n"
+                for choice in choices
+            ),
+        )
 
-            operators = [first_operator]
-            if n_ekos > 1:
-                for extra_ekos in extra_eko_tmp_path:
-                    operators.append(eko.EKO.edit(extra_ekos))
-
-            _grid, _fk, comparison = evolve.evolve_grid(
-                grid,
-                operators,
-                fk_filename,
-                max_as,
-                max_al,
-                xir=xir,
-                xif=xif,
-                xia=xia,
-                theory_meta=tcard,
-                assumptions=assumptions,
-                comparison_pdfs=pdfs,
-                grid_path=grid_path,
-            )
-
-            if n_ekos > 1:
-                # Remove tmp ekos
-                for eko_tmp in extra_eko_tmp_path:
-                    eko_tmp.unlink()
-
-        # Remove tmp ekos
-        first_eko_tmp_path.unlink()
+        # reuse the couplings computed by the other FK tables of the theory
+        alphas_path = alphas.path(self.theory_id)
+        alphas.load(alphas_path)
+        results = evolve.evolve_grid_scales(
+            grid,
+            operators,
+            choices,
+            max_as,
+            max_al,
+            theory_meta=tcard,
+            assumptions=assumptions,
+            comparison_pdfs=pdfs,
+            grid_path=grid_path,
+            grid_hash=grid_handle.md5,
+            max_memory=self.max_memory,
+            skip_incompatible=len(choices) > 1,
+        )
+        alphas.dump(alphas_path)
 
         logger.info(
             "Finished computation of %s - took %f s",
             name,
             time.perf_counter() - start_time,
         )
-        if do_log and comparison is not None:
-            logger.info(
-                f"Comparison with PDFs: {comb_pdf_logs}: \n {comparison.to_string()}"
+        for choice, (fktable, comparison) in zip(choices, results):
+            if do_log and comparison is not None:
+                logger.info(
+                    f"Comparison with PDFs: {comb_pdf_logs}: \n {comparison.to_string()}"
+                )
+            fk_filename = pathlib.Path(choice.fktable_path)
+            # a skipped FK table may be an outdated one
+            if fktable is not None and fk_filename.exists():
+                if defer_manifest:
+                    manifest.remove(fk_filename)
+                else:
+                    self.record(fk_filename, fk_manifest(choice.theory_meta))
+                rich.print(f"[green]Success:[/] Wrote FK table to {fk_filename}")
+        skipped = [tid for tid, (fktable, _) in zip(tids, results) if fktable is None]
+        if len(skipped) > 0:
+            raise ValueError(
+                f"The ekos do not provide the scales of the theories {skipped}"
             )
-        if fk_filename.exists():
-            rich.print(f"[green]Success:[/] Wrote FK table to {fk_filename}")
+        return tids
+
+    def fk_kwargs(self, tcard, pdfs, scale_theories=None):
+        """Collect the arguments of :meth:`fk` common to all the grids.
 
-    def fks(self, pdfs):
+        Parameters
+        ----------
+        tcard : dict
+            theory card
+        pdfs : list(str)
+            list of PDF sets to be used for the comparisons
+        scale_theories : list(int) or None
+            theory ids of the scale variations, see :meth:`fks`
+
+        Returns
+        -------
+        dict :
+            keyword arguments
+        """
+        kwargs = dict(tcard=tcard, pdfs=pdfs)
+        if not scale_theories:
+            return kwargs
+        kwargs["scale_cards"] = {}
+        for tid in scale_theories:
+            card = theory_card.load(tid)
+            check_scale_theory(tcard, card)
+            (configs.configs["paths"]["fktables"] / str(tid)).mkdir(exist_ok=True)
+            kwargs["scale_cards"][tid] = card
+        return kwargs
+
+    def fks(self, pdfs, jobs=1, scale_theories=None, compare_jobs=0):
         """Compute all FK tables.
 
         Parameters
         ----------
         pdfs : list(str)
             list of PDF sets to be used for the comparisons
+        jobs : int
+            number of FK tables computed concurrently
+        scale_theories : list(int) or None
+            theories differing only by the scales, whose FK tables are computed
+            as well, loading the ekos of this theory only once
+        compare_jobs : int
+            if positive (and comparing with ``pdfs``), the FK tables are
+            written immediately, and compared with their grids in as many
+            background processes, see :meth:`check_fk`
+
+        Returns
+        -------
+        list(parallel.TaskResult) or None :
+            results of all the grids (and comparisons), if run in parallel,
+            sharded or comparing in background
+        """
+        tcard = theory_card.load(self.theory_id)
+        self.fks_path.mkdir(exist_ok=True)
+        try:
+            if pdfs is not None and compare_jobs > 0:
+                return self.fks_deferred(
+                    tcard, pdfs, jobs, scale_theories, compare_jobs
+                )
+            kwargs = self.fk_kwargs(tcard, pdfs, scale_theories)
+            if self.shard is not None:
+                tasks = [
+                    parallel.Task(f"{ds}/{name}", self.fk, (name, grid), kwargs)
+                    for ds, name, grid in self.all_grids()
+                ]
+                return self.run_shard("fks", tasks, jobs)
+            if jobs > 1:
+                return self.iterate_parallel(self.fk, jobs, **kwargs)
+            self.iterate(self.fk, **kwargs)
+        finally:
+            # the extracted ekos are only needed during the run, unless other
+            # shards are still reading them
+            if self.shard is None:
+                ekocache.remove(self.ekos_path().glob("*.tar"))
+
+    def fks_deferred(self, tcard, pdfs, jobs, scale_theories, compare_jobs):
+        """Compute all FK tables, comparing them with their grids in background.
+
+        The evolutions never wait for the comparisons: each FK table is
+        written as soon as it is computed, and its comparison is queued.
+
+        Parameters
+        ----------
+        tcard : dict
+            theory card
+        pdfs : list(str)
+            list of PDF sets to be used for the comparisons
+        jobs : int
+            number of FK tables computed concurrently
+        scale_theories : list(int) or None
+            theories differing only by the scales, see :meth:`fks`
+        compare_jobs : int
+            number of comparisons run concurrently
+
+        Returns
+        -------
+        list(parallel.TaskResult) :
+            results of all the grids and comparisons
+        """
+        kwargs = self.fk_kwargs(tcard, None, scale_theories)
+        kwargs["defer_manifest"] = True
+        grids = {f"{ds}/{name}": (name, grid) for ds, name, grid in self.all_grids()}
+        tasks = [
+            parallel.Task(task_name, self.fk, args, kwargs)
+            for task_name, args in grids.items()
+        ]
+        pool = parallel.BackgroundPool(compare_jobs)
+        callback = self.queue_comparisons(
+            pool, grids, tcard, pdfs, kwargs.get("scale_cards")
+        )
+        if self.shard is not None:
+            results = self.run_shard("fks", tasks, jobs, callback=callback)
+        else:
+            rich.print(f"Distribute {len(tasks)} grids over {jobs} processes")
+            if jobs > 1:
+                results = parallel.run(tasks, jobs, callback=callback)
+            else:
+                results = parallel.run_serial(tasks, callback=callback)
+            rich.print()
+            parallel.print_summary(results)
+        rich.print(f"Waiting for {len(pool.submitted)} comparisons")
+        comparisons = pool.wait()
+        rich.print()
+        parallel.print_summary(comparisons)
+        return results + comparisons
+
+    def fks_worker(
+        self, pdfs, stale_after=600.0, poll=10.0, scale_theories=None, compare_jobs=0
+    ):
+        """Compute FK tables as one of several independent workers.
+
+        The grids are claimed through lock files in the state folder (see
+        :mod:`pineko.workqueue` and :func:`pineko.configs.state_path`), so any
+        number of workers, even on different nodes sharing the filesystem, can
+        work on the same theory. Each worker goes through all the grids,
+        waiting for the ones claimed by other workers to be released, and
+        taking over those left by crashed workers.
+
+        Parameters
+        ----------
+        pdfs : list(str)
+            list of PDF sets to be used for the comparisons
+        stale_after : float
+            time (in seconds) after which the claim of a worker which stopped
+            refreshing it is considered stale
+        poll : float
+            time (in seconds) to wait before checking again the grids claimed
+            by other workers
+        scale_theories : list(int) or None
+            theories differing only by the scales, see :meth:`fks`
+        compare_jobs : int
+            number of background processes comparing the FK tables with their
+            grids, see :meth:`fks`
+
+        Returns
+        -------
+        list(parallel.TaskResult) :
+            results of the grids (and comparisons) processed by this worker
         """
+        if self.overwrite:
+            raise ValueError(
+                "Workers can not overwrite FK tables, use the incremental mode instead"
+            )
         tcard = theory_card.load(self.theory_id)
         self.fks_path.mkdir(exist_ok=True)
-        self.iterate(self.fk, tcard=tcard, pdfs=pdfs)
+        pool = None
+        if pdfs is not None and compare_jobs > 0:
+            kwargs = self.fk_kwargs(tcard, None, scale_theories)
+            kwargs["defer_manifest"] = True
+            pool = parallel.BackgroundPool(compare_jobs)
+            grids = {
+                f"{ds}/{name}": (name, grid) for ds, name, grid in self.all_grids()
+            }
+            callback = self.queue_comparisons(
+                pool, grids, tcard, pdfs, kwargs.get("scale_cards")
+            )
+        else:
+            kwargs = self.fk_kwargs(tcard, pdfs, scale_theories)
+        queue = workqueue.WorkQueue(
+            configs.state_path("queue", self.theory_id), stale_after
+        )
+        pending = self.all_grids()
+        rich.print(f"Worker {queue.worker} started on {len(pending)} grids")
+        results = []
+        # the grids whose comparisons are still running: they stay claimed
+        # (the FK tables are not up to date until the comparisons pass, so
+        # other workers would compute them again)
+        comparing = {}
+
+        def release_compared(wait=False):
+            for name, (claim, futures) in list(comparing.items()):
+                if wait or all(future.done() for future in futures):
+                    concurrent.futures.wait(futures)
+                    claim.close()
+                    del comparing[name]
+
+        try:
+            while len(pending) > 0:
+                waiting = []
+                for ds, name, grid in pending:
+                    release_compared()
+                    fk_filename = self.fks_path / f"{name}.{parser.EXT}"
+                    # already computed by another worker
+                    if fk_filename.exists() and not self.incremental:
+                        continue
+                    if not queue.claim(name):
+                        waiting.append((ds, name, grid))
+                        continue
+                    task = parallel.Task(f"{ds}/{name}", self.fk, (name, grid), kwargs)
+                    with contextlib.ExitStack() as claim:
+                        claim.callback(queue.release, name)
+                        claim.enter_context(queue.heartbeat(name))
+                        result = parallel.execute(task)
+                        futures = callback(result) if pool is not None else []
+                        if len(futures) > 0:
+                            comparing[name] = (claim.pop_all(), futures)
+                    parallel.report(result)
+                    results.append(result)
+                pending = waiting
+                if len(pending) > 0:
+                    time.sleep(poll)
+            if pool is not None:
+                rich.print(f"Waiting for {len(pool.submitted)} comparisons")
+                results += pool.wait()
+        finally:
+            release_compared(wait=True)
+        rich.print()
+        parallel.print_summary(results)
+        return results
+
+    def build(
+        self,
+        pdfs=None,
+        ipd=4,
+        iil=True,
+        union=None,
+        cores=1,
+        max_int_cores=8,
+        trim_xgrid=False,
+    ):
+        """Generate operator cards, ekos and FK tables in a single pass.
+
+        The operator cards are written first, then the ekos and the FK tables
+        are computed concurrently within the core budget: the FK table of a
+        grid is started as soon as its ekos are available.
+
+        Parameters
+        ----------
+        pdfs : list(str) or None
+            list of PDF sets to be used for the comparisons
+        ipd : int
+            interpolation polynomial degree
+        iil : bool
+            interpolation is log
+        union : str or None
+            share ekos among the grids, see :meth:`opcards`
+        cores : int
+            total number of cores
+        max_int_cores : int
+            maximum number of integration cores of a single eko
+        trim_xgrid : bool
+            drop the x grid nodes well below the x range of the grids, see
+            :meth:`opcards`
+
+        Returns
+        -------
+        list(parallel.TaskResult) :
+            results of all the ekos and FK tables
+        """
+        tcard = theory_card.load(self.theory_id)
+        self.opcards(ipd=ipd, iil=iil, union=union, trim_xgrid=trim_xgrid)
+        self.ekos_path().mkdir(exist_ok=True)
+        self.fks_path.mkdir(exist_ok=True)
+        tasks = self.eko_tasks(tcard, cores, max_int_cores, label=" (eko)")
+        for ds, name, grid in self.all_grids():
+            tasks.append(
+                parallel.Task(
+                    f"{ds}/{name} (fk)",
+                    self.fk,
+                    (name, grid),
+                    dict(tcard=tcard, pdfs=pdfs),
+                    requires=(f"{ds}/{name} (eko)",),
+                    # complete the grids already started first
+                    priority=1,
+                )
+            )
+        rich.print(f"Distribute {len(tasks)} ekos and FK tables over {cores} cores")
+        results = parallel.run(tasks, cores)
+        rich.print()
+        parallel.print_summary(results)
+        return results
+
+    def compare_fk(self, name, grid_path, tcard, pdfs, threshold=5.0, theory_id=None):
+        """Compare a single FK table with its grid.
+
+        Parameters
+        ----------
+        name : str
+            grid name, i.e. it's true stem
+        grid_path : pathlib.Path
+            path to grid
+        tcard : dict
+            theory card
+        pdfs : list(str)
+            list of PDF sets, one for each convolution
+        threshold : float
+            maximum accepted difference, in permille
+        theory_id : int or None
+            theory of the FK table (e.g. a scale variation), if not this one
+
+        Returns
+        -------
+        pd.DataFrame :
+            comparison table, see :func:`pineko.comparator.compare`, with the
+            bin index and whether each bin is checked and passed
+        """
+        grid_handle = self.grid_cache.get(grid_path)
+        grid = grid_handle.grid
+        fk_path = self.fktable_path(name, theory_id)
+        if not fk_path.exists():
+            raise FileNotFoundError(fk_path)
+        fktable = pineappl.fk_table.FkTable.read(fk_path)
+        # the factorization scale variation may be included in the eko
+        xif = 1.0 if evolve.sv_scheme(tcard) is not None else tcard["XIF"]
+        xia = 1.0  # TODO: modify into `tcard["XIA"]`
+        df = comparator.compare(
+            grid,
+            fktable,
+            perturbative_order(tcard, grid.convolutions),
+            0,
+            pdfs,
+            (tcard["XIR"], xif, xia),
+            threshold=np.inf,
+            grid_hash=grid_handle.md5,
+        )
+        df.insert(0, "bin", np.arange(len(df)))
+        df["checked"] = comparator.checked_bins(df, grid.convolutions)
+        df["passed"] = ~df["checked"] | (df["permille_error"].abs() < threshold)
+        return df
+
+    def check_fk(self, name, grid_path, tcard, pdfs, threshold=5.0, theory_id=None):
+        """Compare an FK table with its grid, and store the result in its metadata.
+
+        The comparison table is stored as ``results_fk``, as if the comparison
+        was performed together with the evolution. Only if the comparison
+        passes, the manifest of the FK table is written (see :meth:`fk`), so a
+        failed FK table is computed again in incremental mode.
+
+        Parameters
+        ----------
+        name : str
+            grid name, i.e. it's true stem
+        grid_path : pathlib.Path
+            path to grid
+        tcard : dict
+            theory card
+        pdfs : list(str)
+            list of PDF sets, one for each convolution
+        threshold : float
+            maximum accepted difference, in permille
+        theory_id : int or None
+            theory of the FK table (e.g. a scale variation), if not this one
+        """
+        df = self.compare_fk(name, grid_path, tcard, pdfs, threshold, theory_id)
+        comparison = df.drop(columns=["bin", "checked", "passed"])
+        fk_path = self.fktable_path(name, theory_id)
+        fktable = pineappl.fk_table.FkTable.read(fk_path)
+        fktable.set_metadata("results_fk", comparison.to_string())
+        for idx, pdf in enumerate(pdfs):
+            fktable.set_metadata(f"results_fk_pdfset{idx}", str(pdf))
+        # replace the FK table atomically, it may be read in the meantime (even
+        # from other nodes, hence the unique name)
+        tmp = fk_path.with_name(f"{fk_path.name}.{uuid.uuid4().hex}.tmp")
+        fktable.write_lz4(str(tmp))
+        os.replace(tmp, fk_path)
+        rich.print(comparison.to_string())
+        if not df["passed"].all():
+            raise comparator.GridtoFKError(
+                f"The difference between the Grid and FK is above {threshold} permille."
+            )
+        # the theory card actually used for the FK table
+        card = json.loads(fktable.metadata["theory_card"])
+        manifest.dump(
+            fk_path, self.fk_manifest(name, self.grid_cache.get(grid_path), card)
+        )
+
+    def queue_comparisons(self, pool, grids, tcard, pdfs, scale_cards=None):
+        """Prepare the queueing of the comparisons of the FK tables.
+
+        Parameters
+        ----------
+        pool : parallel.BackgroundPool
+            pool running the comparisons
+        grids : dict
+            grid name and path of each task computing FK tables
+        tcard : dict
+            theory card
+        pdfs : list(str)
+            list of PDF sets, one for each convolution
+        scale_cards : dict or None
+            theory cards of the scale variations, see :meth:`fk`
+
+        Returns
+        -------
+        callable :
+            callback queueing the comparisons of the FK tables written by a
+            task (see :meth:`fk`), and returning their futures
+        """
+        cards = {self.theory_id: tcard, **(scale_cards or {})}
+
+        def callback(result):
+            if not result.success or not result.value:
+                return []
+            name, grid = grids[result.name]
+            return [
+                pool.submit(
+                    parallel.Task(
+                        f"{result.name} comparison ({tid})",
+                        self.check_fk,
+                        (name, grid, cards[tid], pdfs),
+                        dict(theory_id=tid),
+                    )
+                )
+                for tid in result.value
+            ]
+
+        return callback
+
+    def compare_fks(self, pdfs, jobs=1, threshold=5.0):
+        """Compare all FK tables with their grids.
+
+        Each PDF set is loaded only once per process, see :mod:`pineko.pdfcache`.
+
+        Parameters
+        ----------
+        pdfs : list(str)
+            list of PDF sets, one for each convolution
+        jobs : int
+            number of comparisons run concurrently
+        threshold : float
+            maximum accepted difference, in permille
+
+        Returns
+        -------
+        list(parallel.TaskResult) :
+            results of all the grids
+        pd.DataFrame :
+            comparison tables of all the grids, with their dataset and name
+        """
+        tcard = theory_card.load(self.theory_id)
+        grids = self.all_grids()
+        tasks = [
+            parallel.Task(
+                f"{ds}/{name}",
+                self.compare_fk,
+                (name, grid, tcard, pdfs),
+                dict(threshold=threshold),
+            )
+            for ds, name, grid in grids
+        ]
+        rich.print(f"Compare {len(tasks)} FK tables with {jobs} processes")
+        if jobs > 1:
+            results = parallel.run(tasks, jobs)
+        else:
+            results = parallel.run_serial(tasks)
+        rich.print()
+        parallel.print_summary(results)
+        tables = []
+        for (ds, name, _grid), result in zip(grids, results):
+            if result.success:
+                table = result.value
+                table.insert(0, "grid", name)
+                table.insert(0, "dataset", ds)
+                tables.append(table)
+        if len(tables) == 0:
+            return results, pd.DataFrame(columns=["dataset", "grid", "bin"])
+        return results, pd.concat(tables, ignore_index=True)
 
     def construct_ren_sv_grids(self, flavors):
         """Construct renormalization scale variations terms for all the grids in a dataset."""
@@ -0,0 +1,155 @@
+"""Work queue shared by independent workers through the filesystem.
+
+Workers (possibly running on different nodes with a shared filesystem) claim
+an item by atomically creating a lock file in a folder of the queue (i.e. not
+among the outputs, which may be distributed); while working on it, they
+periodically refresh the lock (heartbeat). A lock which has not been refreshed
+for long enough is considered stale, i.e. left by a crashed worker, and it can
+be taken over by another worker.
+"""
+
+import contextlib
+import json
+import os
+import pathlib
+import socket
+import threading
+import time
+
+LOCK_EXT = "lock"
+"""Extension of the lock files."""
+
+
+def worker_id():
+    """Identify the current worker.
+
+    Returns
+    -------
+    str :
+        host name and process id
+    """
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """Claim items through lock files in a folder.
+
+    Parameters
+    ----------
+    folder : os.PathLike
+        folder containing the lock files, created if needed
+    stale_after : float
+        time (in seconds) after which a lock which has not been refreshed is
+        considered stale
+    heartbeat : float or None
+        interval (in seconds) between lock refreshes, defaults to a quarter of
+        ``stale_after``
+    """
+
+    def __init__(self, folder, stale_after=600.0, heartbeat=None):
+        """Initialize the queue."""
+        self.folder = pathlib.Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.stale_after = stale_after
+        self.heartbeat_interval = (
+            heartbeat if heartbeat is not None else stale_after / 4.0
+        )
+        self.worker = worker_id()
+
+    def lock_path(self, item):
+        """Path of the lock file of an item."""
+        return self.folder / f"{item}.{LOCK_EXT}"
+
+    def is_locked(self, item):
+        """Check whether an item is currently claimed by any worker."""
+        return self.lock_path(item).exists()
+
+    def _is_stale(self, path):
+        try:
+            return time.time() - path.stat().st_mtime > self.stale_after
+        except FileNotFoundError:
+            return False
+
+    def claim(self, item):
+        """Try to claim an item.
+
+        A stale lock is first moved away (atomically, so only one worker can
+        take it over) and then the item is claimed as usual.
+
+        Parameters
+        ----------
+        item : str
+            item name
+
+        Returns
+        -------
+        bool :
+            whether the item has been claimed by this worker
+        """
+        path = self.lock_path(item)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not self._is_stale(path):
+                return False
+            if not self._recover(path):
+                return False
+            return self.claim(item)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(dict(worker=self.worker, claimed=time.time()), f)
+        return True
+
+    def _recover(self, path):
+        """Remove a stale lock, unless somebody else did it first."""
+        moved = path.with_name(f"{path.name}.stale-{self.worker}")
+        try:
+            os.rename(path, moved)
+        except FileNotFoundError:
+            return False
+        if not self._is_stale(moved):
+            # another worker recovered and claimed it in between: restore it
+            # (linking fails if the lock was claimed once more meanwhile)
+            with contextlib.suppress(FileExistsError):
+                os.link(moved, path)
+            moved.unlink()
+            return False
+        moved.unlink()
+        return True
+
+    def owner(self, item):
+        """Determine the worker holding the lock of an item.
+
+        Returns
+        -------
+        str or None :
+            worker identifier, if the item is claimed
+        """
+        try:
+            with open(self.lock_path(item), encoding="utf-8") as f:
+                return json.load(f)["worker"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def release(self, item):
+        """Release an item claimed by this worker."""
+        if self.owner(item) == self.worker:
+            self.lock_path(item).unlink(missing_ok=True)
+
+    @contextlib.contextmanager
+    def heartbeat(self, item):
+        """Keep refreshing the lock of an item, while working on it."""
+        stop = threading.Event()
+        path = self.lock_path(item)
+
+        def beat():
+            while not stop.wait(self.heartbeat_interval):
+                with contextlib.suppress(FileNotFoundError):
+                    os.utime(path)
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
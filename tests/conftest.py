@@ -1,4 +1,9 @@
+import types
+
+import pineappl
 import pytest
+from eko.interpolation import XGrid
+from eko.io.items import Operator
 
 
 @pytest.fixture
@@ -62,3 +67,113 @@ def toy_alphas():
         return 1.0
 
     return alphas
+
+
+def make_toy_grid(points=((10.0, 0.1, 0.25), (100.0, 0.01, 0.75)), polarized=False):
+    """Small DIS-like grid with two bins, two channels and two orders.
+
+    Each order and channel is filled at the given ``(q2, x, obs)`` points.
+    """
+    conv_type = pineappl.convolutions.ConvType(polarized=polarized, time_like=False)
+    conv = pineappl.convolutions.Conv(convolution_types=conv_type, pid=2212)
+    channels = [
+        pineappl.boc.Channel([([2], 1.0)]),
+        pineappl.boc.Channel([([21], 1.0)]),
+    ]
+    orders = [pineappl.boc.Order(0, 0, 0, 0, 0), pineappl.boc.Order(1, 0, 0, 0, 0)]
+    kinematics = [pineappl.boc.Kinematics.Scale(0), pineappl.boc.Kinematics.X(0)]
+    interpolations = [
+        pineappl.interpolation.Interp(
+            1.0,
+            1e4,
+            nodes=20,
+            order=3,
+            reweight_meth=pineappl.interpolation.ReweightingMethod.NoReweight,
+            map=pineappl.interpolation.MappingMethod.ApplGridH0,
+            interpolation_meth=pineappl.interpolation.InterpolationMethod.Lagrange,
+        ),
+        pineappl.interpolation.Interp(
+            1e-5,
+            1.0,
+            nodes=30,
+            order=3,
+            reweight_meth=pineappl.interpolation.ReweightingMethod.ApplGridX,
+            map=pineappl.interpolation.MappingMethod.ApplGridF2,
+            interpolation_meth=pineappl.interpolation.InterpolationMethod.Lagrange,
+        ),
+    ]
+    bins = pineappl.boc.BinsWithFillLimits.from_fill_limits(fill_limits=[0.0, 0.5, 1.0])
+    scales = pineappl.boc.Scales(
+        ren=pineappl.boc.ScaleFuncForm.Scale(0),
+        fac=pineappl.boc.ScaleFuncForm.Scale(0),
+        frg=pineappl.boc.ScaleFuncForm.NoScale(0),
+    )
+    grid = pineappl.grid.Grid(
+        pid_basis=pineappl.pids.PidBasis.Pdg,
+        channels=channels,
+        orders=orders,
+        bins=bins,
+        convolutions=[conv],
+        interpolations=interpolations,
+        kinematics=kinematics,
+        scale_funcs=scales,
+    )
+    for order in range(len(orders)):
+        for channel in range(len(channels)):
+            for q2, x, obs in points:
+                grid.fill(order, obs, channel, [q2, x], 1.0)
+    return grid
+
+
+@pytest.fixture
+def toy_grid_path(tmp_path):
+    """Path to a small grid written to disk."""
+    path = tmp_path / "TOY.pineappl.lz4"
+    make_toy_grid().write_lz4(str(path))
+    return path
+
+
+def make_toy_eko(path, grid, tcard, seed=0, mugrid=None):
+    """Write an EKO with random operators, for the scales of a grid.
+
+    If given, the scales ``mugrid`` are used instead of those of the grid. The
+    operator of each scale only depends on the scale and on ``seed``.
+    """
+    import eko
+    import numpy as np
+
+    import pineko.evolve
+
+    opcard, _ = pineko.evolve.build_operator_card(grid, tcard, 4, True)
+    opcard = pineko.evolve.convolution_card(opcard, grid.convolutions[0])
+    if mugrid is not None:
+        opcard["mugrid"] = [tuple(mu) for mu in mugrid]
+    legacy = eko.io.runcards.Legacy(tcard, opcard)
+    operator_card = eko.io.runcards.OperatorCard.from_dict(opcard)
+    with eko.EKO.create(path) as builder:
+        operator = builder.load_cards(legacy.new_theory, operator_card).build()
+        nx = len(operator_card.xgrid)
+        for ep in operator_card.evolgrid:
+            rng = np.random.default_rng([seed, round(ep[0] * 1e3), ep[1]])
+            operator[ep] = Operator(operator=rng.random((14, nx, 14, nx)))
+    return path
+
+
+class FakeEKO:
+    """Minimal in-memory stand-in for :class:`eko.EKO`."""
+
+    def __init__(self, xgrid, evolgrid, rng):
+        self.xgrid = XGrid(xgrid)
+        self.theory_card = types.SimpleNamespace(raw={"order": [2, 0]})
+        self.operator_card = types.SimpleNamespace(
+            raw={"configs": {}, "xgrid": list(xgrid)}
+        )
+        self.ops = {ep: rng.random((14, len(xgrid), 14, len(xgrid))) for ep in evolgrid}
+        self.loaded = set()
+
+    def __getitem__(self, ep):
+        self.loaded.add(ep)
+        return Operator(operator=self.ops[ep])
+
+    def __delitem__(self, ep):
+        self.loaded.remove(ep)
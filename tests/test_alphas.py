@@ -0,0 +1,41 @@
+import numpy as np
+from ekobox.cards import example
+
+from pineko import alphas, configs
+
+
+def test_a_s(tmp_path, monkeypatch):
+    alphas.clear()
+    theory = example.theory()
+    method = example.operator().configs.evolution_method
+    key, sc = alphas.couplings(theory, method)
+    # the coupling is set up once per theory
+    assert alphas.couplings(theory, method) == (key, sc)
+    mu2 = [10.0, 100.0, 10.0, 1000.0]
+    nf = [4, 5, 4, 5]
+    values = alphas.a_s(theory, method, mu2, nf)
+    expected = [sc.a_s(q2, nf_to=n) for q2, n in zip(mu2, nf)]
+    np.testing.assert_allclose(values, expected)
+    # repeated scales are computed only once
+    assert len(alphas._values) == 3
+    # the memoized values are shared through a file in the state folder
+    monkeypatch.setattr(configs, "configs", {"paths": {"state": tmp_path}})
+    path = alphas.path(400)
+    assert path == tmp_path / "alphas" / "400.json"
+    alphas.dump(path)
+    alphas.clear()
+    alphas.load(path)
+    assert len(alphas._values) == 3
+    np.testing.assert_allclose(alphas.a_s(theory, method, mu2, nf), expected)
+    # and merged with those already there
+    alphas.clear()
+    alphas.a_s(theory, method, [5.0], [4])
+    alphas.dump(path)
+    alphas.clear()
+    alphas.load(path)
+    assert len(alphas._values) == 4
+    assert sorted(p.name for p in path.parent.iterdir()) == ["400.json"]
+    monkeypatch.setattr(alphas, "MAX_VALUES", 2)
+    alphas.a_s(theory, method, [50.0], [4])
+    assert len(alphas._values) == 2
+    alphas.clear()
@@ -1,5 +1,7 @@
 import numpy as np
 import pineappl
+import pytest
+from conftest import make_toy_grid
 
 import pineko.check
 
@@ -158,3 +160,51 @@ def test_contains_ren():
     )
     assert checkres is pineko.check.AvailableAtMax.CENTRAL
     assert max_as_effective == max_as - 1
+
+
+def test_isin():
+    haystack = np.array([10.0, 1.0, 100.0])
+    needles = np.array([1.0 + 1e-9, 5.0, 100.0, 1000.0, 0.5])
+    assert pineko.check.isin(needles, haystack).tolist() == [
+        True,
+        False,
+        True,
+        False,
+        False,
+    ]
+    assert pineko.check.isin(needles, []).tolist() == [False] * 5
+    # general in1d returns a mask of the haystack
+    assert pineko.check.in1d(haystack, needles).tolist() == [
+        True,
+        False,
+        True,
+        False,
+        False,
+    ]
+
+
+def test_compatibility_report():
+    grid = make_toy_grid()
+    mask = pineappl.boc.Order.create_mask(grid.orders(), 3, 0, True)
+    info = grid.evolve_info(mask)
+    mu2 = np.array(info.fac1)
+    report = pineko.check.compatibility_report(grid, info.x1, mu2, 1.0, 3, 0)
+    assert report.compatible
+    assert report.errors() == []
+    # extra scales are allowed, missing ones are not
+    report = pineko.check.compatibility_report(
+        grid, info.x1, np.append(mu2[1:], 1e6), 1.0, 3, 0
+    )
+    assert not report.compatible
+    assert report.mu2_missing.tolist() == [mu2[0]]
+    assert report.mu2_unused.tolist() == [1e6]
+    assert len(report.errors()) == 1
+    # scale variations
+    report = pineko.check.compatibility_report(grid, info.x1, 4.0 * mu2, 2.0, 3, 0)
+    assert report.compatible
+    # x grid
+    report = pineko.check.compatibility_report(grid, info.x1[1:], mu2, 1.0, 3, 0)
+    assert report.x_missing.tolist() == [info.x1[0]]
+    with pytest.raises(ValueError):
+        pineko.check.check_grid_and_eko_compatible(grid, info.x1, 1e6, 1.0, 3, 0)
+    pineko.check.check_grid_and_eko_compatible(grid, info.x1, mu2[0], 1.0, 3, 0)
@@ -0,0 +1,42 @@
+import sys
+import types
+
+import numpy as np
+from banana.data.theories import default_card
+from conftest import make_toy_eko, make_toy_grid
+
+from pineko import comparator, configs, evolve, pdfcache
+
+
+class FakePDF:
+    def __init__(self, name, member):
+        self.member = member
+
+    def xfxQ2(self, pid, x, q2):
+        return x * (1.0 - x) ** 3 * (1.0 + 0.1 * pid + self.member)
+
+
+def test_fk_predictions(tmp_path, monkeypatch):
+    import eko
+
+    pdfcache.clear()
+    monkeypatch.setitem(
+        sys.modules, "lhapdf", types.SimpleNamespace(mkPDF=FakePDF, paths=lambda: [])
+    )
+    monkeypatch.setattr(configs, "configs", {})
+    tcard = dict(default_card, ModEv="TRN", Q0=1.65, FNS="FONLL-FFNS", NfFF=4)
+    grid = make_toy_grid()
+    make_toy_eko(tmp_path / "eko.tar", grid, tcard)
+    with eko.EKO.read(tmp_path / "eko.tar") as operator:
+        _, fktable, _ = evolve.evolve_grid(
+            grid, [operator], tmp_path / "fk.lz4", 2, 0, 1.0, 1.0, 1.0, tcard
+        )
+    expected = fktable.convolve(
+        pdg_convs=fktable.convolutions, xfxs=[FakePDF("PDF", 0).xfxQ2]
+    )
+    np.testing.assert_allclose(comparator.fk_predictions(fktable, ["PDF"]), expected)
+    # the PDF set is tabulated once, on the x grid at the initial scale
+    assert len(pdfcache._tables) == 1
+    comparator.fk_predictions(fktable, ["PDF"])
+    assert len(pdfcache._tables) == 1
+    pdfcache.clear()
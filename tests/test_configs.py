@@ -49,3 +49,8 @@ def test_default():
     }
     configs = pineko.configs.defaults(test_configs)
     assert configs["paths"]["ymldb"] == pathlib.Path("/my/root/path")
+    assert "eko_store" not in configs["paths"]
+    assert configs["paths"]["state"] == pathlib.Path("/my/root/path/.pineko")
+    test_configs["paths"]["eko_store"] = "data/store"
+    configs = pineko.configs.defaults(test_configs)
+    assert configs["paths"]["eko_store"] == pathlib.Path("/my/root/path/data/store")
@@ -0,0 +1,71 @@
+import pytest
+from ekobox.cards import example
+
+import pineko.configs
+from pineko import eko_store
+
+
+@pytest.fixture
+def store_configs(tmp_path):
+    previous = pineko.configs.configs
+    pineko.configs.configs = {"paths": {"eko_store": tmp_path / "store"}}
+    yield tmp_path / "store"
+    pineko.configs.configs = previous
+
+
+def test_card_hash():
+    theory = example.theory().raw
+    operator = example.operator().raw
+    digest = eko_store.card_hash(theory, operator)
+    # the number of cores does not change the operator
+    operator["configs"]["n_integration_cores"] = 8
+    assert eko_store.card_hash(theory, operator) == digest
+    # while the physics does
+    operator["mugrid"] = [(10.0, 5)]
+    assert eko_store.card_hash(theory, operator) != digest
+    operator = example.operator().raw
+    theory["order"] = [2, 0]
+    assert eko_store.card_hash(theory, operator) != digest
+
+
+def test_store(store_configs, tmp_path):
+    calls = []
+
+    def compute(path):
+        calls.append(path)
+        path.write_text("operator")
+
+    stored, reused = eko_store.store("abc", compute)
+    assert not reused
+    assert stored == store_configs / "abc.tar"
+    assert stored.read_text() == "operator"
+    stored_again, reused = eko_store.store("abc", compute)
+    assert reused
+    assert stored_again == stored
+    assert len(calls) == 1
+    # no leftovers
+    assert list(store_configs.iterdir()) == [stored]
+    # a corrupted EKO is replaced when overwriting
+    stored.write_text("corrupted")
+    _, reused = eko_store.store("abc", compute, overwrite=True)
+    assert not reused
+    assert stored.read_text() == "operator"
+    assert len(calls) == 2
+    assert calls[0].name != calls[1].name
+    assert list(store_configs.iterdir()) == [stored]
+    # link twice, the second one replacing the first
+    target = tmp_path / "grid.tar"
+    eko_store.link(target, stored)
+    eko_store.link(target, stored)
+    assert target.is_symlink()
+    assert target.read_text() == "operator"
+
+
+def test_store_failure(store_configs):
+    def compute(path):
+        path.write_text("partial")
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        eko_store.store("abc", compute)
+    assert list(store_configs.iterdir()) == []
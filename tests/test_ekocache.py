@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pytest
+from banana.data.theories import default_card
+from conftest import make_toy_eko, make_toy_grid
+
+import pineko.configs
+import pineko.ekocache
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    state = tmp_path / "state"
+    monkeypatch.setattr(pineko.configs, "configs", {"paths": {"state": state}})
+    return state
+
+
+def test_read(tmp_path, state):
+    import eko
+
+    tcard = dict(default_card, ModEv="TRN", Q0=1.65, FNS="FONLL-FFNS", NfFF=4)
+    path = make_toy_eko(tmp_path / "eko.tar", make_toy_grid(), tcard)
+    (tmp_path / "link.tar").symlink_to(path)
+    first = pineko.ekocache.read(path)
+    # the archive is extracted only once, also through links
+    second = pineko.ekocache.read(tmp_path / "link.tar")
+    assert len(list(state.joinpath("ekos").iterdir())) == 1
+    assert first.metadata.path == second.metadata.path
+    with eko.EKO.read(path) as expected:
+        assert first.mu2grid == expected.mu2grid
+        for ep in expected.evolgrid:
+            np.testing.assert_array_equal(first[ep].operator, expected[ep].operator)
+    pineko.ekocache.remove([tmp_path / "link.tar"])
+    assert len(list(state.joinpath("ekos").iterdir())) == 0
+    assert path.exists()
+
+
+def test_extract(tmp_path, state):
+    import tarfile
+
+    (tmp_path / "content").write_text("A")
+    with tarfile.open(tmp_path / "eko.tar", "w") as tar:
+        tar.add(tmp_path / "content", "content")
+    extracted = pineko.ekocache.extract(tmp_path / "eko.tar")
+    assert (extracted / "content").read_text() == "A"
+    assert pineko.ekocache.extract(tmp_path / "eko.tar") == extracted
+    # a modified archive is extracted again, dropping the former version
+    (tmp_path / "content").write_text("B")
+    with tarfile.open(tmp_path / "eko.tar", "w") as tar:
+        tar.add(tmp_path / "content", "content")
+    stat = (tmp_path / "eko.tar").stat()
+    os.utime(tmp_path / "eko.tar", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    updated = pineko.ekocache.extract(tmp_path / "eko.tar")
+    assert updated != extracted
+    assert (updated / "content").read_text() == "B"
+    assert list(state.joinpath("ekos").iterdir()) == [updated]
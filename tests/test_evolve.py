@@ -48,3 +48,226 @@ class FakePine:
     @property
     def metadata(self):
         return {"convolution_particle_1": 2212, "convolution_particle_2": 11}
+
+
+def test_order_ranges():
+    assert pineko.evolve.order_ranges(3) == [(1, 1), (2, 2), (3, 3)]
+    assert pineko.evolve.order_ranges(3, min_as=2) == [(2, 2), (3, 3)]
+    assert (
+        pineko.evolve.order_fktable_path("fk/DATA.pineappl.lz4", 2, 2).as_posix()
+        == "fk/DATA_as2.pineappl.lz4"
+    )
+    assert (
+        pineko.evolve.order_fktable_path("DATA.pineappl.lz4", 1, 3).name
+        == "DATA_as1-3.pineappl.lz4"
+    )
+
+
+def test_create_order_mask():
+    orders = [
+        pineappl.boc.Order(0, 0, 0, 0, 0),
+        pineappl.boc.Order(1, 0, 0, 0, 0),
+        pineappl.boc.Order(1, 0, 1, 0, 0),
+        pineappl.boc.Order(2, 0, 0, 0, 0),
+    ]
+    np.testing.assert_array_equal(
+        pineko.evolve.create_order_mask(orders, 2, 0), [True, True, True, False]
+    )
+    np.testing.assert_array_equal(
+        pineko.evolve.create_order_mask(orders, 3, 0, min_as=2),
+        [False, True, True, True],
+    )
+
+
+def test_trimmed_xgrid():
+    xgrid = np.geomspace(1e-7, 1.0, 15)
+    trimmed = pineko.evolve.trimmed_xgrid(xgrid, 1e-3, 2)
+    # two nodes are kept below the one not above 1e-3
+    assert trimmed[2] <= 1e-3 < trimmed[3]
+    np.testing.assert_allclose(trimmed, xgrid[-len(trimmed) :])
+    # nothing to trim
+    assert pineko.evolve.trimmed_xgrid(xgrid, 1e-8, 2) == xgrid.tolist()
+    # enough nodes are always kept
+    assert len(pineko.evolve.trimmed_xgrid(xgrid, 1.0, 4)) == 5
+
+
+def test_bin_chunks():
+    nbytes = pineko.evolve.evolution_nbytes(2, 3, 7, 50)
+    assert nbytes == 8 * 3 * 350**2
+    assert pineko.evolve.bin_chunks(5, nbytes, 2.5 * nbytes) == [[0, 1], [2, 3], [4]]
+    # at least a bin per chunk
+    assert pineko.evolve.bin_chunks(3, nbytes, -1) == [[0], [1], [2]]
+    assert pineko.evolve.bin_chunks(3, nbytes, 10 * nbytes) == [[0, 1, 2]]
+
+
+def test_build_operator_card_trimmed():
+    from conftest import make_toy_grid
+
+    tcard = dict(default_card, ModEv="TRN", Q0=1.65)
+    grid = make_toy_grid()
+    full, _ = pineko.evolve.build_operator_card(grid, tcard, 4, True)
+    trimmed, _ = pineko.evolve.build_operator_card(
+        grid, tcard, 4, True, trim_xgrid=True
+    )
+    assert full["xgrid"][-len(trimmed["xgrid"]) :] == trimmed["xgrid"]
+    assert len(trimmed["xgrid"]) < len(full["xgrid"])
+    assert trimmed["xgrid"][4] <= 1e-5 < trimmed["xgrid"][5]
+
+
+def test_evolve_grid_chunks(tmp_path):
+    import eko
+    from conftest import make_toy_eko, make_toy_grid
+
+    tcard = dict(default_card, ModEv="TRN", Q0=1.65, FNS="FONLL-FFNS", NfFF=4)
+    grid = make_toy_grid()
+    make_toy_eko(tmp_path / "eko.tar", grid, tcard)
+    with eko.EKO.read(tmp_path / "eko.tar") as operator:
+        _, full, _ = pineko.evolve.evolve_grid(
+            grid, [operator], tmp_path / "full.lz4", 2, 0, 1.0, 1.0, 1.0, tcard
+        )
+        # a budget fitting a single bin at a time
+        _, chunked, _ = pineko.evolve.evolve_grid(
+            grid,
+            [operator],
+            tmp_path / "chunked.lz4",
+            2,
+            0,
+            1.0,
+            1.0,
+            1.0,
+            tcard,
+            max_memory=1,
+        )
+    assert full.channels() == chunked.channels()
+    np.testing.assert_array_equal(full.table(), chunked.table())
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "chunked.lz4",
+        "eko.tar",
+        "full.lz4",
+    ]
+
+
+def test_evolve_grid_superset(tmp_path):
+    import eko
+    from conftest import make_toy_eko, make_toy_grid
+
+    tcard = dict(default_card, ModEv="TRN", Q0=1.65, FNS="FONLL-FFNS", NfFF=4)
+    grid = make_toy_grid()
+    grid.optimize()
+    make_toy_eko(tmp_path / "exact.tar", grid, tcard)
+    opcard, _ = pineko.evolve.build_operator_card(grid, tcard, 4, True)
+    # e.g. the eko shared with other grids
+    mugrid = sorted(set(map(tuple, opcard["mugrid"])) | {(2.0, 4), (50.0, 4)})
+    make_toy_eko(tmp_path / "superset.tar", grid, tcard, mugrid=mugrid)
+    fktables = []
+    for name in ["exact", "superset"]:
+        with eko.EKO.read(tmp_path / f"{name}.tar") as operator:
+            assert len(operator.mu2grid) == (2 if name == "exact" else 4)
+            _, fktable, _ = pineko.evolve.evolve_grid(
+                grid, [operator], tmp_path / f"{name}.lz4", 2, 0, 1.0, 1.0, 1.0, tcard
+            )
+            fktables.append(fktable)
+    assert fktables[0].channels() == fktables[1].channels()
+    np.testing.assert_allclose(fktables[0].table(), fktables[1].table())
+
+
+def test_evolve_grid_scales(tmp_path):
+    import eko
+    from conftest import make_toy_eko, make_toy_grid
+
+    tcard = dict(default_card, ModEv="TRN", Q0=1.65, FNS="FONLL-FFNS", NfFF=4)
+    tcard["ModSV"] = None
+    grid = make_toy_grid()
+    grid.optimize()
+    make_toy_eko(tmp_path / "eko.tar", grid, tcard)
+    choices = [
+        pineko.evolve.ScaleChoice(tmp_path / "central.lz4"),
+        pineko.evolve.ScaleChoice(tmp_path / "xir.lz4", xir=2.0),
+        # the eko does not provide the varied factorization scales
+        pineko.evolve.ScaleChoice(tmp_path / "xif.lz4", xif=2.0),
+    ]
+    with eko.EKO.read(tmp_path / "eko.tar") as operator:
+        with pytest.raises(ValueError):
+            pineko.evolve.evolve_grid_scales(grid, [operator], choices, 2, 0, tcard)
+        results = pineko.evolve.evolve_grid_scales(
+            grid, [operator], choices, 2, 0, tcard, skip_incompatible=True
+        )
+        assert results[2] == (None, None)
+        assert not (tmp_path / "xif.lz4").exists()
+        for choice, (fktable, _) in zip(choices[:2], results):
+            # the same as a separate evolution
+            _, expected, _ = pineko.evolve.evolve_grid(
+                grid,
+                [operator],
+                tmp_path / "expected.lz4",
+                2,
+                0,
+                choice.xir,
+                choice.xif,
+                choice.xia,
+                tcard,
+            )
+            assert fktable.channels() == expected.channels()
+            np.testing.assert_allclose(fktable.table(), expected.table())
+    # the renormalization scale changes the FK table
+    assert not np.allclose(results[0][0].table(), results[1][0].table())
+
+
+def test_evolve_grid_scales_orders(tmp_path):
+    import eko
+    from conftest import make_toy_eko, make_toy_grid
+
+    def by_channel(fktable):
+        table = fktable.table()
+        return {
+            tuple(channel): table[:, idx]
+            for idx, channel in enumerate(fktable.channels())
+        }
+
+    tcard = dict(default_card, ModEv="TRN", Q0=1.65, FNS="FONLL-FFNS", NfFF=4)
+    grid = make_toy_grid()
+    grid.optimize()
+    make_toy_eko(tmp_path / "eko.tar", grid, tcard)
+    ranges = pineko.evolve.order_ranges(2)
+    choices = [
+        pineko.evolve.ScaleChoice(
+            pineko.evolve.order_fktable_path(tmp_path / "fk.lz4", min_as, max_as),
+            max_as=max_as,
+            min_as=min_as,
+        )
+        for min_as, max_as in ranges
+    ]
+    choices.append(pineko.evolve.ScaleChoice(tmp_path / "fk.lz4"))
+    with eko.EKO.read(tmp_path / "eko.tar") as operator:
+        # a single preparation of the operators
+        results = pineko.evolve.evolve_grid_scales(
+            grid, [operator], choices, 2, 0, tcard
+        )
+        for (min_as, max_as), (fktable, _) in zip(ranges, results):
+            # the same as a separate evolution
+            _, expected, _ = pineko.evolve.evolve_grid(
+                grid,
+                [operator],
+                tmp_path / "expected.lz4",
+                max_as,
+                0,
+                1.0,
+                1.0,
+                1.0,
+                tcard,
+                min_as=min_as,
+            )
+            assert fktable.channels() == expected.channels()
+            np.testing.assert_allclose(fktable.table(), expected.table())
+    # the orders add up to the full FK table
+    full = by_channel(results[-1][0])
+    total = {channel: np.zeros_like(table) for channel, table in full.items()}
+    for fktable, _ in results[:-1]:
+        for channel, table in by_channel(fktable).items():
+            total[channel] += table
+    assert total.keys() == full.keys()
+    for channel, table in full.items():
+        np.testing.assert_allclose(total[channel], table)
+    # each order contributes
+    for fktable, _ in results[:-1]:
+        assert np.abs(fktable.table()).sum() > 0
@@ -0,0 +1,58 @@
+import hashlib
+import pickle
+
+import pineappl
+
+import pineko.theory
+from pineko import gridcache
+
+
+def test_load(toy_grid_path):
+    handle = gridcache.load(toy_grid_path)
+    assert handle.md5 == hashlib.md5(toy_grid_path.read_bytes()).hexdigest()
+    assert handle.nbytes > 0
+    assert handle.grid.bins() == 2
+
+
+def test_file_md5(tmp_path):
+    # spanning several chunks
+    content = bytes(range(256)) * 10_000
+    (tmp_path / "file").write_bytes(content)
+    assert gridcache.file_md5(tmp_path / "file") == hashlib.md5(content).hexdigest()
+
+
+def test_cache(toy_grid_path):
+    cache = gridcache.GridCache()
+    first = cache.get(toy_grid_path)
+    # the grid is loaded only once
+    assert cache.get(toy_grid_path) is first
+    # unless the file changes
+    grid = pineappl.grid.Grid.read(toy_grid_path)
+    grid.set_metadata("description", "modified")
+    grid.write_lz4(str(toy_grid_path))
+    second = cache.get(toy_grid_path)
+    assert second is not first
+    assert second.grid.metadata["description"] == "modified"
+
+
+def test_cache_bounded(toy_grid_path, tmp_path):
+    handle = gridcache.load(toy_grid_path)
+    cache = gridcache.GridCache(max_bytes=int(1.5 * handle.nbytes))
+    other_path = tmp_path / "OTHER.pineappl.lz4"
+    other_path.write_bytes(toy_grid_path.read_bytes())
+    cache.get(toy_grid_path)
+    cache.get(other_path)
+    # the least recently used grid is dropped
+    assert [key[0] for key in cache.handles] == [other_path.resolve()]
+    # but the last loaded one is always kept
+    cache.max_bytes = 0
+    cache.get(toy_grid_path)
+    assert [key[0] for key in cache.handles] == [toy_grid_path.resolve()]
+
+
+def test_builder_pickle(toy_grid_path):
+    builder = pineko.theory.TheoryBuilder(400, ["DS"])
+    builder.grid_cache.get(toy_grid_path)
+    restored = pickle.loads(pickle.dumps(builder))
+    assert len(restored.grid_cache.handles) == 0
+    assert len(builder.grid_cache.handles) == 1
@@ -0,0 +1,80 @@
+import pytest
+
+import pineko.configs
+import pineko.theory
+from pineko import manifest
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        pineko.configs, "configs", {"paths": {"state": tmp_path / "state"}}
+    )
+    return tmp_path / "state"
+
+
+def test_theory_hash():
+    tcard = {"PTO": 2, "XIF": 1.0, "Comments": "first"}
+    base = manifest.theory_hash(tcard, manifest.FK_KEYS)
+    # irrelevant keys do not matter
+    assert manifest.theory_hash({**tcard, "Comments": "x"}, manifest.FK_KEYS) == base
+    assert manifest.theory_hash({**tcard, "PTO": 1}, manifest.FK_KEYS) != base
+
+
+def test_up_to_date(tmp_path, state):
+    (tmp_path / "cards" / "400").mkdir(parents=True)
+    artifact = tmp_path / "cards" / "400" / "A.yaml"
+    expected = manifest.opcard("abc", {"PTO": 2}, 4, True)
+    assert not manifest.is_up_to_date(artifact, expected)
+    artifact.write_text("content")
+    # no manifest recorded
+    assert not manifest.is_up_to_date(artifact, expected)
+    manifest.dump(artifact, expected)
+    # outside of the folder of the ingredient
+    assert manifest.path(artifact) == state / "manifests/cards/400/A.yaml.manifest"
+    assert list(artifact.parent.iterdir()) == [artifact]
+    assert manifest.is_up_to_date(artifact, expected)
+    assert not manifest.is_up_to_date(
+        artifact, manifest.opcard("def", {"PTO": 2}, 4, True)
+    )
+    manifest.remove(artifact)
+    assert not manifest.is_up_to_date(artifact, expected)
+
+
+def test_eko_hash(tmp_path, state):
+    eko_path = tmp_path / "A.tar"
+    eko_path.write_bytes(b"1234")
+    # fall back to file information
+    assert manifest.eko_hash(eko_path).startswith("4-")
+    manifest.dump(eko_path, manifest.eko("digest"))
+    assert manifest.eko_hash(eko_path) == "digest"
+
+
+def test_keep_existing(tmp_path, state):
+    artifact = tmp_path / "A.yaml"
+    artifact.write_text("content")
+    manifest.dump(artifact, {"grid": "abc"})
+    builder = pineko.theory.TheoryBuilder(400, [])
+    assert builder.keep_existing(artifact, "file", lambda: {"grid": "def"})
+    builder.incremental = True
+    assert builder.keep_existing(artifact, "file", lambda: {"grid": "abc"})
+    assert not builder.keep_existing(artifact, "file", lambda: {"grid": "def"})
+    assert not builder.keep_existing(tmp_path / "B.yaml", "file", lambda: {})
+    builder.overwrite = True
+    assert not builder.keep_existing(artifact, "file", lambda: {"grid": "abc"})
+
+
+def test_record(tmp_path, state):
+    artifact = tmp_path / "A.yaml"
+    artifact.write_text("content")
+    builder = pineko.theory.TheoryBuilder(400, [])
+    # the manifests are only written when used
+    builder.record(artifact, {"grid": "abc"})
+    assert manifest.load(artifact) is None
+    builder.incremental = True
+    builder.record(artifact, {"grid": "abc"})
+    assert manifest.load(artifact) == {"grid": "abc"}
+    # and the outdated ones are removed
+    builder.incremental = False
+    builder.record(artifact, {"grid": "def"})
+    assert manifest.load(artifact) is None
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+from conftest import FakeEKO
+
+import pineko.configs
+from pineko import opcache, rotations
+
+
+def test_prepare(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        pineko.configs, "configs", {"paths": {"operator_cache": tmp_path}}
+    )
+    rng = np.random.default_rng(0)
+    xgrid = np.geomspace(1e-4, 1.0, 10)
+    target = np.geomspace(1e-3, 0.9, 6)
+    evolgrid = [(10.0, 4), (20.0, 5), (30.0, 5)]
+    fake = FakeEKO(xgrid, evolgrid, rng)
+    reference = dict(rotations.prepare(fake, evolgrid, target, 3))
+    # partially filled, then complete
+    for eps in [evolgrid[1:], evolgrid]:
+        prepared = list(opcache.prepare(fake, eps, target, 3))
+        assert [ep for ep, _ in prepared] == eps
+        for ep, op in prepared:
+            np.testing.assert_allclose(op, reference[ep])
+    (entry,) = tmp_path.iterdir()
+    assert len(list(entry.iterdir())) == 3
+    # cached operators are not loaded anymore
+    fake.ops = {}
+    prepared = list(opcache.prepare(fake, evolgrid, target, 3))
+    assert isinstance(prepared[0][1], np.memmap)
+    # a different x grid is a different entry
+    other = FakeEKO(xgrid, evolgrid, rng)
+    list(opcache.prepare(other, evolgrid[:1], target[1:], 3))
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_evict(tmp_path):
+    for idx, name in enumerate("abc"):
+        entry = tmp_path / name
+        entry.mkdir()
+        (entry / "op.npy").write_bytes(b"0" * 100)
+        os.utime(entry, (idx, idx))
+    assert opcache.evict(tmp_path, 250, keep=tmp_path / "a") == [tmp_path / "b"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a", "c"]
+    assert opcache.evict(tmp_path, 200) == []
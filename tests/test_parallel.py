@@ -0,0 +1,82 @@
+from pineko import parallel
+
+
+def square(x):
+    print(f"squaring {x}")
+    return x * x
+
+
+def fail(x):
+    raise ValueError(f"cannot process {x}")
+
+
+def test_execute():
+    res = parallel.execute(parallel.Task("sq", square, (3,)))
+    assert res.success
+    assert res.value == 9
+    assert res.output == "squaring 3\n"
+    res = parallel.execute(parallel.Task("fail", fail, (3,)))
+    assert not res.success
+    assert "cannot process 3" in res.error
+
+
+def test_run():
+    tasks = [parallel.Task(f"sq{i}", square, (i,)) for i in range(4)]
+    tasks.insert(2, parallel.Task("fail", fail, (2,)))
+    results = parallel.run(tasks, 2)
+    assert [r.name for r in results] == [t.name for t in tasks]
+    assert [r.success for r in results] == [True, True, False, True, True]
+    assert [r.value for r in results if r.success] == [0, 1, 4, 9]
+
+
+def test_allocate_cores():
+    # small tasks get a single core, the large one gets more (but not too many)
+    assert parallel.allocate_cores([10] * 10 + [200], 10) == [1] * 10 + [7]
+    assert parallel.allocate_cores([10] * 10 + [200], 10, max_cores=4)[-1] == 4
+    # never more than the budget
+    assert parallel.allocate_cores([100], 4) == [4]
+    assert parallel.allocate_cores([0, 0], 4) == [1, 1]
+
+
+def test_run_budget():
+    tasks = [parallel.Task(f"sq{i}", square, (i,), cores=i + 1) for i in range(4)]
+    results = parallel.run(tasks, 3)
+    assert [r.value for r in results] == [0, 1, 4, 9]
+
+
+def test_run_requires():
+    tasks = [
+        parallel.Task("last", square, (3,), requires=("first", "second")),
+        parallel.Task("first", square, (1,), cores=2),
+        parallel.Task("second", square, (2,)),
+        parallel.Task("broken", fail, (4,)),
+        parallel.Task("after-broken", square, (5,), requires=("broken",)),
+        parallel.Task("after-after", square, (6,), requires=("after-broken",)),
+        parallel.Task("unknown", square, (7,), requires=("missing",)),
+    ]
+    results = parallel.run(tasks, 2)
+    assert [r.success for r in results] == [True, True, True] + [False] * 4
+    assert results[0].value == 9
+    assert "broken" in results[4].error
+    # circular requirements do not hang
+    tasks = [
+        parallel.Task("a", square, (1,), requires=("b",)),
+        parallel.Task("b", square, (2,), requires=("a",)),
+    ]
+    assert not any(r.success for r in parallel.run(tasks, 2))
+
+
+def test_background_pool():
+    pool = parallel.BackgroundPool(2)
+
+    def callback(result):
+        # queue further work as soon as each task is done
+        if result.success:
+            pool.submit(parallel.Task(f"{result.name}-again", square, (result.value,)))
+
+    tasks = [parallel.Task(f"sq{i}", square, (i,)) for i in range(3)]
+    tasks.append(parallel.Task("fail", fail, (3,)))
+    parallel.run_serial(tasks, callback=callback)
+    results = pool.wait()
+    assert [r.name for r in results] == ["sq0-again", "sq1-again", "sq2-again"]
+    assert [r.value for r in results] == [0, 1, 16]
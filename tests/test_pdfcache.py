@@ -0,0 +1,61 @@
+import sys
+import types
+
+import numpy as np
+
+from pineko import configs, pdfcache
+
+
+class FakePDF:
+    def __init__(self, name, member):
+        self.name = name
+        self.member = member
+
+
+def test_load(monkeypatch, tmp_path):
+    pdfcache.clear()
+    # only the first member has a data file
+    (tmp_path / "NNPDF40").mkdir()
+    (tmp_path / "NNPDF40" / "NNPDF40_0000.dat").write_bytes(b"0" * 100)
+    monkeypatch.setitem(
+        sys.modules,
+        "lhapdf",
+        types.SimpleNamespace(mkPDF=FakePDF, paths=lambda: [str(tmp_path)]),
+    )
+    monkeypatch.setattr(configs, "configs", {})
+    assert pdfcache.max_bytes() == pdfcache.DEFAULT_MAX_BYTES
+    pdf = pdfcache.load("NNPDF40", 0)
+    # each set member is loaded once
+    assert pdfcache.load("NNPDF40", 0) is pdf
+    assert pdfcache.load("NNPDF40", 1) is not pdf
+    assert pdfcache.nbytes() == 100 + pdfcache.DEFAULT_NBYTES
+    # the least recently used members are dropped beyond the budget
+    monkeypatch.setattr(
+        configs, "configs", {configs.GENERIC_OPTIONS: {"pdf_cache_size": 1e-9}}
+    )
+    assert pdfcache.max_bytes() == 1
+    pdfcache.load("NNPDF40", 2)
+    assert list(pdfcache._sets) == [("NNPDF40", 2)]
+    pdfcache.clear()
+
+
+def test_tabulate(monkeypatch):
+    pdfcache.clear()
+
+    class TabulatedPDF(FakePDF):
+        def xfxQ2(self, pid, x, q2):
+            return pid * x * q2
+
+    monkeypatch.setitem(
+        sys.modules,
+        "lhapdf",
+        types.SimpleNamespace(mkPDF=TabulatedPDF, paths=lambda: []),
+    )
+    monkeypatch.setattr(configs, "configs", {})
+    table = pdfcache.tabulate("NNPDF40", [0.1, 0.5], 2.0)
+    assert table.shape == (1, 14, 2)
+    assert table[0, -1].tolist() == [0.1 * 6 * 2.0, 0.5 * 6 * 2.0]
+    assert pdfcache.tabulate("NNPDF40", np.array([0.1, 0.5]), 2.0) is table
+    assert pdfcache.tabulate("NNPDF40", [0.1, 0.5], 4.0) is not table
+    assert pdfcache.nbytes() == pdfcache.DEFAULT_NBYTES + 2 * table.nbytes
+    pdfcache.clear()
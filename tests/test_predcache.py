@@ -0,0 +1,67 @@
+import os
+import sys
+import types
+
+import numpy as np
+
+import pineko.configs
+from pineko import predcache
+
+
+def test_cached(tmp_path, monkeypatch):
+    calls = []
+
+    def convolve():
+        calls.append(1)
+        return [1.0, 2.0]
+
+    lhapdf_data = tmp_path / "lhapdf"
+    (lhapdf_data / "NNPDF40").mkdir(parents=True)
+    info = lhapdf_data / "NNPDF40" / "NNPDF40.info"
+    info.write_text("DataVersion: 1\n")
+    monkeypatch.setitem(
+        sys.modules, "lhapdf", types.SimpleNamespace(paths=lambda: [str(lhapdf_data)])
+    )
+    cache = tmp_path / "cache"
+    mask = np.array([True, False])
+    args = ("abc", [("NNPDF40", 0)], mask, (1.0, 1.0, 1.0), 0)
+    # not configured
+    np.testing.assert_allclose(predcache.cached(*args, convolve), [1.0, 2.0])
+    monkeypatch.setattr(
+        pineko.configs, "configs", {"paths": {"prediction_cache": cache}}
+    )
+    for _ in range(2):
+        np.testing.assert_allclose(predcache.cached(*args, convolve), [1.0, 2.0])
+    assert len(calls) == 2
+    assert len(list(cache.iterdir())) == 1
+    # without the grid hash nothing is cached
+    predcache.cached(None, *args[1:], convolve)
+    assert len(calls) == 3
+    # nor if the PDF set is not found
+    predcache.cached("abc", [("CT18", 0)], *args[2:], convolve)
+    assert len(calls) == 4
+    # a new version of the PDF set is a different entry
+    info.write_text("DataVersion: 2\n")
+    predcache.cached(*args, convolve)
+    assert len(calls) == 5
+    assert len(list(cache.iterdir())) == 2
+    # any other setting is a different entry
+    key = predcache.entry_key(args[0], args[1], ["v1"], *args[2:])
+    assert predcache.entry_key("abd", args[1], ["v1"], *args[2:]) != key
+    assert predcache.entry_key("abc", [("NNPDF40", 1)], ["v1"], *args[2:]) != key
+    assert predcache.entry_key(*args[:2], ["v2"], *args[2:]) != key
+    assert predcache.entry_key(*args[:2], ["v1"], ~mask, *args[3:]) != key
+    assert predcache.entry_key(*args[:2], ["v1"], mask, (2.0, 1.0, 1.0), 0) != key
+
+
+def test_evict(tmp_path):
+    entries = []
+    for idx in range(3):
+        entry = tmp_path / f"{idx}.npy"
+        entry.write_bytes(b"0" * 10)
+        os.utime(entry, (idx, idx))
+        entries.append(entry)
+    # the oldest entries are removed first, except the one kept
+    assert predcache.evict(tmp_path, 20, keep=entries[0]) == entries[1:2]
+    assert sorted(tmp_path.iterdir()) == [entries[0], entries[2]]
+    assert predcache.evict(tmp_path, 100) == []
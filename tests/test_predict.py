@@ -0,0 +1,40 @@
+import numpy as np
+import pineappl
+from eko import basis_rotation as br
+
+from pineko import predict
+
+
+def test_convolve():
+    rng = np.random.default_rng(0)
+    nx = 5
+    x_grid = np.geomspace(1e-3, 0.9, nx)
+    flavors = np.array(
+        [(a, b) for a in br.flavor_basis_pids for b in br.flavor_basis_pids]
+    )
+    table = rng.random((3, len(flavors), nx, nx))
+    normalizations = np.array([1.0, 0.5, 2.0])
+    dense = predict.DenseFkTable(
+        table, flavors, pineappl.pids.PidBasis.Pdg, x_grid, 2.0, normalizations
+    )
+    xfx = rng.random((4, 14, nx))
+    predictions = dense.convolve(xfx)
+    assert predictions.shape == (4, 3)
+    pdf = xfx / x_grid
+    np.testing.assert_allclose(
+        predictions[1],
+        np.einsum("bacij,ai,cj->b", table.reshape(3, 14, 14, nx, nx), pdf[1], pdf[1])
+        / normalizations,
+    )
+    # the same table in the evolution basis
+    inv = np.linalg.inv(br.rotate_flavor_to_evolution)
+    evol = np.einsum(
+        "ai,bacxy,cj->bijxy", inv, table.reshape(3, 14, 14, nx, nx), inv
+    ).reshape(3, -1, nx, nx)
+    channels = np.array(
+        [(a, b) for a in br.evol_basis_pids for b in br.evol_basis_pids]
+    )
+    dense = predict.DenseFkTable(
+        evol, channels, pineappl.pids.PidBasis.Evol, x_grid, 2.0, normalizations
+    )
+    np.testing.assert_allclose(dense.convolve(xfx, xfx), predictions)
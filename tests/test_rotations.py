@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from conftest import FakeEKO
+from eko import basis_rotation
+from eko.interpolation import XGrid
+from eko.io import manipulate
+from eko.io.items import Operator
+
+from pineko import configs, rotations
+
+
+def expected(op, xgrid, target):
+    op = manipulate.xgrid_reshape(Operator(operator=op), xgrid, 3, targetgrid=target)
+    return manipulate.to_evol(op, source=True).operator
+
+
+def test_prepare():
+    rng = np.random.default_rng(42)
+    xgrid = np.geomspace(1e-4, 1.0, 12)
+    evolgrid = [(10.0, 4), (20.0, 5), (30.0, 5), (40.0, 5), (50.0, 5)]
+    fake = FakeEKO(xgrid, evolgrid, rng)
+    target = np.geomspace(2e-4, 0.9, 7)
+    # a single slice per batch, or all of them at once
+    for max_bytes in [1, 2**30]:
+        prepared = list(
+            rotations.prepare(fake, evolgrid[1:], target, 3, max_bytes=max_bytes)
+        )
+        assert [ep for ep, _ in prepared] == evolgrid[1:]
+        for ep, op in prepared:
+            assert op.shape == (14, len(target), 14, len(xgrid))
+            np.testing.assert_allclose(
+                op, expected(fake.ops[ep], fake.xgrid, XGrid(target))
+            )
+        # nothing is left loaded
+        assert fake.loaded == set()
+    # identical x grids only need the flavor rotation
+    (ep, op), *_ = rotations.prepare(fake, evolgrid, xgrid, 3)
+    np.testing.assert_allclose(
+        op, manipulate.to_evol(Operator(operator=fake.ops[ep])).operator
+    )
+
+
+def test_batch_size():
+    assert rotations.batch_size((14, 10, 14, 10), 10, max_bytes=8 * 14**2 * 200) == 1
+    assert rotations.batch_size((14, 10, 14, 10), 10, max_bytes=8 * 14**2 * 400) == 2
+    assert rotations.batch_size((14, 10, 14, 10), 10, max_bytes=1) == 1
+
+
+def test_prefetch():
+    produced = []
+
+    def items(n, fail=False):
+        for idx in range(n):
+            produced.append(idx)
+            yield idx
+        if fail:
+            raise ValueError("broken operator")
+
+    for depth in [0, 1, 3]:
+        assert list(rotations.prefetch(items(5), depth)) == list(range(5))
+    with pytest.raises(ValueError, match="broken operator"):
+        list(rotations.prefetch(items(2, fail=True), 2))
+    # the consumer stopping early does not leave the producer hanging
+    produced.clear()
+    prefetched = rotations.prefetch(items(100), 2)
+    assert next(prefetched) == 0
+    prefetched.close()
+    assert len(produced) <= 4
+
+
+def test_reduction():
+    pids = {21, 1, -1, 2, -2}
+    reduction = rotations.Reduction.build(pids, "Nf4Sym")
+    assert reduction.pids1 == [-2, -1, 21, 1, 2]
+    assert len(reduction.pids0) == 14 - 5
+    rng = np.random.default_rng(0)
+    op = rng.random((14, 3, 14, 4))
+    # a PDF (in the evolution basis) fulfilling the assumptions
+    pdf = rng.random((14, 4))
+    evol = list(basis_rotation.evol_basis_pids)
+    for source, target in rotations.ASSUMPTIONS_MERGES["Nf4Sym"]:
+        pdf[evol.index(source)] = pdf[evol.index(target)]
+    full = np.einsum("ajbk,bk->aj", op, pdf)[reduction.rows]
+    reduced = np.einsum("ajbk,bk->aj", reduction.apply(op), pdf[reduction.columns])
+    np.testing.assert_allclose(reduced, full)
+    # only the rows are pruned, unless merging
+    reduction = rotations.Reduction.build(pids)
+    assert len(reduction.pids0) == 14
+    np.testing.assert_array_equal(reduction.apply(op), op[reduction.rows])
+    # nothing to reduce
+    reduction = rotations.Reduction.build(None, "Nf6Ind")
+    np.testing.assert_array_equal(reduction.apply(op), op)
+
+
+def test_merge_flavors(monkeypatch):
+    monkeypatch.setattr(configs, "configs", {})
+    assert not rotations.merge_flavors()
+    monkeypatch.setattr(
+        configs, "configs", {configs.GENERIC_OPTIONS: {"merge_flavors": True}}
+    )
+    assert rotations.merge_flavors()
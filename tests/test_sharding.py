@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from conftest import make_toy_grid
+
+import pineko.configs
+import pineko.theory
+import pineko.theory_card
+from pineko import sharding
+
+
+def test_parse():
+    assert sharding.parse("0/1") == (0, 1)
+    assert sharding.parse("3/4") == (3, 4)
+    for spec in ["4/4", "-1/4", "1/0", "1", "a/b", "1/2/3"]:
+        with pytest.raises(ValueError):
+            sharding.parse(spec)
+
+
+def test_partition():
+    costs = [5.0, 1.0, 1.0, 3.0, 2.0, 2.0, 1.0]
+    shards = sharding.partition(costs, 3)
+    # every item is assigned exactly once, in its original order
+    assert sorted(idx for shard in shards for idx in shard) == list(range(len(costs)))
+    assert all(shard == sorted(shard) for shard in shards)
+    assert sharding.partition(costs, 3) == shards
+    loads = [sum(costs[idx] for idx in shard) for shard in shards]
+    assert max(loads) - min(loads) <= 1.0
+    # without costs, the shards are balanced in size
+    items = list("abcdefg")
+    selected = [sharding.select(items, (i, 3)) for i in range(3)]
+    assert sorted(sum(selected, [])) == items
+    assert sorted(len(shard) for shard in selected) == [2, 2, 3]
+    # more shards than items
+    assert sharding.select(["a"], (1, 2)) == []
+
+
+def test_grid_cost():
+    grid = make_toy_grid()
+    mu2_points = len(grid.evolve_info(np.ones(2, dtype=bool)).fac1)
+    # 2 channels
+    assert sharding.grid_cost(grid) == 2 * mu2_points
+
+
+def test_reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        pineko.configs,
+        "configs",
+        {"paths": {"root": tmp_path, "fktables": tmp_path, "logs": {}}},
+    )
+    monkeypatch.setattr(pineko.theory_card, "load", lambda _tid: {})
+    grids = {f"G{i}": tmp_path / f"G{i}.pineappl.lz4" for i in range(5)}
+    done = []
+
+    def fk(name, grid_path, tcard, pdfs):
+        if name == "G3":
+            raise ValueError("broken grid")
+        done.append(name)
+
+    for index in range(2):
+        builder = pineko.theory.TheoryBuilder(400, ["DS"], shard=(index, 2))
+        monkeypatch.setattr(builder, "load_grids", lambda _ds: grids)
+        monkeypatch.setattr(builder, "fk", fk)
+        builder.fks(None)
+    # each grid is processed by a single shard
+    assert sorted(done) == ["G0", "G1", "G2", "G4"]
+    merged = sharding.merge_reports(400)
+    assert list(merged) == ["fks"]
+    summary = merged["fks"]
+    assert summary["shards"] == [0, 1]
+    assert summary["missing"] == []
+    assert sorted(grid["name"] for grid in summary["grids"]) == [
+        f"DS/G{i}" for i in range(5)
+    ]
+    assert [grid["name"] for grid in summary["grids"] if not grid["success"]] == [
+        "DS/G3"
+    ]
+    assert sharding.merge_reports(400, "ekos") == {}
@@ -0,0 +1,109 @@
+import pytest
+import yaml
+from banana.data.theories import default_card
+from conftest import make_toy_grid
+
+import pineko.configs
+import pineko.evolve
+import pineko.theory
+
+TCARD = dict(default_card, ModEv="TRN", Q0=1.65)
+
+GRIDS = {
+    ("DS1", "A"): dict(),
+    ("DS1", "B"): dict(points=((20.0, 0.1, 0.25), (100.0, 1e-4, 0.75))),
+    ("DS2", "C"): dict(points=((50.0, 0.1, 0.25),)),
+    ("DS1", "P"): dict(polarized=True),
+    ("DS2", "Q"): dict(points=((30.0, 0.1, 0.25),), polarized=True),
+}
+
+
+@pytest.fixture
+def builder(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        pineko.configs,
+        "configs",
+        {
+            "paths": {
+                "operator_cards": tmp_path / "opcards",
+                "ekos": tmp_path / "ekos",
+                "state": tmp_path / "state",
+            }
+        },
+    )
+    grids = []
+    for (ds, name), kwargs in GRIDS.items():
+        path = tmp_path / f"{name}.pineappl.lz4"
+        make_toy_grid(**kwargs).write_lz4(str(path))
+        grids.append((ds, name, path))
+    builder = pineko.theory.TheoryBuilder(400, ["DS1", "DS2"])
+    monkeypatch.setattr(builder, "all_grids", lambda sharded=True: grids)
+    builder.operator_cards_path.mkdir(parents=True)
+    return builder
+
+
+def card(builder, name, trim_xgrid=False):
+    # the cards are built from the loaded (i.e. optimized) grids
+    path = next(path for _, other, path in builder.all_grids() if other == name)
+    grid = builder.grid_cache.get(path).grid
+    return pineko.evolve.build_operator_card(grid, TCARD, 4, True, trim_xgrid)[0]
+
+
+def mugrid(builder, *names):
+    mus = {tuple(mu) for name in names for mu in card(builder, name)["mugrid"]}
+    return sorted(mus)
+
+
+def load_card(builder, name):
+    with open(builder.operator_cards_path / f"{name}.yaml", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def test_union_opcards_dataset(builder):
+    assert builder.load_union_map() == {}
+    builder.union_opcards(TCARD, 4, True, "dataset")
+    # grouped by dataset and by convolution type, the single grids are not shared
+    assert builder.load_union_map() == {"A": "_union-ds-DS1", "B": "_union-ds-DS1"}
+    shared = load_card(builder, "_union-ds-DS1")
+    assert [tuple(mu) for mu in shared["mugrid"]] == mugrid(builder, "A", "B")
+    assert len(shared["mugrid"]) > len(mugrid(builder, "A"))
+    assert shared["xgrid"] == card(builder, "A")["xgrid"]
+    assert not shared["configs"]["polarized"]
+
+
+def test_union_opcards_theory(builder):
+    builder.union_opcards(TCARD, 4, True, "theory", trim_xgrid=True)
+    assert builder.load_union_map() == {
+        "A": "_union-theory",
+        "B": "_union-theory",
+        "C": "_union-theory",
+        "P_polarized": "_union-theory_polarized",
+        "Q_polarized": "_union-theory_polarized",
+    }
+    shared = load_card(builder, "_union-theory")
+    names = ["A", "B", "C"]
+    assert [tuple(mu) for mu in shared["mugrid"]] == mugrid(builder, *names)
+    # the longest trimmed x grid covers all the grids
+    xgrids = [card(builder, name, trim_xgrid=True)["xgrid"] for name in names]
+    assert shared["xgrid"] == card(builder, "B", trim_xgrid=True)["xgrid"]
+    assert shared["xgrid"] == max(xgrids, key=len)
+    assert len(shared["xgrid"]) < len(card(builder, "B")["xgrid"])
+    polarized = load_card(builder, "_union-theory_polarized")
+    assert polarized["configs"]["polarized"]
+    assert [tuple(mu) for mu in polarized["mugrid"]] == mugrid(builder, "P", "Q")
+
+
+def test_union_opcards_unknown(builder):
+    with pytest.raises(ValueError):
+        builder.union_opcards(TCARD, 4, True, "everything")
+
+
+def test_link_eko(builder):
+    builder.ekos_path().mkdir(parents=True)
+    shared = builder.ekos_path() / "_union-theory.tar"
+    shared.write_bytes(b"EKO")
+    builder.link_eko("A", "_union-theory")
+    linked = builder.ekos_path() / "A.tar"
+    assert linked.is_symlink()
+    assert linked.resolve() == shared.resolve()
+    assert linked.read_bytes() == b"EKO"
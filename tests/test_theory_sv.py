@@ -1,4 +1,5 @@
 import pineappl
+import pytest
 
 import pineko.check
 import pineko.theory
@@ -75,3 +76,30 @@ def test_check_scvar_evolve():
         max_al,
         pineko.check.Scale.REN,
     )
+
+
+def test_check_scale_theory():
+    tcard = dict(ID=400, PTO=2, XIR=1.0, XIF=1.0, ModSV=None)
+    # renormalization and (scheme C) factorization scale variations
+    pineko.theory.check_scale_theory(tcard, dict(tcard, ID=401, XIR=2.0, XIF=0.5))
+    with pytest.raises(ValueError, match="PTO"):
+        pineko.theory.check_scale_theory(tcard, dict(tcard, ID=402, PTO=1))
+    # the factorization scale variation is inside the ekos
+    tcard = dict(tcard, XIF=2.0, ModSV="exponentiated")
+    pineko.theory.check_scale_theory(tcard, dict(tcard, ID=403, XIR=0.5))
+    with pytest.raises(ValueError, match="factorization"):
+        pineko.theory.check_scale_theory(tcard, dict(tcard, ID=404, XIF=0.5))
+
+
+def test_perturbative_order():
+    from conftest import make_toy_grid
+
+    convolutions = make_toy_grid().convolutions
+    assert pineko.check.is_dis(convolutions)
+    tcard = dict(FNS="FFNS", PTO=2)
+    assert pineko.theory.perturbative_order(tcard, convolutions) == 3
+    # the DIS order is used for FONLL, plus one for the mixed FONLL schemes
+    tcard = dict(FNS="FONLL-C", PTO=1, PTODIS=2)
+    assert pineko.theory.perturbative_order(tcard, convolutions) == 3
+    tcard = dict(tcard, FNS="FONLL-B")
+    assert pineko.theory.perturbative_order(tcard, convolutions) == 4
@@ -0,0 +1,153 @@
+import concurrent.futures
+import multiprocessing
+import os
+import time
+
+import pineko.configs
+import pineko.parallel
+import pineko.theory
+import pineko.theory_card
+from pineko import workqueue
+
+
+def test_claim_release(tmp_path):
+    first = workqueue.WorkQueue(tmp_path)
+    second = workqueue.WorkQueue(tmp_path)
+    second.worker = "other"
+    assert first.claim("A")
+    assert not second.claim("A")
+    assert first.owner("A") == first.worker
+    # only the owner can release
+    second.release("A")
+    assert first.is_locked("A")
+    first.release("A")
+    assert not first.is_locked("A")
+    assert second.claim("A")
+
+
+def test_stale(tmp_path):
+    crashed = workqueue.WorkQueue(tmp_path, stale_after=60.0)
+    crashed.worker = "crashed"
+    alive = workqueue.WorkQueue(tmp_path, stale_after=60.0)
+    assert crashed.claim("A")
+    assert not alive.claim("A")
+    # the crashed worker stopped refreshing the lock
+    old = time.time() - 120.0
+    os.utime(crashed.lock_path("A"), (old, old))
+    assert alive.claim("A")
+    assert alive.owner("A") == alive.worker
+    assert list(tmp_path.iterdir()) == [alive.lock_path("A")]
+
+
+def test_heartbeat(tmp_path):
+    queue = workqueue.WorkQueue(tmp_path, stale_after=0.2, heartbeat=0.05)
+    assert queue.claim("A")
+    with queue.heartbeat("A"):
+        time.sleep(0.5)
+        other = workqueue.WorkQueue(tmp_path, stale_after=0.2)
+        assert not other.claim("A")
+    time.sleep(0.3)
+    assert other.claim("A")
+
+
+def work(folder, items, done):
+    queue = workqueue.WorkQueue(folder)
+    for item in items:
+        if queue.claim(item):
+            with queue.heartbeat(item):
+                done.put((item, queue.worker))
+            # keep the lock, as the output would be there
+
+
+def test_concurrent_workers(tmp_path):
+    items = [f"G{i}" for i in range(50)]
+    done = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=work, args=(tmp_path, items, done))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    claimed = [done.get(timeout=30) for _ in items]
+    for worker in workers:
+        worker.join()
+    # each item has been processed exactly once
+    assert sorted(item for item, _ in claimed) == sorted(items)
+    assert done.empty()
+
+
+def test_fks_worker(tmp_path, monkeypatch):
+    grids = [("DS", f"G{i}", tmp_path / f"G{i}.pineappl.lz4") for i in range(3)]
+    builder = pineko.theory.TheoryBuilder(400, ["DS"])
+    monkeypatch.setattr(
+        pineko.configs,
+        "configs",
+        {"paths": {"fktables": tmp_path, "state": tmp_path / "state"}},
+    )
+    monkeypatch.setattr(pineko.theory_card, "load", lambda _tid: {})
+    monkeypatch.setattr(builder, "all_grids", lambda: grids)
+
+    def fk(name, grid_path, tcard, pdfs):
+        if name == "G1":
+            raise ValueError("broken grid")
+        (builder.fks_path / f"{name}.pineappl.lz4").write_text("")
+
+    monkeypatch.setattr(builder, "fk", fk)
+    builder.fks_path.mkdir()
+    # G2 is being computed by another worker, which then crashes
+    other = workqueue.WorkQueue(pineko.configs.state_path("queue", 400))
+    other.worker = "crashed"
+    assert other.claim("G2")
+    old = time.time() - 1000.0
+    os.utime(other.lock_path("G2"), (old, old))
+    results = builder.fks_worker(None, stale_after=10.0, poll=0.01)
+    assert [r.name for r in results] == ["DS/G0", "DS/G1", "DS/G2"]
+    assert [r.success for r in results] == [True, False, True]
+    # all the locks are released, and none is in the FK tables folder
+    assert len(list(tmp_path.rglob("*.lock"))) == 0
+    # a second worker has nothing left to do, but the failed grid
+    results = builder.fks_worker(None, poll=0.01)
+    assert [r.name for r in results] == ["DS/G1"]
+
+
+def test_fks_worker_comparisons(tmp_path, monkeypatch):
+    grids = [("DS", f"G{i}", tmp_path / f"G{i}.pineappl.lz4") for i in range(2)]
+    builder = pineko.theory.TheoryBuilder(400, ["DS"], incremental=True)
+    monkeypatch.setattr(
+        pineko.configs,
+        "configs",
+        {"paths": {"fktables": tmp_path, "state": tmp_path / "state"}},
+    )
+    monkeypatch.setattr(pineko.theory_card, "load", lambda _tid: {})
+    monkeypatch.setattr(builder, "all_grids", lambda: grids)
+    monkeypatch.setattr(builder, "fk", lambda *args, **kwargs: [400])
+    builder.fks_path.mkdir()
+    queue = workqueue.WorkQueue(pineko.configs.state_path("queue", 400))
+    futures = []
+    held = []
+
+    class FakePool:
+        def __init__(self, jobs):
+            self.submitted = futures
+
+        def wait(self):
+            # the grids stay claimed while their comparisons are running
+            held.extend(item for _, item, _ in grids if queue.is_locked(item))
+            for future in futures:
+                future.set_result(None)
+            return []
+
+    def queue_comparisons(*args):
+        def callback(result):
+            futures.append(concurrent.futures.Future())
+            return futures[-1:]
+
+        return callback
+
+    monkeypatch.setattr(pineko.parallel, "BackgroundPool", FakePool)
+    monkeypatch.setattr(builder, "queue_comparisons", queue_comparisons)
+    results = builder.fks_worker(["PDF"], poll=0.01, compare_jobs=1)
+    assert [r.success for r in results] == [True, True]
+    assert held == ["G0", "G1"]
+    # and they are released afterwards
+    assert not any(queue.is_locked(item) for _, item, _ in grids)